@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Library Management System - Benchmarks
+Rough timings and memory figures for the core data structures and backends.
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from records import Book, Member, Transaction
+
+def make_book(i):
+    return {"id": f"B{i:07d}", "title": f"Title {i}", "author": f"Author {i % 5000}",
+            "isbn": f"978-{i:010d}", "genre": f"Genre {i % 40}", "status": "Available",
+            "copies": 3, "available_copies": 2, "publish_year": 1950 + i % 75,
+            "pages": 100 + i % 900, "rating": (i % 50) / 10, "description": f"Description {i}"}
+
+def make_member(i):
+    return {"member_id": f"STU{i:06d}", "name": f"Member {i}", "email": f"m{i}@university.edu",
+            "role": "Student", "books_borrowed": i % 5, "fine_amount": 0.0, "password": "default123"}
+
+def make_transaction(i):
+    return {"id": f"TXN{i:08d}", "member_id": f"STU{i % 60000:06d}", "book_isbn": f"978-{i:010d}",
+            "type": "Borrow", "transaction_date": "2024-01-15", "due_date": "2024-02-15",
+            "return_date": None, "fine_amount": 0.0}
+
+def measure_memory(build, count):
+    """Bytes allocated per record by build(), with field values created up front"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count, records
+
+def bench_record_memory(count=100000):
+    print(f"\nRecord memory ({count} records, container overhead only):")
+    for name, make, record_type in (("Book", make_book, Book), ("Member", make_member, Member),
+                                    ("Transaction", make_transaction, Transaction)):
+        rows = [make(i) for i in range(count)]
+        dict_bytes, _ = measure_memory(lambda n: [dict(row) for row in rows], count)
+        slot_bytes, _ = measure_memory(lambda n: [record_type(row) for row in rows], count)
+        print(f"  {name:<12} dict: {dict_bytes:7.1f} B/record   slotted: {slot_bytes:7.1f} B/record   "
+              f"saved: {100 * (1 - slot_bytes / dict_bytes):5.1f}%")
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+def build_database(count, **options):
+    from database_manager import InMemoryDatabaseManager
+    db = InMemoryDatabaseManager(**options)
+    for i in range(count):
+        db.add_book(make_book(i))
+    return db
+
+def bench_snapshot_reads(count=100000):
+    import copy
+    print(f"\nDashboard refresh reads ({count} books):")
+    db = build_database(count)
+    deep, _ = timed(lambda: sorted([copy.deepcopy(book) for book in db.books.values()], key=lambda x: x["title"]))
+    first, _ = timed(db.get_all_books)
+    cached, _ = timed(db.get_all_books, repeat=10)
+    print(f"  deepcopy + sort (old): {deep * 1000:8.1f} ms")
+    print(f"  snapshot, rebuilt:     {first * 1000:8.1f} ms")
+    print(f"  snapshot, unchanged:   {cached * 1000:8.3f} ms")
+
+def bench_query_engine(count=100000):
+    """Dashboard filter + genre list: catalog scan versus the facet/ID-set engine"""
+    from collections import Counter
+    from query_engine import BookFilter
+    print(f"\nDashboard filters and facets ({count} books):")
+    db = build_database(count)
+    db.add_member(make_member(0))
+    for spec in [dict(genre="Genre 7"), dict(genre="Genre 7", status="Available", search_term="author 12")]:
+        query = BookFilter(**spec)
+        scan, expected = timed(lambda: sorted((book for book in db.books.values() if query.matches(book)),
+                                              key=lambda book: book["title"]))
+        engine, result = timed(lambda: db.query_books(**spec), repeat=5)
+        assert [book["isbn"] for book in result["books"]] == [book["isbn"] for book in expected]
+        label = ", ".join(f"{key}={value!r}" for key, value in spec.items())
+        print(f"  {label + ':':<66}scan {scan * 1000:7.1f} ms, engine {engine * 1000:7.1f} ms")
+    scan, genres = timed(lambda: Counter(book["genre"] for book in db.get_all_books()))
+    engine, facets = timed(db.get_facets, repeat=100)
+    assert facets["genre"] == dict(genres)
+    db.borrow_book(make_member(0)["member_id"], make_book(7)["isbn"])
+    assert db.get_facets()["available_by_genre"]["Genre 7"] == facets["available_by_genre"]["Genre 7"] - 1
+    print(f"  genre counts: scan {scan * 1000:7.1f} ms, facets {engine * 1000:7.3f} ms (kept current on every write)")
+
+def bench_import(count=100000):
+    import csv
+    import tempfile
+    from importer import import_file
+    from database_manager import InMemoryDatabaseManager, DatabaseManager
+    from library_system import LibrarySystem
+    print(f"\nCatalog import ({count} books from CSV):")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.csv")
+        with open(path, "w", newline="") as out:
+            writer = csv.DictWriter(out, fieldnames=list(make_book(0)))
+            writer.writeheader()
+            writer.writerows(make_book(i) for i in range(count))
+        one_by_one, _ = timed(lambda: build_database(count))
+        print(f"  add_book per record:   {one_by_one:6.1f} s ({count / one_by_one:9,.0f} rows/s)")
+        targets = [("in-memory manager", InMemoryDatabaseManager), ("LibrarySystem", LibrarySystem),
+                   ("SQLite", lambda: DatabaseManager(database=os.path.join(tmp, "lib.db"), backend="sqlite"))]
+        for name, make in targets:
+            report = import_file(make(), path)
+            print(f"  import, {name + ':':<20}{report.elapsed:6.1f} s ({report.rate:9,.0f} rows/s)")
+
+def bench_batch_checkout(stacks=2000, stack_size=5, threads=4, titles=100, members=50):
+    """Scanner checkouts: a stack per call with borrow_many/return_many versus
+    one call per book, plus overlapping stacks from several threads, which
+    must neither deadlock nor break the copy counts"""
+    import random
+    import threading
+    from database_manager import DatabaseManager, InMemoryDatabaseManager
+    print(f"\nBatch checkout ({stacks} stacks of {stack_size}):")
+    isbns = [f"978-{i:010d}" for i in range(titles)]
+    member_ids = [f"STU{i:06d}" for i in range(members)]
+    for name, make in [("in-memory manager", InMemoryDatabaseManager),
+                       ("SQLite", lambda: DatabaseManager(database=":memory:", backend="sqlite"))]:
+        db = make()
+        db.add_books([{**make_book(0), "isbn": isbn, "copies": 1000, "available_copies": 1000} for isbn in isbns])
+        db.add_members([{**make_member(0), "member_id": member_id, "books_borrowed": 0} for member_id in member_ids])
+        rng = random.Random(7)
+        work = [(rng.choice(member_ids), rng.sample(isbns, stack_size)) for _ in range(stacks // 4)]
+
+        def single():
+            for member_id, stack in work:
+                for isbn in stack:
+                    db.borrow_book(member_id, isbn)
+                for isbn in stack:
+                    db.return_book(member_id, isbn)
+
+        def batched():
+            for member_id, stack in work:
+                db.borrow_many(member_id, stack)
+                db.return_many(member_id, stack)
+
+        single_time, _ = timed(single)
+        batch_time, _ = timed(batched)
+
+        def desk(seed):
+            rng = random.Random(seed)
+            for _ in range(stacks // threads // 2):
+                member_id, stack = rng.choice(member_ids), rng.sample(isbns, stack_size)
+                if db.borrow_many(member_id, stack, True)[0]:
+                    db.return_many(member_id, stack, True)
+
+        workers = [threading.Thread(target=desk, args=(seed,)) for seed in range(threads)]
+        elapsed, _ = timed(lambda: ([w.start() for w in workers], [w.join() for w in workers]))
+        assert all(book["available_copies"] == 1000 for book in db.get_all_books()
+                   if book["isbn"] in isbns), "copy counts drifted"
+        assert all(m["books_borrowed"] == 0 for m in db.get_all_members()
+                   if m["member_id"] in member_ids), "loan counts drifted"
+        print(f"  {name + ':':<20}per book {single_time * 1000:7.1f} ms, batched {batch_time * 1000:7.1f} ms "
+              f"({single_time / batch_time:.1f}x), {threads} threads {elapsed:5.2f} s, invariants hold")
+        db.close_connection()
+
+def bench_overdue(count=100000, overdue_share=0.02):
+    """Overdue list and nightly fines: a scan of every open loan with a
+    per-record fine loop versus the due-date tracker's batched pass"""
+    from datetime import date, timedelta
+    from overdue import FINE_PER_DAY, MAX_FINE, OverdueTracker
+    print(f"\nOverdue loans and fine accrual ({count} open loans):")
+    today = date(2024, 6, 1)
+    loans = [{"id": f"TXN{i:07d}", "member_id": f"STU{i % 5000:06d}", "book_isbn": make_book(i)["isbn"],
+              "due_date": today + timedelta(days=(i % 300) - int(300 * overdue_share)), "fine_amount": 0.0}
+             for i in range(count)]
+    tracker = OverdueTracker()
+    for position, loan in enumerate(loans):
+        tracker.add(loan["id"], loan["member_id"], loan["book_isbn"], loan["due_date"], position)
+
+    def scan_fines():
+        added = {}
+        for loan in loans:
+            if loan["due_date"] < today:
+                owed = min(round((today - loan["due_date"]).days * FINE_PER_DAY, 2), MAX_FINE)
+                if owed > loan["fine_amount"]:
+                    added[loan["member_id"]] = added.get(loan["member_id"], 0.0) + owed - loan["fine_amount"]
+                    loan["fine_amount"] = owed
+        return {member_id: round(amount, 2) for member_id, amount in added.items()}
+
+    scan, expected = timed(lambda: sorted((loan for loan in loans if loan["due_date"] < today),
+                                          key=lambda loan: loan["due_date"]))
+    first, _ = timed(lambda: tracker.overdue(today))
+    tracked, result = timed(lambda: tracker.overdue(today), repeat=5)
+    assert len(result) == len(expected) and all(row[3] == loan["due_date"] for row, loan in zip(result, expected))
+    scan_accrue, expected = timed(scan_fines)
+    batch_accrue, added = timed(lambda: tracker.accrue(today))
+    assert added == expected and tracker.accrue(today) == {}, "fine totals differ"
+    print(f"  overdue list ({len(result)}): scan {scan * 1000:7.1f} ms, tracker {tracked * 1000:7.1f} ms "
+          f"(first call, draining the heap: {first * 1000:.1f} ms)")
+    print(f"  fine accrual: per-record {scan_accrue * 1000:7.1f} ms, batched {batch_accrue * 1000:7.1f} ms "
+          f"({'numpy' if tracker.use_numpy else 'stdlib'}), idempotent")
+
+def _kiosk(port, seed, requests, count):
+    # One kiosk process: a keep-alive client issuing a mix of searches,
+    # history lookups and circulation; returns per-request latencies
+    import random
+    from service import ServiceClient
+    rng = random.Random(seed)
+    client = ServiceClient(port=port)
+    latencies = []
+    for _ in range(requests):
+        isbn = f"978-{rng.randrange(count):010d}"
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll < 0.6:
+            client.search_books(f"Title {rng.randrange(count)}", "keyword", 10)
+        elif roll < 0.8:
+            client.get_transactions("STU001", 10)
+        elif roll < 0.9:
+            client.borrow_book("STU001", isbn)
+        else:
+            client.return_book("STU001", isbn)
+        latencies.append(time.perf_counter() - start)
+    client.close_connection()
+    return latencies
+
+def bench_service(kiosks=8, requests_per_kiosk=2000, count=20000):
+    """Kiosk load against the HTTP circulation service: throughput and latency"""
+    import multiprocessing
+    from service import run_in_thread
+    print(f"\nCirculation service ({kiosks} kiosk processes x {requests_per_kiosk} requests, {count} books):")
+    db = build_database(count)
+    service = run_in_thread(db)
+    with multiprocessing.Pool(kiosks) as pool:
+        elapsed, results = timed(lambda: pool.starmap(
+            _kiosk, [(service.port, seed, requests_per_kiosk, count) for seed in range(kiosks)]))
+    latencies = sorted(latency for result in results for latency in result)
+    stats = service.stats()
+    service.close()
+    print(f"  throughput:            {len(latencies) / elapsed:8,.0f} requests/s")
+    print(f"  client latency:        p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms")
+    print(f"  service latency:       p50 {stats['p50_ms']:6.2f} ms   p99 {stats['p99_ms']:6.2f} ms   "
+          f"({stats['coalesced']} reads coalesced)")
+
+def main():
+    print("=" * 50)
+    print("📚 Library Management System - Benchmarks")
+    print("=" * 50)
+    start = time.perf_counter()
+    bench_record_memory()
+    bench_snapshot_reads()
+    bench_query_engine()
+    bench_import()
+    bench_batch_checkout()
+    bench_overdue()
+    bench_service()
+    print(f"\nDone in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from records import Book
+
+# Binary catalog snapshot, written sorted by ISBN:
+#
+#   header     magic, version, byte order, record count, section offsets
+#   presence   uint16 per record, one bit per field that the record has
+#   numerics   one fixed-width column per numeric field
+#   strings    per string field: (count + 1) uint64 offsets, then a UTF-8 heap
+#
+# Readers mmap the file and decode single records on demand, so opening is
+# O(1) and an ISBN lookup is a binary search that touches O(log n) keys.
+
+MAGIC = b"LIBCAT\x00\x01"
+VERSION = 1
+STRING_FIELDS = ("isbn", "id", "title", "author", "genre", "status", "description")
+INT_FIELDS = ("copies", "available_copies", "publish_year", "pages")
+FLOAT_FIELDS = ("rating",)
+ALL_FIELDS = STRING_FIELDS + INT_FIELDS + FLOAT_FIELDS
+SECTIONS = ("presence",) + INT_FIELDS + FLOAT_FIELDS + \
+    tuple(f"{name}.offsets" for name in STRING_FIELDS) + tuple(f"{name}.heap" for name in STRING_FIELDS)
+_HEADER = struct.Struct(f"<8sIcxxxQ{len(SECTIONS)}Q")
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def write_catalog_snapshot(path, books):
+    """Write books (any mappings with an 'isbn') to a binary snapshot at path"""
+    books = sorted(books, key=lambda book: book["isbn"])
+    presence = array("H")
+    columns = {name: array("i") for name in INT_FIELDS}
+    columns.update({name: array("d") for name in FLOAT_FIELDS})
+    offsets = {name: array("Q", [0]) for name in STRING_FIELDS}
+    heaps = {name: bytearray() for name in STRING_FIELDS}
+
+    for book in books:
+        mask = 0
+        for bit, name in enumerate(ALL_FIELDS):
+            if name in book and book[name] is not None:
+                mask |= 1 << bit
+        presence.append(mask)
+        for name in INT_FIELDS:
+            value = book.get(name)
+            columns[name].append(int(value) if value is not None else 0)
+        for name in FLOAT_FIELDS:
+            value = book.get(name)
+            columns[name].append(float(value) if value is not None else 0.0)
+        for name in STRING_FIELDS:
+            value = book.get(name)
+            if value is not None:
+                heaps[name] += str(value).encode("utf-8")
+            offsets[name].append(len(heaps[name]))
+
+    blobs = [presence.tobytes()]
+    blobs += [columns[name].tobytes() for name in INT_FIELDS + FLOAT_FIELDS]
+    blobs += [offsets[name].tobytes() for name in STRING_FIELDS]
+    blobs += [bytes(heaps[name]) for name in STRING_FIELDS]
+
+    section_offsets = []
+    position = _align(_HEADER.size)
+    for blob in blobs:
+        section_offsets.append(position)
+        position = _align(position + len(blob))
+
+    byteorder = b"<" if sys.byteorder == "little" else b">"
+    # Write to a temporary file and rename, so a crash never leaves a torn
+    # snapshot for the next startup to map
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, byteorder, len(books), *section_offsets))
+        for offset, blob in zip(section_offsets, blobs):
+            out.write(b"\0" * (offset - out.tell()))
+            out.write(blob)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+    return len(books)
+
+# Read-only, memory-mapped view of a catalog snapshot
+class CatalogSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, self.count, *offsets = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a catalog snapshot")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            self.close()
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+        sections = dict(zip(SECTIONS, offsets))
+        view = memoryview(self._mmap)
+        n = self.count
+        self._presence = view[sections["presence"]:sections["presence"] + 2 * n].cast("H")
+        self._numbers = {name: view[sections[name]:sections[name] + 4 * n].cast("i") for name in INT_FIELDS}
+        self._numbers.update({name: view[sections[name]:sections[name] + 8 * n].cast("d")
+                              for name in FLOAT_FIELDS})
+        self._offsets = {}
+        self._heaps = {}
+        for name in STRING_FIELDS:
+            start = sections[f"{name}.offsets"]
+            self._offsets[name] = view[start:start + 8 * (n + 1)].cast("Q")
+            heap_start = sections[f"{name}.heap"]
+            self._heaps[name] = view[heap_start:heap_start + self._offsets[name][n]]
+
+    def __len__(self):
+        return self.count
+
+    def _raw(self, name, i):
+        offsets = self._offsets[name]
+        return self._heaps[name][offsets[i]:offsets[i + 1]]
+
+    def isbn_at(self, i):
+        return bytes(self._raw("isbn", i)).decode("utf-8")
+
+    def book_at(self, i):
+        mask = self._presence[i]
+        values = {}
+        for bit, name in enumerate(ALL_FIELDS):
+            if not mask & (1 << bit):
+                continue
+            if name in self._numbers:
+                values[name] = self._numbers[name][i]
+            else:
+                values[name] = bytes(self._raw(name, i)).decode("utf-8")
+        return Book(values)
+
+    def find(self, isbn):
+        """Position of isbn in the snapshot, or -1"""
+        key = isbn.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._raw("isbn", mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._raw("isbn", lo) == key:
+            return lo
+        return -1
+
+    def get(self, isbn):
+        i = self.find(isbn)
+        return self.book_at(i) if i >= 0 else None
+
+    def __contains__(self, isbn):
+        return self.find(isbn) >= 0
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.book_at(i)
+
+    def close(self):
+        # Drop the column views first; mmap refuses to close while they exist
+        self._presence = None
+        self._numbers = {}
+        self._offsets = {}
+        self._heaps = {}
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
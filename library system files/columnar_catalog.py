@@ -0,0 +1,173 @@
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numeric columns and their storage types. Missing ints are stored as -1 and
+# missing ratings as NaN; a range term masks them out, since a book without
+# the field matches no range.
+MISSING_INT = -1
+NUMERIC_COLUMNS = {
+    "copies": ("i", "int32"),
+    "available_copies": ("i", "int32"),
+    "publish_year": ("i", "int32"),
+    "pages": ("i", "int32"),
+    "rating": ("d", "float64"),
+}
+
+# Dictionary encoding for low-cardinality string columns (genre, status)
+class DictionaryEncoding:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        return self.codes.get(value, -1)
+
+# Column-oriented copy of the catalog used for filtering. Genre and status are
+# kept as integer codes and the numeric fields as NumPy arrays, so a filter
+# such as genre == X and status == Available and year >= 2010 is a handful of
+# vectorised comparisons. Without NumPy the same columns are stdlib arrays and
+# filters fall back to a Python pass over them.
+class ColumnarCatalog:
+    def __init__(self, capacity=1024):
+        self.use_numpy = np is not None
+        self.count = 0
+        self.dead = 0
+        self.isbns = []
+        self.rows = {}
+        self.genres = DictionaryEncoding()
+        self.statuses = DictionaryEncoding()
+        self._capacity = capacity
+        self.columns = {name: self._new_column(typecode, dtype)
+                        for name, (typecode, dtype) in NUMERIC_COLUMNS.items()}
+        self.columns["genre"] = self._new_column("i", "int32")
+        self.columns["status"] = self._new_column("i", "int32")
+        self.columns["alive"] = self._new_column("b", "bool")
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _new_column(self, typecode, dtype):
+        if self.use_numpy:
+            return np.zeros(self._capacity, dtype=dtype)
+        return array(typecode)
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.zeros(self._capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def _values(self, book):
+        values = {}
+        for name, (typecode, _) in NUMERIC_COLUMNS.items():
+            value = book.get(name)
+            if value is None or value == "":
+                value = float("nan") if typecode == "d" else MISSING_INT
+            values[name] = value
+        values["genre"] = self.genres.encode(book.get("genre", ""))
+        values["status"] = self.statuses.encode(book.get("status", ""))
+        values["alive"] = 1
+        return values
+
+    def add(self, book):
+        isbn = book["isbn"]
+        if isbn in self.rows:
+            self.update(book)
+            return
+        row = self.count
+        values = self._values(book)
+        if self.use_numpy:
+            if row == self._capacity:
+                self._grow()
+            for name, value in values.items():
+                self.columns[name][row] = value
+        else:
+            for name, value in values.items():
+                self.columns[name].append(value)
+        self.rows[isbn] = row
+        self.isbns.append(isbn)
+        self.count += 1
+
+    def update(self, book):
+        row = self.rows.get(book["isbn"])
+        if row is None:
+            self.add(book)
+            return
+        for name, value in self._values(book).items():
+            self.columns[name][row] = value
+
+    def remove(self, book):
+        row = self.rows.pop(book["isbn"], None)
+        if row is None:
+            return
+        self.columns["alive"][row] = 0
+        self.isbns[row] = None
+        self.dead += 1
+        if self.dead > 1024 and self.dead * 2 > self.count:
+            self._compact()
+
+    def _compact(self):
+        live = [row for row in range(self.count) if self.isbns[row] is not None]
+        for name, column in self.columns.items():
+            if self.use_numpy:
+                column[:len(live)] = column[live]
+            else:
+                self.columns[name] = array(column.typecode, (column[row] for row in live))
+        self.isbns = [self.isbns[row] for row in live]
+        self.rows = {isbn: row for row, isbn in enumerate(self.isbns)}
+        self.count = len(live)
+        self.dead = 0
+
+    def filter(self, genre=None, status=None, **ranges):
+        """Return ISBNs matching genre/status equality and inclusive numeric
+        ranges, e.g. filter(genre="Fiction", publish_year=(2010, None))"""
+        conditions = []
+        if genre is not None:
+            conditions.append(("genre", self.genres.lookup(genre), self.genres.lookup(genre)))
+        if status is not None:
+            conditions.append(("status", self.statuses.lookup(status), self.statuses.lookup(status)))
+        for name, (lo, hi) in ranges.items():
+            if name not in NUMERIC_COLUMNS:
+                raise KeyError(f"Unknown column: {name}")
+            conditions.append((name, lo, hi))
+
+        if self.use_numpy:
+            mask = self.columns["alive"][:self.count].copy()
+            for name, lo, hi in conditions:
+                column = self.columns[name][:self.count]
+                if name in NUMERIC_COLUMNS:
+                    mask &= ~np.isnan(column) if column.dtype.kind == "f" else column != MISSING_INT
+                if lo is not None:
+                    mask &= column >= lo
+                if hi is not None:
+                    mask &= column <= hi
+            return [self.isbns[row] for row in np.flatnonzero(mask)]
+
+        alive = self.columns["alive"]
+        matches = [row for row in range(self.count) if alive[row]]
+        for name, lo, hi in conditions:
+            column = self.columns[name]
+            if name in NUMERIC_COLUMNS:
+                if column.typecode == "d":
+                    matches = [row for row in matches if not math.isnan(column[row])]
+                else:
+                    matches = [row for row in matches if column[row] != MISSING_INT]
+            if lo is not None:
+                matches = [row for row in matches if column[row] >= lo]
+            if hi is not None:
+                matches = [row for row in matches if column[row] <= hi]
+        return [self.isbns[row] for row in matches]
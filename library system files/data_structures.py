@@ -1,3 +1,12 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from itertools import islice
+import heapq
+import json
+import threading
+
 # Binary Search Tree for books
 class TreeNode:
     def __init__(self, book_data):
@@ -50,53 +59,668 @@ class BinarySearchTree:
             books.append(node.data)
             self._inorder_traversal(node.right, books)
 
-# Hash Table for members
+# Self-balancing (AVL) tree for books. Insert, search and delete are iterative,
+# so ISBNs arriving in sorted order neither degrade lookups to O(n) nor hit the
+# recursion limit.
+class AVLNode:
+    __slots__ = ("key", "data", "left", "right", "height", "count")
+
+    def __init__(self, book_data):
+        self.key = book_data['isbn']
+        self.data = book_data
+        self.left = None
+        self.right = None
+        self.height = 1
+        self.count = 1
+
+class AVLTree:
+    def __init__(self):
+        self.root = None
+        self.size = 0
+        self.search_count = 0
+        self.rotation_count = 0
+
+    def __len__(self):
+        return self.size
+
+    def get_size(self):
+        return self.size
+
+    def height(self):
+        return self.root.height if self.root else 0
+
+    @staticmethod
+    def _height(node):
+        return node.height if node else 0
+
+    @staticmethod
+    def _count(node):
+        return node.count if node else 0
+
+    def _update(self, node):
+        left = node.left.height if node.left else 0
+        right = node.right.height if node.right else 0
+        node.height = (left if left > right else right) + 1
+        node.count = self._count(node.left) + self._count(node.right) + 1
+
+    def _rotate_left(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        self._update(node)
+        self._update(pivot)
+        self.rotation_count += 1
+        return pivot
+
+    def _rotate_right(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        self._update(node)
+        self._update(pivot)
+        self.rotation_count += 1
+        return pivot
+
+    def _rebalance(self, node):
+        self._update(node)
+        balance = self._height(node.left) - self._height(node.right)
+        if balance > 1:
+            if self._height(node.left.left) < self._height(node.left.right):
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node)
+        if balance < -1:
+            if self._height(node.right.right) < self._height(node.right.left):
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node)
+        return node
+
+    def _rebalance_path(self, path):
+        # Walk back up the recorded search path, re-linking rotated subtrees.
+        # Once a subtree keeps its old height no rotation can happen above it;
+        # only the subtree counts still need refreshing.
+        stable = False
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            if stable:
+                node.count = self._count(node.left) + self._count(node.right) + 1
+                continue
+            old_height = node.height
+            subtree = self._rebalance(node)
+            if subtree is not node:
+                if i == 0:
+                    self.root = subtree
+                elif path[i - 1].left is node:
+                    path[i - 1].left = subtree
+                else:
+                    path[i - 1].right = subtree
+            stable = subtree.height == old_height
+
+    def insert(self, book_data):
+        key = book_data['isbn']
+        path = []
+        node = self.root
+        while node:
+            if key == node.key:
+                node.data = book_data
+                return
+            path.append(node)
+            node = node.left if key < node.key else node.right
+
+        new_node = AVLNode(book_data)
+        self.size += 1
+        if not path:
+            self.root = new_node
+            return
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = new_node
+        else:
+            parent.right = new_node
+        self._rebalance_path(path)
+
+    def search(self, isbn):
+        self.search_count += 1
+        node = self.root
+        while node:
+            if isbn == node.key:
+                return node.data
+            node = node.left if isbn < node.key else node.right
+        return None
+
+    def delete(self, isbn):
+        path = []
+        node = self.root
+        while node and node.key != isbn:
+            path.append(node)
+            node = node.left if isbn < node.key else node.right
+        if not node:
+            return False
+
+        if node.left and node.right:
+            # Swap in the in-order successor, then unlink the successor instead
+            path.append(node)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
+            node.key, node.data = successor.key, successor.data
+            node = successor
+
+        child = node.left or node.right
+        if not path:
+            self.root = child
+        elif path[-1].left is node:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+        self.size -= 1
+        self._rebalance_path(path)
+        return True
+
+    def bulk_load(self, books):
+        # Replace the tree with a perfectly balanced one in O(n). Input that is
+        # not already in ISBN order is sorted first; duplicate ISBNs keep the
+        # last record.
+        books = list(books)
+        if any(books[i]['isbn'] > books[i + 1]['isbn'] for i in range(len(books) - 1)):
+            books.sort(key=lambda book: book['isbn'])
+        nodes = []
+        for book in books:
+            if nodes and nodes[-1].key == book['isbn']:
+                nodes[-1].data = book
+            else:
+                nodes.append(AVLNode(book))
+
+        self.root = None
+        self.size = len(nodes)
+        if not nodes:
+            return
+        # Each pending slice [lo, hi) becomes the subtree rooted at its midpoint;
+        # a slice of m nodes built this way has height m.bit_length().
+        pending = [(0, len(nodes), None, False)]
+        while pending:
+            lo, hi, parent, is_left = pending.pop()
+            mid = (lo + hi) // 2
+            node = nodes[mid]
+            node.height = (hi - lo).bit_length()
+            node.count = hi - lo
+            if parent is None:
+                self.root = node
+            elif is_left:
+                parent.left = node
+            else:
+                parent.right = node
+            if lo < mid:
+                pending.append((lo, mid, node, True))
+            if mid + 1 < hi:
+                pending.append((mid + 1, hi, node, False))
+
+    def extend(self, books):
+        # Batch insert: a batch that is large next to the tree is merged in with
+        # one balanced rebuild, a small one is inserted book by book
+        books = list(books)
+        if len(books) * 8 < self.size:
+            for book in books:
+                self.insert(book)
+        else:
+            self.bulk_load([*self.iter_books(), *books])
+
+    def _iter_from(self, isbn_lo=None):
+        # Lazy in-order walk starting at the first key >= isbn_lo
+        stack = []
+        node = self.root
+        while node:
+            if isbn_lo is None or node.key >= isbn_lo:
+                stack.append(node)
+                node = node.left
+            else:
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+
+    def _iter_at(self, position, reverse=False):
+        # Lazy walk starting at the node with the given in-order position,
+        # located through the subtree counts in O(log n)
+        stack = []
+        node = self.root
+        while node:
+            left_count = self._count(node.left)
+            if position < left_count:
+                if not reverse:
+                    stack.append(node)
+                node = node.left
+            elif position == left_count:
+                stack.append(node)
+                break
+            else:
+                if reverse:
+                    stack.append(node)
+                position -= left_count + 1
+                node = node.right
+        while stack:
+            node = stack.pop()
+            yield node
+            node = node.left if reverse else node.right
+            while node:
+                stack.append(node)
+                node = node.right if reverse else node.left
+
+    def page(self, offset=0, limit=50, descending=False):
+        if offset >= self.size:
+            return []
+        position = self.size - 1 - offset if descending else offset
+        return [node.data for node in islice(self._iter_at(position, descending), limit)]
+
+    def __iter__(self):
+        return self.iter_books()
+
+    def iter_books(self):
+        for node in self._iter_from():
+            yield node.data
+
+    def range(self, isbn_lo=None, isbn_hi=None):
+        # Books with isbn_lo <= isbn < isbn_hi, in ISBN order
+        for node in self._iter_from(isbn_lo):
+            if isbn_hi is not None and node.key >= isbn_hi:
+                return
+            yield node.data
+
+    def prefix(self, isbn_prefix):
+        for node in self._iter_from(isbn_prefix):
+            if not node.key.startswith(isbn_prefix):
+                return
+            yield node.data
+
+    def get_all_books(self):
+        return list(self.iter_books())
+
+# Sorted multiset of comparable entries stored as a list of small sorted
+# blocks, with a Fenwick tree over the block sizes. Insert and delete touch a
+# single block; finding the entry at a given position is a Fenwick descent, so
+# a page of `limit` entries at any offset costs O(log n + limit).
+class SortedIndex:
+    def __init__(self, load=512):
+        self.load = load
+        self.blocks = []
+        self.maxes = []
+        self.tree = [0]
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def _rebuild_tree(self):
+        tree = [0] * (len(self.blocks) + 1)
+        for i, block in enumerate(self.blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _tree_add(self, block_index, delta):
+        i = block_index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _locate(self, position):
+        # (block index, offset within block) of the entry at `position`
+        block_index = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            nxt = block_index + step
+            if nxt < len(self.tree) and self.tree[nxt] <= position:
+                block_index = nxt
+                position -= self.tree[nxt]
+            step >>= 1
+        return block_index, position
+
+    def bulk_load(self, entries):
+        # Replace the contents with one sort, then cut into blocks
+        entries = sorted(entries)
+        self.blocks = [entries[i:i + self.load] for i in range(0, len(entries), self.load)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.count = len(entries)
+        self._rebuild_tree()
+
+    def extend(self, entries):
+        # Batch insert: route the sorted batch to its blocks, merge each block
+        # with one sort, then split oversized blocks and rebuild the tree once
+        entries = sorted(entries)
+        if not self.blocks:
+            self.bulk_load(entries)
+            return
+        touched = {}
+        last = len(self.blocks) - 1
+        for entry in entries:
+            touched.setdefault(min(bisect_left(self.maxes, entry), last), []).append(entry)
+        blocks = []
+        for j, block in enumerate(self.blocks):
+            if j in touched:
+                block.extend(touched[j])
+                block.sort()
+                if len(block) > 2 * self.load:
+                    blocks.extend(block[i:i + self.load] for i in range(0, len(block), self.load))
+                    continue
+            blocks.append(block)
+        self.blocks = blocks
+        self.maxes = [block[-1] for block in blocks]
+        self.count += len(entries)
+        self._rebuild_tree()
+
+    def add(self, entry):
+        if not self.blocks:
+            self.blocks.append([entry])
+            self.maxes.append(entry)
+            self._rebuild_tree()
+            self.count = 1
+            return
+        j = bisect_left(self.maxes, entry)
+        if j == len(self.blocks):
+            j -= 1
+        block = self.blocks[j]
+        insort(block, entry)
+        self.maxes[j] = block[-1]
+        self.count += 1
+        if len(block) > 2 * self.load:
+            self.blocks[j:j + 1] = [block[:self.load], block[self.load:]]
+            self.maxes[j:j + 1] = [block[self.load - 1], block[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(j, 1)
+
+    def remove(self, entry):
+        j = bisect_left(self.maxes, entry)
+        if j == len(self.blocks):
+            return False
+        block = self.blocks[j]
+        i = bisect_left(block, entry)
+        if i == len(block) or block[i] != entry:
+            return False
+        del block[i]
+        self.count -= 1
+        if block:
+            self.maxes[j] = block[-1]
+            self._tree_add(j, -1)
+        else:
+            del self.blocks[j]
+            del self.maxes[j]
+            self._rebuild_tree()
+        return True
+
+    def after(self, entry=None, limit=1000):
+        """Up to `limit` entries greater than `entry` (from the start when None)"""
+        if entry is None:
+            j, i = 0, 0
+        else:
+            j = bisect_right(self.maxes, entry)
+            i = bisect_right(self.blocks[j], entry) if j < len(self.blocks) else 0
+        result = []
+        while j < len(self.blocks) and len(result) < limit:
+            result.extend(self.blocks[j][i:i + limit - len(result)])
+            j, i = j + 1, 0
+        return result
+
+    def slice(self, offset=0, limit=50, descending=False):
+        if offset >= self.count or limit <= 0:
+            return []
+        result = []
+        if not descending:
+            j, i = self._locate(offset)
+            while j < len(self.blocks) and len(result) < limit:
+                block = self.blocks[j]
+                result.extend(block[i:i + limit - len(result)])
+                j, i = j + 1, 0
+        else:
+            j, i = self._locate(self.count - 1 - offset)
+            while j >= 0 and len(result) < limit:
+                block = self.blocks[j]
+                stop = max(i + 1 - (limit - len(result)), 0)
+                result.extend(reversed(block[stop:i + 1]))
+                j -= 1
+                if j >= 0:
+                    i = len(self.blocks[j]) - 1
+        return result
+
+# Sorted index of record ids by one field, kept in step with a backend through
+# add/update/remove(record). Missing values sort first; ties break on the id.
+class FieldIndex:
+    def __init__(self, field, id_field='isbn'):
+        self.field = field
+        self.id_field = id_field
+        self.entries = {}
+        self.index = SortedIndex()
+
+    def __len__(self):
+        return len(self.index)
+
+    def _entry(self, record):
+        value = record.get(self.field)
+        key = (0, "") if value is None else (1, value)
+        return (key, record[self.id_field])
+
+    def add(self, record):
+        record_id = record[self.id_field]
+        if record_id in self.entries:
+            self.update(record)
+            return
+        entry = self._entry(record)
+        self.entries[record_id] = entry
+        self.index.add(entry)
+
+    def bulk_load(self, records):
+        self.entries = {record[self.id_field]: self._entry(record) for record in records}
+        self.index.bulk_load(self.entries.values())
+
+    def extend(self, records):
+        # Batched add; records already indexed are updated one by one
+        new_entries = []
+        for record in records:
+            record_id = record[self.id_field]
+            if record_id in self.entries:
+                self.update(record)
+            else:
+                entry = self.entries[record_id] = self._entry(record)
+                new_entries.append(entry)
+        self.index.extend(new_entries)
+
+    def update(self, record):
+        entry = self._entry(record)
+        old = self.entries.get(record[self.id_field])
+        if old == entry:
+            return
+        if old is not None:
+            self.index.remove(old)
+        self.entries[record[self.id_field]] = entry
+        self.index.add(entry)
+
+    def remove(self, record):
+        old = self.entries.pop(record[self.id_field], None)
+        if old is not None:
+            self.index.remove(old)
+
+    def order(self, record_ids):
+        """record_ids sorted the way this index orders them"""
+        if len(record_ids) * 8 < len(self.entries):
+            return sorted(record_ids, key=self.entries.__getitem__)
+        # A large share of the index: one in-order walk beats sorting
+        wanted = record_ids if isinstance(record_ids, (set, frozenset)) else set(record_ids)
+        return [record_id for _, record_id in self.index if record_id in wanted]
+
+    def ids(self):
+        for _, record_id in self.index:
+            yield record_id
+
+    def page(self, offset=0, limit=50, descending=False):
+        return [record_id for _, record_id in self.index.slice(offset, limit, descending)]
+
+    def iter_ids(self, batch_size=1000, lock=None):
+        # Keyset walk: each batch resumes after the last entry seen, so records
+        # added or removed between batches never break or repeat the walk.
+        # `lock`, if given, is held while each batch is read.
+        last = None
+        while True:
+            with lock or nullcontext():
+                batch = self.index.after(last, batch_size)
+            if not batch:
+                return
+            for _, record_id in batch:
+                yield record_id
+            last = batch[-1]
+
+# Hash Table for members. Grows by doubling once the load factor passes
+# max_load_factor; entries migrate from the old bucket array a few buckets per
+# operation, so no single insert pays for a full rehash.
 class HashTable:
-    def __init__(self, size=100):
-        self.size = size
-        self.table = [[] for _ in range(size)]
+    def __init__(self, size=100, max_load_factor=0.75, rehash_batch=4):
+        self.size = 1
+        while self.size < size:
+            self.size <<= 1
+        self.table = [[] for _ in range(self.size)]
+        self.max_load_factor = max_load_factor
+        self.rehash_batch = rehash_batch
+        self.count = 0
         self.collision_count = 0
+        self.resize_count = 0
+        self._old_table = None
+        self._rehash_index = 0
+
+    def __len__(self):
+        return self.count
 
     def _hash(self, key):
-        return hash(str(key)) % self.size
+        # Strings (member IDs) hash directly; str() is only needed for keys
+        # that would otherwise be unhashable.
+        if type(key) is str:
+            return hash(key)
+        return hash(str(key))
 
-    def insert(self, key, value):
-        index = self._hash(key)
-        bucket = self.table[index]
+    def _start_resize(self):
+        if self._old_table is not None:
+            self._finish_rehash()
+        self._old_table = self.table
+        self._rehash_index = 0
+        self.size <<= 1
+        self.table = [[] for _ in range(self.size)]
+        self.resize_count += 1
+
+    def _rehash_step(self, buckets):
+        old = self._old_table
+        mask = self.size - 1
+        end = min(self._rehash_index + buckets, len(old))
+        for i in range(self._rehash_index, end):
+            for k, v in old[i]:
+                bucket = self.table[self._hash(k) & mask]
+                if bucket:
+                    self.collision_count += 1
+                bucket.append((k, v))
+            old[i] = []
+        self._rehash_index = end
+        if end == len(old):
+            self._old_table = None
+
+    def _finish_rehash(self):
+        self._rehash_step(len(self._old_table))
 
-        for i, (k, v) in enumerate(bucket):
+    def _find(self, key, h):
+        # Returns (bucket, position) for key, or (None, -1) if absent
+        if self._old_table is not None:
+            index = h & (len(self._old_table) - 1)
+            if index >= self._rehash_index:
+                bucket = self._old_table[index]
+                for i, (k, _) in enumerate(bucket):
+                    if k == key:
+                        return bucket, i
+        bucket = self.table[h & (self.size - 1)]
+        for i, (k, _) in enumerate(bucket):
             if k == key:
-                bucket[i] = (key, value)
-                return
+                return bucket, i
+        return None, -1
+
+    def insert(self, key, value):
+        if self._old_table is not None:
+            self._rehash_step(self.rehash_batch)
+        h = self._hash(key)
+        bucket, i = self._find(key, h)
+        if bucket is not None:
+            bucket[i] = (key, value)
+            return
 
+        bucket = self.table[h & (self.size - 1)]
         if len(bucket) > 0:
             self.collision_count += 1
-
         bucket.append((key, value))
+        self.count += 1
+
+        if self.count > self.size * self.max_load_factor:
+            self._start_resize()
 
     def get(self, key):
-        index = self._hash(key)
-        bucket = self.table[index]
-        for k, v in bucket:
-            if k == key:
-                return v
-        return None
+        if self._old_table is not None:
+            self._rehash_step(self.rehash_batch)
+        bucket, i = self._find(key, self._hash(key))
+        if bucket is None:
+            return None
+        return bucket[i][1]
 
     def delete(self, key):
-        index = self._hash(key)
-        bucket = self.table[index]
-        for i, (k, v) in enumerate(bucket):
-            if k == key:
-                del bucket[i]
-                return True
-        return False
+        if self._old_table is not None:
+            self._rehash_step(self.rehash_batch)
+        bucket, i = self._find(key, self._hash(key))
+        if bucket is None:
+            return False
+        del bucket[i]
+        self.count -= 1
+        return True
+
+    def load_factor(self):
+        return self.count / self.size
+
+    def max_chain_length(self):
+        longest = max((len(bucket) for bucket in self.table), default=0)
+        if self._old_table is not None:
+            longest = max(longest, max(len(bucket) for bucket in self._old_table))
+        return longest
+
+    def get_stats(self):
+        return {
+            "count": self.count,
+            "buckets": self.size,
+            "load_factor": self.load_factor(),
+            "max_chain_length": self.max_chain_length(),
+            "collision_count": self.collision_count,
+            "resize_count": self.resize_count,
+            "rehashing": self._old_table is not None,
+        }
 
     def get_all_members(self):
-        members = []
-        for bucket in self.table:
-            for key, value in bucket:
-                members.append(value)
-        return members
+        return list(self.iter_values())
+
+    def iter_values(self, lock=None):
+        # Finish any rehash first and walk a copy of the bucket list: inserts
+        # made while the walk is under way (and any resize they start) then
+        # can neither skip nor repeat an entry. `lock`, if given, is held
+        # while the table is rehashed and copied and while each bucket is
+        # copied, so writers on other threads may carry on between buckets.
+        with lock or nullcontext():
+            if self._old_table is not None:
+                self._finish_rehash()
+            buckets = list(self.table)
+        for bucket in buckets:
+            with lock or nullcontext():
+                entries = tuple(bucket)
+            for key, value in entries:
+                yield value
 
 # Stack for transactions
 class Stack:
@@ -128,10 +752,10 @@ class Stack:
     def get_all(self):
         return list(reversed(self.items))
 
-# Queue for reservations
+# Queue for reservations, backed by a deque so dequeue is O(1)
 class Queue:
     def __init__(self):
-        self.items = []
+        self.items = deque()
         self.operation_count = 0
 
     def enqueue(self, item):
@@ -141,7 +765,7 @@ class Queue:
     def dequeue(self):
         if not self.is_empty():
             self.operation_count += 1
-            return self.items.pop(0)
+            return self.items.popleft()
         return None
 
     def front(self):
@@ -156,7 +780,158 @@ class Queue:
         return len(self.items)
 
     def get_all(self):
-        return self.items.copy()
+        return list(self.items)
+
+# Holds: one FIFO per ISBN plus a member -> holds index. Each FIFO is an
+# insertion-ordered dict keyed by member, so the next hold for a title,
+# cancelling a hold and counting a member's holds are all O(1). Keeps the
+# Queue interface so it can stand in for the global reservation queue.
+class HoldsQueue:
+    def __init__(self):
+        self.by_isbn = {}
+        self.by_member = {}
+        self._order = OrderedDict()
+        self.operation_count = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def place_hold(self, reservation):
+        member_id = reservation['member_id']
+        isbn = reservation['book_isbn']
+        if (member_id, isbn) in self._order:
+            return False
+        self.by_isbn.setdefault(isbn, OrderedDict())[member_id] = reservation
+        self.by_member.setdefault(member_id, {})[isbn] = reservation
+        self._order[(member_id, isbn)] = reservation
+        self.operation_count += 1
+        return True
+
+    def cancel_hold(self, member_id, isbn):
+        reservation = self._order.pop((member_id, isbn), None)
+        if reservation is None:
+            return None
+        self._unlink(member_id, isbn)
+        self.operation_count += 1
+        return reservation
+
+    def _unlink(self, member_id, isbn):
+        queue = self.by_isbn[isbn]
+        del queue[member_id]
+        if not queue:
+            del self.by_isbn[isbn]
+        holds = self.by_member[member_id]
+        del holds[isbn]
+        if not holds:
+            del self.by_member[member_id]
+
+    def next_hold(self, isbn):
+        queue = self.by_isbn.get(isbn)
+        if not queue:
+            return None
+        return queue[next(iter(queue))]
+
+    def pop_next_hold(self, isbn):
+        reservation = self.next_hold(isbn)
+        if reservation is not None:
+            self.cancel_hold(reservation['member_id'], isbn)
+        return reservation
+
+    def queue_length(self, isbn):
+        return len(self.by_isbn.get(isbn, ()))
+
+    def hold_count(self, member_id):
+        return len(self.by_member.get(member_id, ()))
+
+    def get_member_holds(self, member_id):
+        return list(self.by_member.get(member_id, {}).values())
+
+    def get_isbn_holds(self, isbn):
+        return list(self.by_isbn.get(isbn, {}).values())
+
+    # Queue interface, ordered by when each hold was placed
+    def enqueue(self, item):
+        self.place_hold(item)
+
+    def dequeue(self):
+        if not self._order:
+            return None
+        member_id, isbn = next(iter(self._order))
+        return self.cancel_hold(member_id, isbn)
+
+    def front(self):
+        if not self._order:
+            return None
+        return self._order[next(iter(self._order))]
+
+    def is_empty(self):
+        return len(self._order) == 0
+
+    def size(self):
+        return len(self._order)
+
+    def get_all(self):
+        return list(self._order.values())
+
+# Returned copies set aside for the patron who was at the head of the title's
+# hold queue, each with a pickup deadline. Deadlines sit in a min-heap, so a
+# sweep touches only the pickups that have lapsed; pickups collected or
+# cancelled before then are dropped from the heap lazily.
+class PickupShelf:
+    def __init__(self, pickup_days=7):
+        self.pickup_days = pickup_days
+        self.ready = {}
+        self.by_isbn = {}
+        self._deadlines = []
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.ready)
+
+    def shelve(self, reservation, ready_date):
+        """Set a copy aside for reservation; returns the pickup record"""
+        pickup = dict(reservation, ready_date=ready_date,
+                      pickup_expires=ready_date + timedelta(days=self.pickup_days))
+        self.restore(pickup)
+        return pickup
+
+    def restore(self, pickup):
+        key = (pickup['member_id'], pickup['book_isbn'])
+        self.ready[key] = pickup
+        self.by_isbn[key[1]] = self.by_isbn.get(key[1], 0) + 1
+        self._seq += 1
+        heapq.heappush(self._deadlines, (pickup['pickup_expires'], self._seq, pickup))
+
+    def get(self, member_id, isbn):
+        return self.ready.get((member_id, isbn))
+
+    def collect(self, member_id, isbn):
+        """Take the pickup off the shelf (borrowed or cancelled); returns it or None"""
+        pickup = self.ready.pop((member_id, isbn), None)
+        if pickup is not None:
+            self.by_isbn[isbn] -= 1
+            if not self.by_isbn[isbn]:
+                del self.by_isbn[isbn]
+        return pickup
+
+    def expire(self, as_of):
+        """Remove and return the pickups whose deadline is before as_of, earliest first"""
+        expired = []
+        while self._deadlines and self._deadlines[0][0] < as_of:
+            _, _, pickup = heapq.heappop(self._deadlines)
+            if self.ready.get((pickup['member_id'], pickup['book_isbn'])) is pickup:
+                self.collect(pickup['member_id'], pickup['book_isbn'])
+                expired.append(pickup)
+        return expired
+
+    def held_copies(self, isbn):
+        return self.by_isbn.get(isbn, 0)
+
+    def get_member_pickups(self, member_id):
+        return [pickup for (holder, _), pickup in self.ready.items() if holder == member_id]
+
+    def get_all(self):
+        return list(self.ready.values())
 
 # Circular Linked List for circulation history
 class CircularNode:
@@ -167,6 +942,7 @@ class CircularNode:
 class CircularLinkedList:
     def __init__(self):
         self.head = None
+        self.tail = None
         self.size = 0
         self.operation_count = 0
 
@@ -176,13 +952,10 @@ class CircularLinkedList:
 
         if not self.head:
             self.head = new_node
-            new_node.next = self.head
         else:
-            current = self.head
-            while current.next != self.head:
-                current = current.next
-            current.next = new_node
-            new_node.next = self.head
+            self.tail.next = new_node
+        new_node.next = self.head
+        self.tail = new_node
 
         self.size += 1
 
@@ -202,4 +975,108 @@ class CircularLinkedList:
         return history
 
     def get_size(self):
-        return self.size
\ No newline at end of file
+        return self.size
+
+def _json_default(value):
+    # Slotted records serialise as their dict form; dates and anything else as str
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+# Bounded ring buffer for circulation history. Appends are O(1); once the
+# ring is full the oldest entry is evicted and, if archive_path is set,
+# written to a JSON-lines archive so old history is kept on disk.
+class CirculationRing:
+    def __init__(self, capacity=1000, archive_path=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.start = 0
+        self.size = 0
+        self.operation_count = 0
+        self.evicted_count = 0
+        self.archive_path = archive_path
+        self._archive = None
+
+    def append(self, data):
+        self.operation_count += 1
+        if self.size < self.capacity:
+            self.slots[(self.start + self.size) % self.capacity] = data
+            self.size += 1
+            return
+        evicted = self.slots[self.start]
+        self.slots[self.start] = data
+        self.start = (self.start + 1) % self.capacity
+        self.evicted_count += 1
+        if self.archive_path:
+            self._spill(evicted)
+
+    def _spill(self, entry):
+        if self._archive is None:
+            self._archive = open(self.archive_path, "a", encoding="utf-8")
+        self._archive.write(json.dumps(entry, default=_json_default) + "\n")
+
+    def get_circulation_history(self, limit=10):
+        # Most recent first
+        last = self.start + self.size - 1
+        return [self.slots[(last - i) % self.capacity] for i in range(min(limit, self.size))]
+
+    def get_size(self):
+        return self.size
+
+    def iter_archive(self):
+        # Evicted entries, oldest first
+        if not self.archive_path:
+            return
+        self.flush()
+        try:
+            with open(self.archive_path, encoding="utf-8") as archive:
+                for line in archive:
+                    yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def flush(self):
+        if self._archive is not None:
+            self._archive.flush()
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+# Fixed set of locks shared out by key hash. Operations lock the stripes of
+# the keys they touch (an ISBN, a member ID), always in stripe order so two
+# multi-key holders cannot deadlock; operations on unrelated keys usually
+# land on different stripes and never wait for each other.
+class StripedLock:
+    def __init__(self, stripes=64):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.contended = 0
+
+    def _stripes(self, keys):
+        return sorted({hash(key) % len(self.locks) for key in keys if key is not None})
+
+    @contextmanager
+    def _acquire(self, stripes):
+        acquired = []
+        try:
+            for stripe in stripes:
+                lock = self.locks[stripe]
+                if not lock.acquire(blocking=False):
+                    self.contended += 1
+                    lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def hold(self, *keys):
+        """Context manager holding the stripes for the given keys"""
+        return self._acquire(self._stripes(keys))
+
+    def hold_all(self):
+        """Context manager holding every stripe, for whole-store operations"""
+        return self._acquire(range(len(self.locks)))
@@ -1,106 +1,451 @@
-from datetime import datetime, timedelta
-import copy
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta
+import functools
+import inspect
+import os
+import queue
+import sqlite3
+import threading
+import time
+from data_structures import HoldsQueue, FieldIndex, PickupShelf, StripedLock
+from records import Book, Member, Transaction, RecordView, new_book
+from columnar_catalog import ColumnarCatalog
+from search_index import InvertedIndex, IsbnAliasIndex, TrigramIndex, isbn_digits, tokenize
+from query_engine import STATUSES, BookFilter, FacetIndex
+from ledger import TransactionLedger
+from overdue import FINE_PER_DAY, MAX_FINE, OverdueTracker
+from persistence import WriteAheadLog, read_log, read_snapshot, write_snapshot
+
+# Sample data shared by the in-memory and SQL backends
+SAMPLE_BOOKS = [
+    {"id": "B001", "title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "isbn": "978-0-7432-7356-5",
+     "genre": "Fiction", "status": "Available", "copies": 3, "available_copies": 2, "publish_year": 1925,
+     "pages": 180, "rating": 4.2, "description": "Classic American novel"},
+    {"id": "B002", "title": "Python Programming", "author": "John Smith", "isbn": "978-1-4919-5713-7",
+     "genre": "Technology", "status": "Borrowed", "copies": 2, "available_copies": 0, "publish_year": 2023,
+     "pages": 456, "rating": 4.8, "description": "Comprehensive Python guide"},
+    {"id": "B003", "title": "Data Structures", "author": "Robert Sedgewick", "isbn": "978-0-321-57351-3",
+     "genre": "Computer Science", "status": "Available", "copies": 4, "available_copies": 3, "publish_year": 2011,
+     "pages": 955, "rating": 4.6, "description": "Algorithms textbook"},
+    {"id": "B004", "title": "Effective Java", "author": "Joshua Bloch", "isbn": "978-0134685991",
+     "genre": "Programming", "status": "Available", "copies": 3, "available_copies": 3, "publish_year": 2018,
+     "pages": 412, "rating": 4.7, "description": "Java best practices"},
+    {"id": "B005", "title": "Clean Code", "author": "Robert Martin", "isbn": "978-0135166307",
+     "genre": "Programming", "status": "Available", "copies": 2, "available_copies": 2, "publish_year": 2008,
+     "pages": 464, "rating": 4.5, "description": "Writing clean code principles"},
+]
+SAMPLE_MEMBERS = [
+    {"member_id": "STU001", "name": "Alice Johnson", "email": "alice@university.edu", "role": "Student",
+     "books_borrowed": 2, "fine_amount": 0, "password": "alice123"},
+    {"member_id": "FAC001", "name": "Dr. Robert Smith", "email": "robert@university.edu", "role": "Faculty",
+     "books_borrowed": 1, "fine_amount": 0, "password": "robert123"},
+    {"member_id": "LIB001", "name": "Sarah Wilson", "email": "sarah@university.edu", "role": "Librarian",
+     "books_borrowed": 0, "fine_amount": 0, "password": "sarah123"},
+    {"member_id": "ADM001", "name": "Admin User", "email": "admin@university.edu", "role": "Administrator",
+     "books_borrowed": 0, "fine_amount": 0, "password": "admin123"},
+    {"member_id": "STU002", "name": "Bob Wilson", "email": "bob@university.edu", "role": "Student",
+     "books_borrowed": 1, "fine_amount": 15.5, "password": "bob123"},
+]
+
+# Fields the catalog keeps sorted indexes on, for paging without a full sort
+BOOK_SORT_KEYS = ("title", "author", "publish_year", "rating")
+# Fields each substring search_type looks in
+SEARCH_FIELDS = {'title': ("title",), 'author': ("author",), 'isbn': ("isbn",),
+                 'all': ("title", "author", "isbn")}
+
+def _unapplied(results):
+    # Per-item results of a batch that was rejected as a whole
+    return [(isbn, False, message if not ok else "Not applied: another item in the batch failed")
+            for isbn, ok, message in results]
+
+def _logged(keys=None):
+    # Run a mutation under the lock stripes of the ISBNs/member IDs that
+    # keys(*args) names (every stripe when keys is None), and record it in the
+    # write-ahead log before the stripes are released, so entries touching the
+    # same key are logged in the order they were applied. The call returns
+    # only once its entry is durable; it waits after releasing the stripes,
+    # so writers on other keys join the same group commit. The clock reading
+    # is logged too, so replay reproduces dates and IDs exactly.
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if kwargs:
+                # Logged and replayed positionally
+                args = signature.bind(self, *args, **kwargs).args[1:]
+            hold = self.locks.hold(*keys(*args)) if keys else self.locks.hold_all()
+            ticket = None
+            with hold:
+                if self.wal is None or self._replaying:
+                    return method(self, *args)
+                wal = self.wal
+                ts = self._local.clock = datetime.now()
+                try:
+                    result = method(self, *args)
+                finally:
+                    self._local.clock = None
+                if result[0]:
+                    ticket = self._log(method.__name__, args, ts)
+            if ticket is not None:
+                wal.wait(ticket)
+            if self.seq - self.snapshot_seq >= self.snapshot_every:
+                self.checkpoint()
+            return result
+        return wrapper
+    return decorator
 
 class InMemoryDatabaseManager:
-    def __init__(self):
+    def __init__(self, columnar=False, data_dir=None, fsync="batch", snapshot_every=10000):
         self.books = {}
         self.members = {}
-        self.transactions = []
-        self.insert_sample_data()
+        self.transactions = TransactionLedger()
+        self.overdue = OverdueTracker()
+        self.reservations = HoldsQueue()
+        self.pickups = PickupShelf()
+        # Concurrency: mutations lock the stripes of the keys they touch, and
+        # each shared structure has a short-held lock of its own, so
+        # circulation on different titles and members runs side by side
+        self.locks = StripedLock()
+        self._index_lock = threading.RLock()
+        self._members_lock = threading.RLock()
+        self._ledger_lock = threading.Lock()
+        self._holds_lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._local = threading.local()
+        # Records are never mutated in place once stored: writers swap in a
+        # changed copy and bump the version, so readers can share them through
+        # read-only RecordViews and cached snapshots instead of deep copies.
+        self.books_version = 0
+        self.members_version = 0
+        self._snapshots = {}
+        # Secondary book indexes; each one implements add/update/remove(book)
+        self.text_index = InvertedIndex()
+        self.substring_index = TrigramIndex()
+        self.sorted_books = {field: FieldIndex(field) for field in BOOK_SORT_KEYS}
+        self.sorted_members = FieldIndex('name', 'member_id')
+        self.facets = FacetIndex()
+        self.isbn_aliases = IsbnAliasIndex()
+        self.book_indexes = [self.text_index, self.substring_index, self.facets, self.isbn_aliases,
+                             *self.sorted_books.values()]
+        self.columnar = ColumnarCatalog() if columnar else None
+        if self.columnar is not None:
+            self.book_indexes.append(self.columnar)
+        # Durability: snapshot + write-ahead log when data_dir is given
+        self.wal = None
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.snapshot_every = snapshot_every
+        self._replaying = False
+        if data_dir:
+            self._open_store(data_dir, fsync)
+        else:
+            self.insert_sample_data()
 
-    def insert_sample_data(self):
-        sample_books = [
-            {"id": "B001", "title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "isbn": "978-0-7432-7356-5",
-             "genre": "Fiction", "status": "Available", "copies": 3, "available_copies": 2, "publish_year": 1925,
-             "pages": 180, "rating": 4.2, "description": "Classic American novel"},
-            {"id": "B002", "title": "Python Programming", "author": "John Smith", "isbn": "978-1-4919-5713-7",
-             "genre": "Technology", "status": "Borrowed", "copies": 2, "available_copies": 0, "publish_year": 2023,
-             "pages": 456, "rating": 4.8, "description": "Comprehensive Python guide"},
-            {"id": "B003", "title": "Data Structures", "author": "Robert Sedgewick", "isbn": "978-0-321-57351-3",
-             "genre": "Computer Science", "status": "Available", "copies": 4, "available_copies": 3, "publish_year": 2011,
-             "pages": 955, "rating": 4.6, "description": "Algorithms textbook"},
-            {"id": "B004", "title": "Effective Java", "author": "Joshua Bloch", "isbn": "978-0134685991",
-             "genre": "Programming", "status": "Available", "copies": 3, "available_copies": 3, "publish_year": 2018,
-             "pages": 412, "rating": 4.7, "description": "Java best practices"},
-            {"id": "B005", "title": "Clean Code", "author": "Robert Martin", "isbn": "978-0135166307",
-             "genre": "Programming", "status": "Available", "copies": 2, "available_copies": 2, "publish_year": 2008,
-             "pages": 464, "rating": 4.5, "description": "Writing clean code principles"},
-        ]
-        sample_members = [
-            {"member_id": "STU001", "name": "Alice Johnson", "email": "alice@university.edu", "role": "Student",
-             "books_borrowed": 2, "fine_amount": 0, "password": "alice123"},
-            {"member_id": "FAC001", "name": "Dr. Robert Smith", "email": "robert@university.edu", "role": "Faculty",
-             "books_borrowed": 1, "fine_amount": 0, "password": "robert123"},
-            {"member_id": "LIB001", "name": "Sarah Wilson", "email": "sarah@university.edu", "role": "Librarian",
-             "books_borrowed": 0, "fine_amount": 0, "password": "sarah123"},
-            {"member_id": "ADM001", "name": "Admin User", "email": "admin@university.edu", "role": "Administrator",
-             "books_borrowed": 0, "fine_amount": 0, "password": "admin123"},
-            {"member_id": "STU002", "name": "Bob Wilson", "email": "bob@university.edu", "role": "Student",
-             "books_borrowed": 1, "fine_amount": 15.5, "password": "bob123"},
-        ]
-
-        for book in sample_books:
+    def _now(self):
+        return getattr(self._local, "clock", None) or datetime.now()
+
+    def _open_store(self, data_dir, fsync):
+        # Startup is "load latest snapshot + replay the log tail"
+        os.makedirs(data_dir, exist_ok=True)
+        self.snapshot_path = os.path.join(data_dir, "snapshot.pkl")
+        self.wal_path = os.path.join(data_dir, "wal.log")
+        self.snapshot_seq, state = read_snapshot(self.snapshot_path)
+        if state is None:
+            self.insert_sample_data()
+        else:
+            self._load_state(state)
+        self.seq = self.snapshot_seq
+        self._replaying = True
+        try:
+            for seq, op, args, ts in read_log(self.wal_path, self.snapshot_seq):
+                self._local.clock = ts
+                getattr(self, op)(*args)
+                self.seq = seq
+        finally:
+            self._replaying = False
+            self._local.clock = None
+        self.wal = WriteAheadLog(self.wal_path, fsync=fsync)
+        if state is None or self.seq - self.snapshot_seq >= self.snapshot_every:
+            self.checkpoint()
+
+    def _load_state(self, state):
+        for book in state["books"]:
+            self._index_add(book)
+        for member in state["members"]:
+            self._set_member(member)
+        self.transactions.extend(state["transactions"])
+        self._track_open_loans(state.get("fines", {}))
+        for reservation in state["reservations"]:
+            self.reservations.place_hold(reservation)
+        for pickup in state.get("pickups", ()):
+            self.pickups.restore(pickup)
+
+    def _log(self, op, args, ts):
+        with self._log_lock:
+            self.seq += 1
+            return self.wal.append(self.seq, op, list(args), ts)
+
+    def checkpoint(self):
+        """Write a compacted snapshot of the current state and truncate the log"""
+        if self.wal is None:
+            return
+        # Holding every stripe quiesces writers, so the snapshot matches seq
+        with self.locks.hold_all(), self._log_lock:
+            if self.wal is None:
+                return
+            self.wal.flush()
+            write_snapshot(self.snapshot_path, self.seq, {
+                "books": list(self.books.values()),
+                "members": list(self.members.values()),
+                "transactions": list(self.transactions),
+                "fines": self.overdue.charges(),
+                "reservations": self.reservations.get_all(),
+                "pickups": self.pickups.get_all(),
+            })
+            self.snapshot_seq = self.seq
+            self.wal.truncate()
+
+    # Book writes go through these helpers, which store the record and update
+    # every index under the index lock
+    def _index_add(self, book):
+        with self._index_lock:
             self.books[book["isbn"]] = book
-        for member in sample_members:
+            self.books_version += 1
+            for index in self.book_indexes:
+                index.add(book)
+
+    def _index_extend(self, books):
+        with self._index_lock:
+            for book in books:
+                self.books[book["isbn"]] = book
+            self.books_version += 1
+            for index in self.book_indexes:
+                if hasattr(index, "extend"):
+                    index.extend(books)
+                else:
+                    for book in books:
+                        index.add(book)
+
+    def _index_update(self, book):
+        with self._index_lock:
+            self.books[book["isbn"]] = book
+            self.books_version += 1
+            for index in self.book_indexes:
+                index.update(book)
+
+    def _index_remove(self, book):
+        with self._index_lock:
+            del self.books[book["isbn"]]
+            self.books_version += 1
+            for index in self.book_indexes:
+                index.remove(book)
+
+    def _set_member(self, member):
+        with self._members_lock:
             self.members[member["member_id"]] = member
+            self.sorted_members.update(member)
+            self.members_version += 1
+
+    def _snapshot(self, name, version, build):
+        # Reuse the last snapshot of a collection until its version changes
+        cached = self._snapshots.get(name)
+        if cached is None or cached[0] != version:
+            cached = (version, build())
+            self._snapshots[name] = cached
+        return cached[1]
+
+    def insert_sample_data(self):
+        for book in SAMPLE_BOOKS:
+            self._index_add(Book(book))
+        for member in SAMPLE_MEMBERS:
+            self._set_member(Member(member))
 
     def authenticate_user(self, member_id, password):
         member = self.members.get(member_id)
         if member and member["password"] == password:
-            return copy.deepcopy(member)
+            return RecordView(member)
         return None
 
     def get_all_books(self):
-        return sorted([copy.deepcopy(book) for book in self.books.values()], key=lambda x: x["title"])
+        """Read-only views of all books sorted by title; an immutable snapshot"""
+        with self._index_lock:
+            return self._snapshot("books", self.books_version, lambda: tuple(
+                RecordView(self.books[isbn]) for isbn in self.sorted_books["title"].ids()))
 
     def get_all_members(self):
-        return sorted([copy.deepcopy(member) for member in self.members.values()], key=lambda x: x["name"])
+        """Read-only views of all members sorted by name; an immutable snapshot"""
+        with self._members_lock:
+            return self._snapshot("members", self.members_version, lambda: tuple(
+                RecordView(self.members[member_id]) for member_id in self.sorted_members.ids()))
+
+    def get_books_page(self, sort_key='title', offset=0, limit=50, descending=False):
+        """One page of books in sort_key order, read from the sorted index"""
+        if sort_key not in self.sorted_books:
+            raise ValueError(f"Unsupported sort key: {sort_key}")
+        with self._index_lock:
+            isbns = self.sorted_books[sort_key].page(offset, limit, descending)
+            return [RecordView(self.books[isbn]) for isbn in isbns]
 
-    def search_books(self, search_term, search_type='title'):
+    def get_members_page(self, offset=0, limit=50, descending=False):
+        """One page of members in name order"""
+        with self._members_lock:
+            member_ids = self.sorted_members.page(offset, limit, descending)
+            return [RecordView(self.members[member_id]) for member_id in member_ids]
+
+    # Lazy walks for export. Books and members are read in keyset batches off
+    # the sorted indexes and transactions by position up to the ledger length
+    # at the start, so neither copies a whole collection and both tolerate
+    # circulation carrying on between batches.
+    def iter_books(self, batch_size=1000):
+        for isbn in self.sorted_books['title'].iter_ids(batch_size, self._index_lock):
+            book = self.books.get(isbn)
+            if book is not None:
+                yield RecordView(book)
+
+    def iter_members(self, batch_size=1000):
+        for member_id in self.sorted_members.iter_ids(batch_size, self._members_lock):
+            member = self.members.get(member_id)
+            if member is not None:
+                yield RecordView(member)
+
+    def iter_transactions(self):
+        for position in range(len(self.transactions)):
+            yield RecordView(self.transactions[position])
+
+    def get_book(self, isbn):
+        book = self.books.get(isbn)
+        return RecordView(book) if book is not None else None
+
+    def get_member(self, member_id):
+        member = self.members.get(member_id)
+        return RecordView(member) if member is not None else None
+
+    def get_book_count(self):
+        return len(self.books)
+
+    def get_member_count(self):
+        return len(self.members)
+
+    def filter_books(self, genre=None, status=None, search_term=None, **ranges):
+        """Books matching the dashboard search term, genre/status and inclusive
+        numeric (lo, hi) ranges, by title"""
+        with self._index_lock:
+            return self._filter_books(genre, status, search_term, ranges)
+
+    def _filter_books(self, genre, status, search_term, ranges):
+        if self.columnar is not None and ranges:
+            # Range terms scan the numeric columns; the rest come from ID sets
+            isbns = self.columnar.filter(**ranges)
+            spec = BookFilter(genre, status, search_term)
+            if spec.equals or spec.search_term:
+                isbns = set(spec.select(self.books, self.facets, self.substring_index)).intersection(isbns)
+        else:
+            isbns = BookFilter(genre, status, search_term, **ranges).select(
+                self.books, self.facets, self.substring_index)
+        return [RecordView(self.books[isbn]) for isbn in self.sorted_books["title"].order(isbns)]
+
+    def query_books(self, genre=None, status=None, search_term=None, **ranges):
+        """Books matching a filter spec (genre/status may be one value or
+        several) by title, with the catalog's facet counts, in one call:
+        {"books": [...], "total": n, "facets": get_facets()}"""
+        with self._index_lock:
+            books = self._filter_books(genre, status, search_term, ranges)
+            return {"books": books, "total": len(books), "facets": self.facets.counts()}
+
+    def get_facets(self):
+        """Books per genre and per status, and available copies per genre"""
+        with self._index_lock:
+            return self.facets.counts()
+
+    def get_isbn_aliases(self):
+        """Bare-digit forms of the catalog ISBNs stored with hyphens or spaces"""
+        with self._index_lock:
+            return self.isbn_aliases.get_all()
+
+    def search_books(self, search_term, search_type='title', limit=20):
+        with self._index_lock:
+            return self._search_books(search_term, search_type, limit)
+
+    def _search_books(self, search_term, search_type, limit):
+        if search_type == 'keyword':
+            # Ranked full-text search over title/author/genre/description
+            hits = self.text_index.search(search_term, limit)
+            return [RecordView(self.books[isbn]) for isbn, _ in hits]
+        fields = SEARCH_FIELDS.get(search_type)
+        if fields is None:
+            return []
+        # A field containing the term puts it in the title + author + isbn
+        # haystack too, so the trigram index yields a superset to verify
         search_term = search_term.lower()
-        results = []
-        for book in self.books.values():
-            if search_type == 'title' and search_term in book['title'].lower():
-                results.append(copy.deepcopy(book))
-            elif search_type == 'author' and search_term in book['author'].lower():
-                results.append(copy.deepcopy(book))
-            elif search_type == 'isbn' and search_term in book['isbn'].lower():
-                results.append(copy.deepcopy(book))
-            elif search_type == 'all':
-                if (search_term in book['title'].lower() or
-                    search_term in book['author'].lower() or
-                    search_term in book['isbn'].lower()):
-                    results.append(copy.deepcopy(book))
-        return results
+        isbns = [isbn for isbn in self.substring_index.search(search_term)
+                 if any(search_term in str(self.books[isbn][field] or '').lower() for field in fields)]
+        return [RecordView(self.books[isbn]) for isbn in self.sorted_books["title"].order(isbns)]
+
+    # Loans open and close through these, under the ledger lock, so the
+    # overdue tracker always holds exactly the open Borrow rows. A closed
+    # loan's Borrow row keeps the fine charged on it.
+    def _open_loan(self, txn):
+        position = self.transactions.append(txn)
+        self.overdue.add(txn['id'], txn['member_id'], txn['book_isbn'], txn['due_date'], position)
+
+    def _close_loan(self, member_id, isbn, return_date):
+        loan = self.transactions.find_open_loan(member_id, isbn)
+        if loan is None:
+            return
+        charged = self.overdue.remove(loan['id'])
+        if charged:
+            self.transactions.close_loan(member_id, isbn, return_date, fine_amount=charged)
+        else:
+            self.transactions.close_loan(member_id, isbn, return_date)
+
+    def _track_open_loans(self, fines):
+        for position, txn in enumerate(self.transactions):
+            if txn['type'] == 'Borrow' and txn.get('return_date') is None:
+                self.overdue.add(txn['id'], txn['member_id'], txn['book_isbn'], txn.get('due_date'), position,
+                                 fines.get(txn['id'], 0.0))
 
+    @_logged(lambda member_id, isbn: (member_id, isbn))
     def borrow_book(self, member_id, isbn):
         book = self.books.get(isbn)
         member = self.members.get(member_id)
         if not book or not member:
             return False, "Book or member not found"
-        if book['available_copies'] <= 0:
+        # A copy on the pickup shelf for this member is already out of
+        # available_copies
+        with self._holds_lock:
+            pickup = self.pickups.collect(member_id, isbn)
+            on_hold = self.pickups.held_copies(isbn)
+        if pickup is None and book['available_copies'] <= 0:
             return False, "No available copies"
         # Update book
-        book['available_copies'] -= 1
-        if book['available_copies'] == 0:
-            book['status'] = 'Borrowed'
+        if pickup is None:
+            available = book['available_copies'] - 1
+            book = book.replace(available_copies=available,
+                                status='Borrowed' if available == 0 else book['status'])
+        elif book['status'] == 'On Hold' and not on_hold:
+            book = book.replace(status='Borrowed')
+        self._index_update(book)
         # Update member
-        member['books_borrowed'] += 1
+        self._set_member(member.replace(books_borrowed=member['books_borrowed'] + 1))
         # Add transaction
-        txn_id = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-        due_date = datetime.now() + timedelta(days=30)
-        self.transactions.append({
-            "id": txn_id,
-            "member_id": member_id,
-            "book_isbn": isbn,
-            "type": "Borrow",
-            "transaction_date": datetime.now().date(),
-            "due_date": due_date.date(),
-            "return_date": None,
-            "fine_amount": 0.0
-        })
+        now = self._now()
+        txn_id = f"TXN{now.strftime('%Y%m%d%H%M%S%f')}"
+        due_date = now + timedelta(days=30)
+        with self._ledger_lock:
+            self._open_loan(Transaction(
+                id=txn_id,
+                member_id=member_id,
+                book_isbn=isbn,
+                type="Borrow",
+                transaction_date=now.date(),
+                due_date=due_date.date(),
+                return_date=None,
+                fine_amount=0.0
+            ))
         return True, "Book borrowed successfully"
 
+    @_logged(lambda member_id, isbn: (member_id, isbn))
     def return_book(self, member_id, isbn):
         book = self.books.get(isbn)
         member = self.members.get(member_id)
@@ -108,78 +453,1011 @@ class InMemoryDatabaseManager:
             return False, "Book or member not found"
         if member['books_borrowed'] <= 0:
             return False, "No books borrowed to return"
-        # Update book
-        book['available_copies'] += 1
-        if book['available_copies'] > 0:
-            book['status'] = 'Available'
+        now = self._now()
+        # Update book: the copy goes to the first patron waiting for it, or
+        # back on the shelf
+        with self._holds_lock:
+            pickup = self._shelve_for_next_hold(isbn, now.date())
+        if pickup is None:
+            available = book['available_copies'] + 1
+            book = book.replace(available_copies=available,
+                                status='Available' if available > 0 else book['status'])
+        elif book['available_copies'] == 0:
+            book = book.replace(status='On Hold')
+        self._index_update(book)
         # Update member
-        member['books_borrowed'] -= 1
-        # Update transaction
-        for txn in reversed(self.transactions):
-            if (txn['member_id'] == member_id and txn['book_isbn'] == isbn and
-                txn['type'] == 'Borrow' and txn['return_date'] is None):
-                txn['return_date'] = datetime.now().date()
-                break
-        # Add return transaction
-        txn_id = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-        self.transactions.append({
-            "id": txn_id,
-            "member_id": member_id,
-            "book_isbn": isbn,
-            "type": "Return",
-            "transaction_date": datetime.now().date(),
-            "due_date": None,
-            "return_date": datetime.now().date(),
-            "fine_amount": 0.0
-        })
+        self._set_member(member.replace(books_borrowed=member['books_borrowed'] - 1))
+        # Close the open Borrow row
+        txn_id = f"TXN{now.strftime('%Y%m%d%H%M%S%f')}"
+        with self._ledger_lock:
+            self._close_loan(member_id, isbn, now.date())
+            # Add return transaction
+            self.transactions.append(Transaction(
+                id=txn_id,
+                member_id=member_id,
+                book_isbn=isbn,
+                type="Return",
+                transaction_date=now.date(),
+                due_date=None,
+                return_date=now.date(),
+                fine_amount=0.0
+            ))
+        if pickup is not None:
+            return True, f"Book returned successfully and held for {pickup['member_id']}"
         return True, "Book returned successfully"
 
+    # Batch circulation for self-checkout: one member lookup, one clock
+    # reading and one ledger append for the whole stack, with every stripe
+    # taken up front in a fixed order. Returns (success, [(isbn, ok, message)]):
+    # with atomic=True nothing is applied unless every item can be; otherwise
+    # the items that can be are, and success means at least one was.
+    @_logged(lambda member_id, isbns, atomic=False: (member_id, *isbns))
+    def borrow_many(self, member_id, isbns, atomic=False):
+        member = self.members.get(member_id)
+        if not member:
+            return False, [(isbn, False, "Book or member not found") for isbn in isbns]
+        with self._holds_lock:
+            held = {isbn for isbn in isbns if self.pickups.get(member_id, isbn)}
+        results, updated, collected = [], {}, []
+        for isbn in isbns:
+            book = updated.get(isbn) or self.books.get(isbn)
+            if not book:
+                results.append((isbn, False, "Book or member not found"))
+            elif isbn in held:
+                held.discard(isbn)
+                collected.append(isbn)
+                results.append((isbn, True, "Book borrowed successfully"))
+            elif book['available_copies'] <= 0:
+                results.append((isbn, False, "No available copies"))
+            else:
+                available = book['available_copies'] - 1
+                updated[isbn] = book.replace(available_copies=available,
+                                             status='Borrowed' if available == 0 else book['status'])
+                results.append((isbn, True, "Book borrowed successfully"))
+        borrowed = [isbn for isbn, ok, _ in results if ok]
+        if not borrowed or (atomic and len(borrowed) < len(results)):
+            return False, _unapplied(results)
+        with self._holds_lock:
+            for isbn in collected:
+                self.pickups.collect(member_id, isbn)
+                book = updated.get(isbn) or self.books[isbn]
+                if book['status'] == 'On Hold' and not self.pickups.held_copies(isbn):
+                    updated[isbn] = book.replace(status='Borrowed')
+        for book in updated.values():
+            self._index_update(book)
+        self._set_member(member.replace(books_borrowed=member['books_borrowed'] + len(borrowed)))
+        now = self._now()
+        stamp = now.strftime('%Y%m%d%H%M%S%f')
+        due_date = (now + timedelta(days=30)).date()
+        with self._ledger_lock:
+            for n, isbn in enumerate(borrowed, 1):
+                self._open_loan(Transaction(
+                    id=f"TXN{stamp}-{n}",
+                    member_id=member_id,
+                    book_isbn=isbn,
+                    type="Borrow",
+                    transaction_date=now.date(),
+                    due_date=due_date,
+                    return_date=None,
+                    fine_amount=0.0
+                ))
+        return True, results
+
+    @_logged(lambda member_id, isbns, atomic=False: (member_id, *isbns))
+    def return_many(self, member_id, isbns, atomic=False):
+        member = self.members.get(member_id)
+        if not member:
+            return False, [(isbn, False, "Book or member not found") for isbn in isbns]
+        results = []
+        outstanding = member['books_borrowed']
+        for isbn in isbns:
+            if isbn not in self.books:
+                results.append((isbn, False, "Book or member not found"))
+            elif outstanding <= 0:
+                results.append((isbn, False, "No books borrowed to return"))
+            else:
+                outstanding -= 1
+                results.append((isbn, True, "Book returned successfully"))
+        returned = [isbn for isbn, ok, _ in results if ok]
+        if not returned or (atomic and len(returned) < len(results)):
+            return False, _unapplied(results)
+        now = self._now()
+        # As in return_book, each copy goes to the head of its hold queue first
+        updated = {}
+        with self._holds_lock:
+            for position, (isbn, ok, _) in enumerate(results):
+                if not ok:
+                    continue
+                book = updated.get(isbn) or self.books[isbn]
+                pickup = self._shelve_for_next_hold(isbn, now.date())
+                if pickup is None:
+                    updated[isbn] = book.replace(available_copies=book['available_copies'] + 1, status='Available')
+                else:
+                    if book['available_copies'] == 0:
+                        updated[isbn] = book.replace(status='On Hold')
+                    results[position] = (isbn, True, f"Book returned successfully and held for {pickup['member_id']}")
+        for book in updated.values():
+            self._index_update(book)
+        self._set_member(member.replace(books_borrowed=outstanding))
+        stamp = now.strftime('%Y%m%d%H%M%S%f')
+        with self._ledger_lock:
+            for isbn in returned:
+                self._close_loan(member_id, isbn, now.date())
+            self.transactions.extend(Transaction(
+                id=f"TXN{stamp}-{n}",
+                member_id=member_id,
+                book_isbn=isbn,
+                type="Return",
+                transaction_date=now.date(),
+                due_date=None,
+                return_date=now.date(),
+                fine_amount=0.0
+            ) for n, isbn in enumerate(returned, 1))
+        return True, results
+
+    @_logged(lambda book_data: (book_data.get('isbn'),))
     def add_book(self, book_data):
         isbn = book_data.get('isbn')
         if not isbn:
             return False, "ISBN required"
         if isbn in self.books:
             return False, "Book already exists"
-        new_book = {
-            "id": book_data.get('id', f"B{datetime.now().strftime('%Y%m%d%H%M%S%f')}"),
-            "title": book_data.get('title', ''),
-            "author": book_data.get('author', ''),
-            "isbn": isbn,
-            "genre": book_data.get('genre', ''),
-            "status": book_data.get('status', 'Available'),
-            "copies": book_data.get('copies', 1),
-            "available_copies": book_data.get('available_copies', book_data.get('copies', 1)),
-            "publish_year": book_data.get('publish_year'),
-            "pages": book_data.get('pages'),
-            "rating": book_data.get('rating', 0.0),
-            "description": book_data.get('description', '')
-        }
-        self.books[isbn] = new_book
+        self._index_add(self._new_book(book_data))
         return True, "Book added successfully"
 
+    def _new_book(self, book_data):
+        return new_book(book_data, f"B{self._now().strftime('%Y%m%d%H%M%S%f')}")
+
+    @_logged()
+    def add_books(self, books):
+        """Add a batch of books, skipping ISBNs already in the catalog.
+        Returns (any_added, number_added); indexes are updated once per batch."""
+        added = {}
+        for book_data in books:
+            isbn = book_data.get('isbn')
+            if isbn and isbn not in self.books and isbn not in added:
+                added[isbn] = self._new_book(book_data)
+        if added:
+            self._index_extend(list(added.values()))
+        return bool(added), len(added)
+
+    @_logged(lambda isbn: (isbn,))
+    def remove_book(self, isbn):
+        book = self.books.get(isbn)
+        if not book:
+            return False, "Book not found"
+        self._index_remove(book)
+        return True, "Book removed successfully"
+
+    @_logged(lambda member_data: (member_data.get('member_id'),))
     def add_member(self, member_data):
         member_id = member_data.get('member_id')
         if not member_id:
             return False, "Member ID required"
         if member_id in self.members:
             return False, "Member already exists"
-        new_member = {
+        self._set_member(self._new_member(member_data))
+        return True, "Member added successfully"
+
+    def _new_member(self, member_data):
+        return Member(
+            member_id=member_data['member_id'],
+            name=member_data.get('name', ''),
+            email=member_data.get('email', ''),
+            role=member_data.get('role', 'Student'),
+            books_borrowed=member_data.get('books_borrowed', 0),
+            fine_amount=member_data.get('fine_amount', 0.0),
+            password=member_data.get('password', 'default123'),
+        )
+
+    @_logged()
+    def add_members(self, members):
+        """Add a batch of members, skipping IDs already registered.
+        Returns (any_added, number_added)."""
+        added = {}
+        for member_data in members:
+            member_id = member_data.get('member_id')
+            if member_id and member_id not in self.members and member_id not in added:
+                added[member_id] = self._new_member(member_data)
+        if added:
+            with self._members_lock:
+                self.members.update(added)
+                self.sorted_members.extend(added.values())
+                self.members_version += 1
+        return bool(added), len(added)
+
+    # Hold fulfilment: a returned copy goes straight to the patron at the
+    # head of that title's hold queue (O(1) via HoldsQueue) with a pickup
+    # deadline. A pickup that lapses or is cancelled passes the copy to the
+    # next patron in line, or back to available_copies when nobody is waiting.
+    def _shelve_for_next_hold(self, isbn, today):
+        # Caller holds _holds_lock
+        reservation = self.reservations.pop_next_hold(isbn)
+        if reservation is None:
+            return None
+        return self.pickups.shelve(reservation, today)
+
+    def _pass_on(self, isbn, today):
+        # Caller holds the ISBN's stripe
+        with self._holds_lock:
+            pickup = self._shelve_for_next_hold(isbn, today)
+            on_hold = self.pickups.held_copies(isbn)
+        book = self.books.get(isbn)
+        if pickup is None and book is not None:
+            self._index_update(book.replace(available_copies=book['available_copies'] + 1, status='Available'))
+        elif book is not None and not on_hold and book['status'] == 'On Hold':
+            self._index_update(book.replace(status='Borrowed'))
+        return pickup
+
+    @_logged()
+    def expire_holds(self, as_of=None):
+        """Scheduled sweep: every pickup whose deadline passed before as_of
+        (default today) cascades to the next patron waiting for the title.
+        Returns (any_expired, [(member_id, isbn, passed_to or None)])."""
+        today = _as_day(as_of or self._now())
+        with self._holds_lock:
+            expired = self.pickups.expire(today)
+        results = []
+        for pickup in expired:
+            passed = self._pass_on(pickup['book_isbn'], today)
+            results.append((pickup['member_id'], pickup['book_isbn'], passed and passed['member_id']))
+        return bool(results), results
+
+    def get_ready_holds(self, member_id=None):
+        """Copies waiting on the pickup shelf, for one member or everyone"""
+        with self._holds_lock:
+            pickups = self.pickups.get_all() if member_id is None else self.pickups.get_member_pickups(member_id)
+            return [RecordView(pickup) for pickup in pickups]
+
+    @_logged(lambda member_id, isbn: (member_id, isbn))
+    def place_hold(self, member_id, isbn):
+        if isbn not in self.books or member_id not in self.members:
+            return False, "Book or member not found"
+        reservation = {
             "member_id": member_id,
-            "name": member_data.get('name', ''),
-            "email": member_data.get('email', ''),
-            "role": member_data.get('role', 'Student'),
-            "books_borrowed": member_data.get('books_borrowed', 0),
-            "fine_amount": member_data.get('fine_amount', 0.0),
-            "password": member_data.get('password', 'default123'),
+            "book_isbn": isbn,
+            "date_requested": self._now().date()
         }
-        self.members[member_id] = new_member
-        return True, "Member added successfully"
+        with self._holds_lock:
+            placed = not self.pickups.get(member_id, isbn) and self.reservations.place_hold(reservation)
+        if not placed:
+            return False, "Hold already placed"
+        return True, "Hold placed successfully"
+
+    @_logged(lambda member_id, isbn: (member_id, isbn))
+    def cancel_hold(self, member_id, isbn):
+        with self._holds_lock:
+            cancelled = self.reservations.cancel_hold(member_id, isbn)
+            collected = cancelled is None and self.pickups.collect(member_id, isbn)
+        if collected:
+            self._pass_on(isbn, self._now().date())
+        elif cancelled is None:
+            return False, "Hold not found"
+        return True, "Hold cancelled successfully"
+
+    def get_next_hold(self, isbn):
+        with self._holds_lock:
+            hold = self.reservations.next_hold(isbn)
+            return RecordView(hold) if hold is not None else None
+
+    def get_member_holds(self, member_id):
+        with self._holds_lock:
+            return [RecordView(hold) for hold in self.reservations.get_member_holds(member_id)]
+
+    def get_hold_count(self, member_id):
+        with self._holds_lock:
+            return self.reservations.hold_count(member_id)
+
+    def get_pending_reservations(self):
+        with self._holds_lock:
+            return [RecordView(hold) for hold in self.reservations.get_all()]
+
+    @_logged(lambda member_id: (member_id,))
+    def remove_member(self, member_id):
+        with self._members_lock:
+            member = self.members.pop(member_id, None)
+            if not member:
+                return False, "Member not found"
+            self.sorted_members.remove(member)
+            self.members_version += 1
+        return True, "Member removed successfully"
 
     def get_transactions(self, member_id=None, limit=10):
-        filtered = [t for t in self.transactions if (member_id is None or t['member_id'] == member_id)]
-        filtered = sorted(filtered, key=lambda x: x['transaction_date'], reverse=True)
-        return copy.deepcopy(filtered[:limit])
+        with self._ledger_lock:
+            return [RecordView(txn) for txn in self.transactions.recent(limit, member_id)]
+
+    def get_open_loans(self, member_id):
+        with self._ledger_lock:
+            return [RecordView(txn) for txn in self.transactions.iter_open_loans(member_id)]
+
+    def get_overdue_loans(self, as_of=None):
+        """Open loans due before as_of (default today), oldest first, with
+        the fine charged so far in fine_amount"""
+        with self._ledger_lock:
+            overdue = self.overdue.overdue(as_of or self._now().date())
+            return [RecordView(self.transactions[position].replace(fine_amount=charged))
+                    for position, _, _, _, _, charged in overdue]
+
+    def get_overdue_count(self, as_of=None):
+        with self._ledger_lock:
+            return self.overdue.overdue_count(as_of or self._now().date())
+
+    @_logged()
+    def accrue_fines(self, as_of=None, rate=FINE_PER_DAY, max_fine=MAX_FINE):
+        """Nightly fine run: charge every overdue loan up to rate per day
+        overdue (at most max_fine per loan) in one pass and add the new
+        charges to members' fine_amount. Returns (any_charged, total_added)."""
+        with self._ledger_lock:
+            added = self.overdue.accrue(as_of or self._now().date(), rate, max_fine)
+        with self._members_lock:
+            for member_id, amount in added.items():
+                member = self.members.get(member_id)
+                if member is not None:
+                    self._set_member(member.replace(fine_amount=round((member['fine_amount'] or 0) + amount, 2)))
+        return bool(added), round(sum(added.values(), 0.0), 2)
 
     def close_connection(self):
-        # Nothing to close in-memory
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
         print("In-memory database closed")
+
+# Fixed-size pool of database connections. Connections are created lazily up
+# to `size`; callers beyond that wait for one to be returned.
+class ConnectionPool:
+    def __init__(self, factory, size=5):
+        self.factory = factory
+        self.size = size
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self.created < self.size:
+                    self.created += 1
+                    conn = self.factory()
+                    self._all.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close_all(self):
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
+        self.created = 0
+        self._idle = queue.LifoQueue()
+
+BOOK_COLUMNS = ("isbn", "id", "title", "author", "genre", "status", "copies", "available_copies",
+                "publish_year", "pages", "rating", "description")
+MEMBER_COLUMNS = ("member_id", "name", "email", "role", "books_borrowed", "fine_amount", "password")
+TRANSACTION_COLUMNS = ("id", "member_id", "book_isbn", "type", "transaction_date", "due_date",
+                       "return_date", "fine_amount")
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS books (
+        isbn VARCHAR(32) PRIMARY KEY, id VARCHAR(40), title VARCHAR(255), author VARCHAR(255),
+        genre VARCHAR(100), status VARCHAR(20), copies INT, available_copies INT,
+        publish_year INT, pages INT, rating DOUBLE, description TEXT)""",
+    """CREATE TABLE IF NOT EXISTS members (
+        member_id VARCHAR(20) PRIMARY KEY, name VARCHAR(255), email VARCHAR(255), role VARCHAR(40),
+        books_borrowed INT, fine_amount DOUBLE, password VARCHAR(255))""",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id VARCHAR(40) PRIMARY KEY, member_id VARCHAR(20), book_isbn VARCHAR(32), type VARCHAR(10),
+        transaction_date DATE, due_date DATE, return_date DATE, fine_amount DOUBLE)""",
+    """CREATE TABLE IF NOT EXISTS reservations (
+        member_id VARCHAR(20), book_isbn VARCHAR(32), date_requested DATE, seq BIGINT,
+        PRIMARY KEY (member_id, book_isbn))""",
+]
+INDEXES = [
+    ("idx_books_title", "books (title)"),
+    ("idx_books_genre_status", "books (genre, status)"),
+    ("idx_members_name", "members (name)"),
+    ("idx_txn_member_date", "transactions (member_id, transaction_date)"),
+    ("idx_txn_date", "transactions (transaction_date)"),
+    ("idx_txn_open_loans", "transactions (member_id, book_isbn, type, return_date)"),
+    ("idx_txn_overdue", "transactions (type, return_date, due_date)"),
+    ("idx_reservations_isbn", "reservations (book_isbn, seq)"),
+]
+
+# Circulation as single-call stored procedures on MySQL, so a borrow or return
+# is one round trip. Each returns a status code: 0 ok, 1 book or member
+# missing, 2 no copies / nothing to return.
+MYSQL_PROCEDURES = [
+    """CREATE PROCEDURE IF NOT EXISTS borrow_book(IN p_member VARCHAR(20), IN p_isbn VARCHAR(32),
+        IN p_txn VARCHAR(40), IN p_date DATE, IN p_due DATE)
+    proc: BEGIN
+        DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+        START TRANSACTION;
+        IF NOT EXISTS (SELECT 1 FROM members WHERE member_id = p_member)
+           OR NOT EXISTS (SELECT 1 FROM books WHERE isbn = p_isbn) THEN
+            ROLLBACK; SELECT 1; LEAVE proc;
+        END IF;
+        UPDATE books SET available_copies = available_copies - 1,
+            status = IF(available_copies = 0, 'Borrowed', status)
+            WHERE isbn = p_isbn AND available_copies > 0;
+        IF ROW_COUNT() = 0 THEN ROLLBACK; SELECT 2; LEAVE proc; END IF;
+        UPDATE members SET books_borrowed = books_borrowed + 1 WHERE member_id = p_member;
+        INSERT INTO transactions VALUES (p_txn, p_member, p_isbn, 'Borrow', p_date, p_due, NULL, 0.0);
+        COMMIT; SELECT 0;
+    END""",
+    """CREATE PROCEDURE IF NOT EXISTS return_book(IN p_member VARCHAR(20), IN p_isbn VARCHAR(32),
+        IN p_txn VARCHAR(40), IN p_date DATE)
+    proc: BEGIN
+        DECLARE EXIT HANDLER FOR SQLEXCEPTION BEGIN ROLLBACK; RESIGNAL; END;
+        START TRANSACTION;
+        IF NOT EXISTS (SELECT 1 FROM books WHERE isbn = p_isbn) THEN ROLLBACK; SELECT 1; LEAVE proc; END IF;
+        UPDATE members SET books_borrowed = books_borrowed - 1
+            WHERE member_id = p_member AND books_borrowed > 0;
+        IF ROW_COUNT() = 0 THEN
+            IF EXISTS (SELECT 1 FROM members WHERE member_id = p_member) THEN ROLLBACK; SELECT 2;
+            ELSE ROLLBACK; SELECT 1; END IF;
+            LEAVE proc;
+        END IF;
+        UPDATE books SET available_copies = available_copies + 1,
+            status = IF(available_copies > 0, 'Available', status) WHERE isbn = p_isbn;
+        UPDATE transactions SET return_date = p_date
+            WHERE member_id = p_member AND book_isbn = p_isbn AND type = 'Borrow' AND return_date IS NULL
+            ORDER BY transaction_date DESC LIMIT 1;
+        INSERT INTO transactions VALUES (p_txn, p_member, p_isbn, 'Return', p_date, NULL, p_date, 0.0);
+        COMMIT; SELECT 0;
+    END""",
+]
+
+BORROW_MESSAGES = {0: "Book borrowed successfully", 1: "Book or member not found", 2: "No available copies"}
+RETURN_MESSAGES = {0: "Book returned successfully", 1: "Book or member not found", 2: "No books borrowed to return"}
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+def _as_day(value):
+    # Overdue cut-off: a date, datetime or ISO string, defaulting to today
+    value = _as_date(value or date.today())
+    return value.date() if isinstance(value, datetime) else value
+
+# SQL-backed manager with the same method surface as InMemoryDatabaseManager.
+# Talks to MySQL through mysql.connector, or to SQLite (backend="sqlite",
+# database=<file path or ":memory:">) as a local stand-in. Connections come from
+# a pool, statements are prepared once per connection and reused, bulk loads
+# use executemany, and borrow/return each run as a single transaction.
+class DatabaseManager:
+    def __init__(self, host="localhost", database="libralog", user="root", password="", port=3306,
+                 backend="mysql", pool_size=5):
+        self.backend = backend
+        if backend == "mysql":
+            import mysql.connector
+            self.placeholder = "%s"
+            factory = lambda: mysql.connector.connect(host=host, port=port, user=user,
+                                                      password=password, database=database)
+        elif backend == "sqlite":
+            self.placeholder = "?"
+            if database == ":memory:":
+                # A private in-memory database is visible to one connection
+                # only, so the pool is that one connection and callers take
+                # turns on it. (A shared-cache database would let several
+                # connections in, but it locks whole tables and fails at once
+                # with "database table is locked" instead of waiting.)
+                pool_size = 1
+            factory = lambda: sqlite3.connect(database, check_same_thread=False, cached_statements=256)
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.pool = ConnectionPool(factory, pool_size)
+        self._prepared = {}
+        # SQLite has a single writer; batches queue for it here rather than
+        # spinning on the database lock
+        self._batch_lock = threading.Lock() if backend == "sqlite" else nullcontext()
+        self.create_schema()
+
+    def _sql(self, sql):
+        return sql if self.placeholder == "?" else sql.replace("?", "%s")
+
+    def _cursor(self, conn, sql):
+        if self.backend == "mysql":
+            # Prepared server-side once per connection and statement
+            key = (id(conn), sql)
+            cursor = self._prepared.get(key)
+            if cursor is None:
+                cursor = self._prepared[key] = conn.cursor(prepared=True)
+            return cursor
+        return conn.cursor()
+
+    def _execute(self, conn, sql, params=()):
+        sql = self._sql(sql)
+        cursor = self._cursor(conn, sql)
+        cursor.execute(sql, params)
+        return cursor
+
+    def _query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            cursor = self._execute(conn, sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _executemany(self, sql, rows):
+        if not rows:
+            return 0
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(self._sql(sql), rows)
+            return cursor.rowcount
+
+    def create_schema(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            for name, target in INDEXES:
+                if self.backend == "sqlite":
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+                else:
+                    cursor.execute("SELECT COUNT(*) FROM information_schema.statistics "
+                                   "WHERE table_schema = DATABASE() AND index_name = %s", (name,))
+                    if not cursor.fetchone()[0]:
+                        cursor.execute(f"CREATE INDEX {name} ON {target}")
+            if self.backend == "mysql":
+                for procedure in MYSQL_PROCEDURES:
+                    cursor.execute(procedure)
+
+    @staticmethod
+    def _book_row(book):
+        copies = book.get('copies', 1)
+        return (book['isbn'], book.get('id', f"B{datetime.now().strftime('%Y%m%d%H%M%S%f')}"),
+                book.get('title', ''), book.get('author', ''), book.get('genre', ''),
+                book.get('status', 'Available'), copies, book.get('available_copies', copies),
+                book.get('publish_year'), book.get('pages'), book.get('rating', 0.0),
+                book.get('description', ''))
+
+    @staticmethod
+    def _member_row(member):
+        return (member['member_id'], member.get('name', ''), member.get('email', ''),
+                member.get('role', 'Student'), member.get('books_borrowed', 0),
+                member.get('fine_amount', 0.0), member.get('password', 'default123'))
+
+    @staticmethod
+    def _transaction(row):
+        for field in ("transaction_date", "due_date", "return_date"):
+            row[field] = _as_date(row[field])
+        return Transaction(row)
+
+    def insert_sample_data(self):
+        self.add_books(SAMPLE_BOOKS)
+        self.add_members(SAMPLE_MEMBERS)
+
+    def add_books(self, books):
+        """Insert many books in one batch, skipping existing ISBNs; returns (any_added, number_added)"""
+        verb = "INSERT OR IGNORE" if self.backend == "sqlite" else "INSERT IGNORE"
+        placeholders = ", ".join("?" * len(BOOK_COLUMNS))
+        added = self._executemany(f"{verb} INTO books ({', '.join(BOOK_COLUMNS)}) VALUES ({placeholders})",
+                                  [self._book_row(book) for book in books if book.get('isbn')])
+        return bool(added), added
+
+    def add_members(self, members):
+        """Insert many members in one batch, skipping existing IDs; returns (any_added, number_added)"""
+        verb = "INSERT OR IGNORE" if self.backend == "sqlite" else "INSERT IGNORE"
+        placeholders = ", ".join("?" * len(MEMBER_COLUMNS))
+        added = self._executemany(f"{verb} INTO members ({', '.join(MEMBER_COLUMNS)}) VALUES ({placeholders})",
+                                  [self._member_row(member) for member in members if member.get('member_id')])
+        return bool(added), added
+
+    def authenticate_user(self, member_id, password):
+        rows = self._query("SELECT * FROM members WHERE member_id = ? AND password = ?", (member_id, password))
+        return Member(rows[0]) if rows else None
+
+    def get_all_books(self):
+        return [Book(row) for row in self._query("SELECT * FROM books ORDER BY title")]
+
+    def get_all_members(self):
+        return [Member(row) for row in self._query("SELECT * FROM members ORDER BY name")]
+
+    def get_books_page(self, sort_key='title', offset=0, limit=50, descending=False):
+        if sort_key not in BOOK_SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort_key}")
+        order = "DESC" if descending else "ASC"
+        rows = self._query(f"SELECT * FROM books ORDER BY {sort_key} {order}, isbn {order} LIMIT ? OFFSET ?",
+                           (limit, offset))
+        return [Book(row) for row in rows]
+
+    def get_members_page(self, offset=0, limit=50, descending=False):
+        order = "DESC" if descending else "ASC"
+        rows = self._query(f"SELECT * FROM members ORDER BY name {order}, member_id {order} LIMIT ? OFFSET ?",
+                           (limit, offset))
+        return [Member(row) for row in rows]
+
+    def get_book(self, isbn):
+        rows = self._query("SELECT * FROM books WHERE isbn = ?", (isbn,))
+        return Book(rows[0]) if rows else None
+
+    def get_member(self, member_id):
+        rows = self._query("SELECT * FROM members WHERE member_id = ?", (member_id,))
+        return Member(rows[0]) if rows else None
+
+    def get_book_count(self):
+        return self._query("SELECT COUNT(*) AS n FROM books")[0]["n"]
+
+    def get_member_count(self):
+        return self._query("SELECT COUNT(*) AS n FROM members")[0]["n"]
+
+    def filter_books(self, genre=None, status=None, search_term=None, **ranges):
+        spec = BookFilter(genre, status, search_term, **ranges)
+        clauses, params = [], []
+        for field, values in spec.equals.items():
+            values = sorted(values)
+            clauses.append(f"{field} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if spec.search_term:
+            haystack = ("LOWER(title || author || isbn)" if self.backend == "sqlite"
+                        else "LOWER(CONCAT(title, author, isbn))")
+            clauses.append(f"INSTR({haystack}, ?) > 0")
+            params.append(spec.search_term)
+        for name, (lo, hi) in spec.ranges.items():
+            if name not in ("copies", "available_copies", "publish_year", "pages", "rating"):
+                raise KeyError(f"Unknown column: {name}")
+            clauses.append(f"{name} IS NOT NULL")
+            if lo is not None:
+                clauses.append(f"{name} >= ?")
+                params.append(lo)
+            if hi is not None:
+                clauses.append(f"{name} <= ?")
+                params.append(hi)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return [Book(row) for row in self._query(f"SELECT * FROM books {where} ORDER BY title", params)]
+
+    def query_books(self, genre=None, status=None, search_term=None, **ranges):
+        books = self.filter_books(genre, status, search_term, **ranges)
+        return {"books": books, "total": len(books), "facets": self.get_facets()}
+
+    def get_facets(self):
+        # Grouped counts off the (genre, status) index rather than kept
+        # incrementally; the database already maintains that index
+        genres = self._query("""SELECT genre, COUNT(*) AS books, SUM(available_copies) AS available
+            FROM books WHERE genre IS NOT NULL GROUP BY genre""")
+        statuses = self._query("SELECT status, COUNT(*) AS books FROM books WHERE status IS NOT NULL GROUP BY status")
+        return {"genre": {row["genre"]: row["books"] for row in genres},
+                "status": {**dict.fromkeys(STATUSES, 0), **{row["status"]: row["books"] for row in statuses}},
+                "available_by_genre": {row["genre"]: int(row["available"] or 0) for row in genres}}
+
+    def get_isbn_aliases(self):
+        # Filtered in the database, so only the hyphenated rows come back
+        rows = self._query("SELECT isbn FROM books WHERE isbn LIKE ? OR isbn LIKE ?", ("%-%", "% %"))
+        return list({isbn_digits(row["isbn"]) for row in rows})
+
+    def search_books(self, search_term, search_type='title', limit=20):
+        term = search_term.lower()
+        if search_type == 'keyword':
+            words = tokenize(search_term)
+            if not words:
+                return []
+            text = ("LOWER(title || ' ' || author || ' ' || genre || ' ' || description)"
+                    if self.backend == "sqlite"
+                    else "LOWER(CONCAT_WS(' ', title, author, genre, description))")
+            where = " AND ".join(f"INSTR({text}, ?) > 0" for _ in words)
+            rows = self._query(f"SELECT * FROM books WHERE {where} ORDER BY rating DESC LIMIT ?", (*words, limit))
+            return [Book(row) for row in rows]
+        columns = SEARCH_FIELDS.get(search_type)
+        if columns is None:
+            return []
+        where = " OR ".join(f"INSTR(LOWER({column}), ?) > 0" for column in columns)
+        rows = self._query(f"SELECT * FROM books WHERE {where}", [term] * len(columns))
+        return [Book(row) for row in rows]
+
+    def borrow_book(self, member_id, isbn):
+        now = datetime.now()
+        txn_id = f"TXN{now.strftime('%Y%m%d%H%M%S%f')}"
+        due_date = (now + timedelta(days=30)).date()
+        with self.pool.connection() as conn:
+            if self.backend == "mysql":
+                cursor = conn.cursor()
+                cursor.execute("CALL borrow_book(%s, %s, %s, %s, %s)",
+                               (member_id, isbn, txn_id, now.date(), due_date))
+                status = cursor.fetchone()[0]
+                while cursor.nextset():
+                    pass
+                return status == 0, BORROW_MESSAGES[status]
+            member = self._execute(conn, "SELECT 1 FROM members WHERE member_id = ?", (member_id,)).fetchone()
+            book = self._execute(conn, "SELECT available_copies FROM books WHERE isbn = ?", (isbn,)).fetchone()
+            if not book or not member:
+                return False, BORROW_MESSAGES[1]
+            updated = self._execute(conn, """UPDATE books SET available_copies = available_copies - 1,
+                status = CASE WHEN available_copies = 1 THEN 'Borrowed' ELSE status END
+                WHERE isbn = ? AND available_copies > 0""", (isbn,))
+            if updated.rowcount == 0:
+                return False, BORROW_MESSAGES[2]
+            self._execute(conn, "UPDATE members SET books_borrowed = books_borrowed + 1 WHERE member_id = ?",
+                          (member_id,))
+            self._execute(conn, "INSERT INTO transactions VALUES (?, ?, ?, 'Borrow', ?, ?, NULL, 0.0)",
+                          (txn_id, member_id, isbn, now.date().isoformat(), due_date.isoformat()))
+        return True, BORROW_MESSAGES[0]
+
+    def return_book(self, member_id, isbn):
+        now = datetime.now()
+        txn_id = f"TXN{now.strftime('%Y%m%d%H%M%S%f')}"
+        with self.pool.connection() as conn:
+            if self.backend == "mysql":
+                cursor = conn.cursor()
+                cursor.execute("CALL return_book(%s, %s, %s, %s)", (member_id, isbn, txn_id, now.date()))
+                status = cursor.fetchone()[0]
+                while cursor.nextset():
+                    pass
+                return status == 0, RETURN_MESSAGES[status]
+            member = self._execute(conn, "SELECT books_borrowed FROM members WHERE member_id = ?",
+                                   (member_id,)).fetchone()
+            book = self._execute(conn, "SELECT 1 FROM books WHERE isbn = ?", (isbn,)).fetchone()
+            if not book or not member:
+                return False, RETURN_MESSAGES[1]
+            if member[0] <= 0:
+                return False, RETURN_MESSAGES[2]
+            today = now.date().isoformat()
+            self._execute(conn, """UPDATE books SET available_copies = available_copies + 1,
+                status = CASE WHEN available_copies + 1 > 0 THEN 'Available' ELSE status END
+                WHERE isbn = ?""", (isbn,))
+            self._execute(conn, "UPDATE members SET books_borrowed = books_borrowed - 1 WHERE member_id = ?",
+                          (member_id,))
+            self._execute(conn, """UPDATE transactions SET return_date = ? WHERE id = (
+                SELECT id FROM transactions WHERE member_id = ? AND book_isbn = ? AND type = 'Borrow'
+                AND return_date IS NULL ORDER BY transaction_date DESC, id DESC LIMIT 1)""",
+                          (today, member_id, isbn))
+            self._execute(conn, "INSERT INTO transactions VALUES (?, ?, ?, 'Return', ?, NULL, ?, 0.0)",
+                          (txn_id, member_id, isbn, today, today))
+        return True, RETURN_MESSAGES[0]
+
+    @contextmanager
+    def _circulation_batch(self, member_id, isbns):
+        # One transaction that takes its write locks before reading, so a
+        # batch is checked and applied against the same state: SQLite locks
+        # the database up front, MySQL locks the member row and then the book
+        # rows in ISBN order. Yields (conn, member, {isbn: [available, status]}).
+        with self.pool.connection() as conn, self._batch_lock:
+            lock = ""
+            if self.backend == "mysql":
+                lock = " FOR UPDATE"
+            elif not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            member = self._execute(conn, "SELECT books_borrowed FROM members WHERE member_id = ?" + lock,
+                                   (member_id,)).fetchone()
+            distinct = sorted(set(isbns))
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"""SELECT isbn, available_copies, status FROM books
+                WHERE isbn IN ({", ".join("?" * len(distinct))}) ORDER BY isbn""" + lock), distinct)
+            yield conn, member, {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+            conn.commit()
+
+    def borrow_many(self, member_id, isbns, atomic=False):
+        """Borrow a stack of books in one transaction; returns (success, [(isbn, ok, message)])"""
+        if not isbns:
+            return False, []
+        now = datetime.now()
+        stamp = now.strftime('%Y%m%d%H%M%S%f')
+        due_date = (now + timedelta(days=30)).date().isoformat()
+        with self._circulation_batch(member_id, isbns) as (conn, member, books):
+            results = []
+            for isbn in isbns:
+                book = books.get(isbn)
+                status = 1 if not book or not member else 2 if book[0] <= 0 else 0
+                if status == 0:
+                    book[0] -= 1
+                    if book[0] == 0:
+                        book[1] = 'Borrowed'
+                results.append((isbn, status == 0, BORROW_MESSAGES[status]))
+            borrowed = [isbn for isbn, ok, _ in results if ok]
+            if not borrowed or (atomic and len(borrowed) < len(results)):
+                conn.rollback()
+                return False, _unapplied(results)
+            cursor = conn.cursor()
+            cursor.executemany(self._sql("UPDATE books SET available_copies = ?, status = ? WHERE isbn = ?"),
+                               [(books[isbn][0], books[isbn][1], isbn) for isbn in set(borrowed)])
+            self._execute(conn, "UPDATE members SET books_borrowed = books_borrowed + ? WHERE member_id = ?",
+                          (len(borrowed), member_id))
+            cursor.executemany(self._sql("INSERT INTO transactions VALUES (?, ?, ?, 'Borrow', ?, ?, NULL, 0.0)"),
+                               [(f"TXN{stamp}-{n}", member_id, isbn, now.date().isoformat(), due_date)
+                                for n, isbn in enumerate(borrowed, 1)])
+        return True, results
+
+    def return_many(self, member_id, isbns, atomic=False):
+        """Return a stack of books in one transaction; returns (success, [(isbn, ok, message)])"""
+        if not isbns:
+            return False, []
+        now = datetime.now()
+        stamp = now.strftime('%Y%m%d%H%M%S%f')
+        today = now.date().isoformat()
+        with self._circulation_batch(member_id, isbns) as (conn, member, books):
+            outstanding = member[0] if member else 0
+            results = []
+            for isbn in isbns:
+                book = books.get(isbn)
+                status = 1 if not book or not member else 2 if outstanding <= 0 else 0
+                if status == 0:
+                    outstanding -= 1
+                    book[0] += 1
+                    book[1] = 'Available'
+                results.append((isbn, status == 0, RETURN_MESSAGES[status]))
+            returned = [isbn for isbn, ok, _ in results if ok]
+            if not returned or (atomic and len(returned) < len(results)):
+                conn.rollback()
+                return False, _unapplied(results)
+            cursor = conn.cursor()
+            cursor.executemany(self._sql("UPDATE books SET available_copies = ?, status = ? WHERE isbn = ?"),
+                               [(books[isbn][0], books[isbn][1], isbn) for isbn in set(returned)])
+            self._execute(conn, "UPDATE members SET books_borrowed = ? WHERE member_id = ?",
+                          (outstanding, member_id))
+            if self.backend == "mysql":
+                close_loan = """UPDATE transactions SET return_date = ? WHERE member_id = ? AND book_isbn = ?
+                    AND type = 'Borrow' AND return_date IS NULL ORDER BY transaction_date DESC LIMIT 1"""
+            else:
+                close_loan = """UPDATE transactions SET return_date = ? WHERE id = (
+                    SELECT id FROM transactions WHERE member_id = ? AND book_isbn = ? AND type = 'Borrow'
+                    AND return_date IS NULL ORDER BY transaction_date DESC, id DESC LIMIT 1)"""
+            cursor.executemany(self._sql(close_loan), [(today, member_id, isbn) for isbn in returned])
+            cursor.executemany(self._sql("INSERT INTO transactions VALUES (?, ?, ?, 'Return', ?, NULL, ?, 0.0)"),
+                               [(f"TXN{stamp}-{n}", member_id, isbn, today, today)
+                                for n, isbn in enumerate(returned, 1)])
+        return True, results
+
+    def add_book(self, book_data):
+        isbn = book_data.get('isbn')
+        if not isbn:
+            return False, "ISBN required"
+        if self._query("SELECT 1 AS found FROM books WHERE isbn = ?", (isbn,)):
+            return False, "Book already exists"
+        self.add_books([book_data])
+        return True, "Book added successfully"
+
+    def remove_book(self, isbn):
+        with self.pool.connection() as conn:
+            if self._execute(conn, "DELETE FROM books WHERE isbn = ?", (isbn,)).rowcount == 0:
+                return False, "Book not found"
+        return True, "Book removed successfully"
+
+    def add_member(self, member_data):
+        member_id = member_data.get('member_id')
+        if not member_id:
+            return False, "Member ID required"
+        if self._query("SELECT 1 AS found FROM members WHERE member_id = ?", (member_id,)):
+            return False, "Member already exists"
+        self.add_members([member_data])
+        return True, "Member added successfully"
+
+    def remove_member(self, member_id):
+        with self.pool.connection() as conn:
+            if self._execute(conn, "DELETE FROM members WHERE member_id = ?", (member_id,)).rowcount == 0:
+                return False, "Member not found"
+        return True, "Member removed successfully"
+
+    def place_hold(self, member_id, isbn):
+        with self.pool.connection() as conn:
+            member = self._execute(conn, "SELECT 1 FROM members WHERE member_id = ?", (member_id,)).fetchone()
+            book = self._execute(conn, "SELECT 1 FROM books WHERE isbn = ?", (isbn,)).fetchone()
+            if not book or not member:
+                return False, "Book or member not found"
+            if self._execute(conn, "SELECT 1 FROM reservations WHERE member_id = ? AND book_isbn = ?",
+                             (member_id, isbn)).fetchone():
+                return False, "Hold already placed"
+            self._execute(conn, "INSERT INTO reservations VALUES (?, ?, ?, ?)",
+                          (member_id, isbn, date.today().isoformat(), time.time_ns()))
+        return True, "Hold placed successfully"
+
+    def cancel_hold(self, member_id, isbn):
+        with self.pool.connection() as conn:
+            if self._execute(conn, "DELETE FROM reservations WHERE member_id = ? AND book_isbn = ?",
+                             (member_id, isbn)).rowcount == 0:
+                return False, "Hold not found"
+        return True, "Hold cancelled successfully"
+
+    def _reservations(self, where="", params=(), limit=None):
+        sql = f"SELECT member_id, book_isbn, date_requested FROM reservations {where} ORDER BY seq"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = self._query(sql, params)
+        for row in rows:
+            row["date_requested"] = _as_date(row["date_requested"])
+        return rows
+
+    def get_next_hold(self, isbn):
+        rows = self._reservations("WHERE book_isbn = ?", (isbn,), limit=1)
+        return rows[0] if rows else None
+
+    def get_member_holds(self, member_id):
+        return self._reservations("WHERE member_id = ?", (member_id,))
+
+    def get_hold_count(self, member_id):
+        return self._query("SELECT COUNT(*) AS n FROM reservations WHERE member_id = ?", (member_id,))[0]["n"]
+
+    def get_pending_reservations(self):
+        return self._reservations()
+
+    def _iter_table(self, table, key, batch_size):
+        # Keyset pagination on the primary key: every batch is a short query,
+        # so a long export never holds locks that would stall circulation
+        last = None
+        while True:
+            if last is None:
+                rows = self._query(f"SELECT * FROM {table} ORDER BY {key} LIMIT ?", (batch_size,))
+            else:
+                rows = self._query(f"SELECT * FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?",
+                                   (last, batch_size))
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][key]
+
+    def iter_books(self, batch_size=1000):
+        return (Book(row) for row in self._iter_table("books", "isbn", batch_size))
+
+    def iter_members(self, batch_size=1000):
+        return (Member(row) for row in self._iter_table("members", "member_id", batch_size))
+
+    def iter_transactions(self, batch_size=1000):
+        return (self._transaction(row) for row in self._iter_table("transactions", "id", batch_size))
+
+    def get_transactions(self, member_id=None, limit=10):
+        if member_id is None:
+            rows = self._query("SELECT * FROM transactions ORDER BY transaction_date DESC, id DESC LIMIT ?",
+                               (limit,))
+        else:
+            rows = self._query("SELECT * FROM transactions WHERE member_id = ? "
+                               "ORDER BY transaction_date DESC, id DESC LIMIT ?", (member_id, limit))
+        return [self._transaction(row) for row in rows]
+
+    def get_open_loans(self, member_id):
+        rows = self._query("SELECT * FROM transactions WHERE member_id = ? AND type = 'Borrow' "
+                           "AND return_date IS NULL", (member_id,))
+        return [self._transaction(row) for row in rows]
+
+    def get_overdue_loans(self, as_of=None):
+        """Open loans due before as_of (default today), oldest first"""
+        rows = self._query("SELECT * FROM transactions WHERE type = 'Borrow' AND return_date IS NULL "
+                           "AND due_date < ? ORDER BY due_date, id", (_as_day(as_of).isoformat(),))
+        return [self._transaction(row) for row in rows]
+
+    def get_overdue_count(self, as_of=None):
+        rows = self._query("SELECT COUNT(*) AS overdue FROM transactions WHERE type = 'Borrow' "
+                           "AND return_date IS NULL AND due_date < ?", (_as_day(as_of).isoformat(),))
+        return rows[0]["overdue"]
+
+    def accrue_fines(self, as_of=None, rate=FINE_PER_DAY, max_fine=MAX_FINE):
+        """Nightly fine run as three set-based statements in one transaction:
+        total the new charges, add them to the members, then raise each
+        overdue loan's fine_amount to rate per day overdue (at most max_fine).
+        Returns (any_charged, total_added)."""
+        today = _as_day(as_of).isoformat()
+        days = "julianday(?) - julianday(due_date)" if self.backend == "sqlite" else "DATEDIFF(?, due_date)"
+        owed = f"ROUND(({days}) * ?, 2)"
+        params = (today, rate)
+        if max_fine is not None:
+            owed = f"{'MIN' if self.backend == 'sqlite' else 'LEAST'}({owed}, ?)"
+            params += (max_fine,)
+        charged = (f"type = 'Borrow' AND return_date IS NULL AND due_date < ? AND {owed} > fine_amount")
+        charged_params = (today,) + params
+        with self.pool.connection() as conn, self._batch_lock:
+            total = self._execute(conn, f"SELECT SUM({owed} - fine_amount) FROM transactions WHERE {charged}",
+                                  params + charged_params).fetchone()[0]
+            if not total:
+                return False, 0.0
+            self._execute(conn, f"""UPDATE members SET fine_amount = ROUND(fine_amount + (
+                    SELECT SUM({owed} - fine_amount) FROM transactions
+                    WHERE transactions.member_id = members.member_id AND {charged}), 2)
+                WHERE member_id IN (SELECT member_id FROM transactions WHERE {charged})""",
+                          params + charged_params + charged_params)
+            self._execute(conn, f"UPDATE transactions SET fine_amount = {owed} WHERE {charged}",
+                          params + charged_params)
+        return True, round(float(total), 2)
+
+    def close_connection(self):
+        self.pool.close_all()
+        self._prepared.clear()
+        print("Database connection closed")
@@ -0,0 +1,107 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime
+
+from records import Book, Member, Transaction
+
+# Streaming export of books, members and the transaction ledger to CSV or
+# JSON lines, optionally gzipped. Records are pulled one at a time from the
+# backend's lazy iter_books / iter_members / iter_transactions walks and
+# written straight out, so memory stays flat however large the collection is.
+# Each file is written under a temporary name and renamed when complete.
+
+KINDS = {
+    "books": ("iter_books", "get_all_books", Book.fields),
+    "members": ("iter_members", "get_all_members", Member.fields),
+    "transactions": ("iter_transactions", None, Transaction.fields),
+}
+FORMATS = ("csv", "jsonl")
+
+def _value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def iter_collection(source, kind):
+    """Lazily iterate one collection of a backend, falling back to its get_all_* list"""
+    iter_name, list_name, _ = KINDS[kind]
+    method = getattr(source, iter_name, None) or getattr(source, list_name or "", None)
+    if method is None:
+        # An empty file would pass for a complete backup of an empty collection
+        raise ValueError(f"{type(source).__name__} cannot list its {kind}")
+    return iter(method())
+
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+def write_records(records, path, fields, fmt=None):
+    """Write mappings to path as CSV (fixed `fields` columns) or JSON lines; returns the count"""
+    fmt = fmt or ("csv" if path.lower().removesuffix(".gz").endswith(".csv") else "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    count = 0
+    tmp_path = path + ".tmp"
+    with _open(tmp_path, path.lower().endswith(".gz")) as out:
+        if fmt == "csv":
+            writer = csv.writer(out)
+            writer.writerow(fields)
+            for record in records:
+                writer.writerow([_value(record.get(field)) for field in fields])
+                count += 1
+        else:
+            for record in records:
+                out.write(json.dumps({key: _value(value) for key, value in record.items()}) + "\n")
+                count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def export_collection(source, kind, path, fmt=None):
+    """Export one collection ("books", "members" or "transactions") of source to path"""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {tuple(KINDS)}")
+    return write_records(iter_collection(source, kind), path, KINDS[kind][2], fmt)
+
+def backup(source, directory, fmt="jsonl", compress=True):
+    """Export every collection of source into a timestamped folder under directory.
+    Returns (folder, {kind: count})."""
+    folder = os.path.join(directory, f"library-backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(folder, exist_ok=True)
+    counts = {}
+    for kind in KINDS:
+        path = os.path.join(folder, f"{kind}.{fmt}" + (".gz" if compress else ""))
+        counts[kind] = export_collection(source, kind, path, fmt)
+    return folder, counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up a library store to CSV/JSONL files")
+    parser.add_argument("directory")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--no-compress", action="store_true")
+    store = parser.add_mutually_exclusive_group(required=True)
+    store.add_argument("--data-dir", help="in-memory store persisted in this directory")
+    store.add_argument("--sqlite", help="SQLite database file")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from database_manager import DatabaseManager
+        source = DatabaseManager(database=args.sqlite, backend="sqlite")
+    else:
+        from database_manager import InMemoryDatabaseManager
+        source = InMemoryDatabaseManager(data_dir=args.data_dir)
+
+    try:
+        start = time.perf_counter()
+        folder, counts = backup(source, args.directory, args.format, not args.no_compress)
+        summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+        print(f"✅ Backed up {summary} to {folder} in {time.perf_counter() - start:.1f}s")
+    finally:
+        source.close_connection()
+
+if __name__ == "__main__":
+    main()
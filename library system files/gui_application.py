@@ -1,7 +1,176 @@
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox, filedialog
+from query_engine import STATUSES, BookFilter
+
+# Book list that keeps only the visible window of rows in the Treeview.
+# Rows come from fetch(offset, limit), cached a page at a time; scrolling
+# re-renders the window by diffing it against the rows already shown (keyed
+# by ISBN), and patch() updates a single book in place.
+class VirtualBookList:
+    COLUMNS = ("ISBN", "Title", "Author", "Genre", "Status", "Copies")
+    PAGE_SIZE = 200
+
+    def __init__(self, parent, height=15, page_size=PAGE_SIZE):
+        self.height = height
+        self.page_size = page_size
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=self.COLUMNS, show="headings",
+                                 selectmode='browse', height=height)
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, minwidth=50, width=120)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient='vertical', command=self.scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll("scroll", 1, "units"))
+        self.tree.bind("<Up>", lambda e: self._step(-1))
+        self.tree.bind("<Down>", lambda e: self._step(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll("scroll", -1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll("scroll", 1, "pages"))
+        self.tree.bind("<<TreeviewSelect>>", self._remember_selection)
+        self.count = 0
+        self.top = 0
+        self.fetch = lambda offset, limit: []
+        self.rows = None
+        self.pages = {}
+        self.shown = {}
+        self.selected = None
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def set_rows(self, books):
+        """Show an already materialised list of books"""
+        rows = list(books)
+        self.set_source(len(rows), lambda offset, limit: rows[offset:offset + limit])
+        self.rows = rows
+
+    def set_source(self, count, fetch, first_page=None):
+        """Show count books read on demand through fetch(offset, limit)"""
+        self.rows = None
+        self.count = count
+        self.fetch = fetch
+        self.pages = {0: first_page} if first_page is not None else {}
+        self.top = 0
+        self.render()
+
+    @staticmethod
+    def values(book):
+        return (book.get('isbn', ''), book.get('title', ''), book.get('author', ''),
+                book.get('genre', ''), book.get('status', ''), book.get('copies', 0))
+
+    def _page(self, number):
+        page = self.pages.get(number)
+        if page is None:
+            page = self.pages[number] = list(self.fetch(number * self.page_size, self.page_size))
+        return page
+
+    def window(self):
+        books = []
+        position = self.top
+        end = min(self.top + self.height, self.count)
+        while position < end:
+            page = self._page(position // self.page_size)
+            start = position % self.page_size
+            chunk = page[start:start + end - position]
+            if not chunk:
+                break
+            books.extend(chunk)
+            position += len(chunk)
+        return books
+
+    def render(self):
+        rows = [(book['isbn'], self.values(book)) for book in self.window()]
+        wanted = {isbn for isbn, _ in rows}
+        for isbn in [isbn for isbn in self.shown if isbn not in wanted]:
+            self.tree.delete(isbn)
+            del self.shown[isbn]
+        children = self.tree.get_children()
+        for index, (isbn, values) in enumerate(rows):
+            if isbn not in self.shown:
+                self.tree.insert('', index, iid=isbn, values=values)
+            else:
+                if self.shown[isbn] != values:
+                    self.tree.item(isbn, values=values)
+                if index >= len(children) or children[index] != isbn:
+                    self.tree.move(isbn, '', index)
+            self.shown[isbn] = values
+        if self.selected in self.shown and self.selected not in self.tree.selection():
+            self.tree.selection_set(self.selected)
+        if self.count:
+            self.scrollbar.set(self.top / self.count, min(1.0, (self.top + self.height) / self.count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, action, amount=None, unit=None):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"|"pages")"""
+        if action == "moveto":
+            top = int(float(amount) * self.count)
+        else:
+            top = self.top + int(amount) * (self.height if unit == "pages" else 1)
+        top = max(0, min(top, self.count - self.height))
+        if top != self.top:
+            self.top = top
+            self.render()
+        return "break"
+
+    def _step(self, delta):
+        # Arrow keys move the selection and scroll at the window edges
+        children = self.tree.get_children()
+        if not children:
+            return "break"
+        selection = self.tree.selection()
+        index = children.index(selection[0]) + delta if selection else 0
+        if index < 0 or index >= len(children):
+            self.scroll("scroll", delta, "units")
+            children = self.tree.get_children()
+            index = max(0, min(index, len(children) - 1))
+        self.tree.selection_set(children[index])
+        self.tree.see(children[index])
+        return "break"
+
+    def _remember_selection(self, event=None):
+        selection = self.tree.selection()
+        if selection:
+            self.selected = selection[0]
+
+    def selected_isbn(self):
+        selection = self.tree.selection()
+        return selection[0] if selection else None
+
+    def patch(self, book):
+        """Refresh one book's row in place after it changed"""
+        isbn = book['isbn']
+        for page in [self.rows or ()] + list(self.pages.values()):
+            for i, cached in enumerate(page):
+                if cached['isbn'] == isbn:
+                    page[i] = book
+        values = self.values(book)
+        if isbn in self.shown and self.shown[isbn] != values:
+            self.tree.item(isbn, values=values)
+            self.shown[isbn] = values
+
+    def remove(self, isbn):
+        """Drop one book that was deleted from the catalog"""
+        if self.rows is not None:
+            remaining = [book for book in self.rows if book['isbn'] != isbn]
+            if len(remaining) == len(self.rows):
+                return
+            self.rows[:] = remaining
+        self.count = max(0, self.count - 1)
+        self.pages = {}
+        self.top = max(0, min(self.top, self.count - self.height))
+        self.render()
 
 class LibraryGUI:
+    SEARCH_DEBOUNCE_MS = 250
+    SEARCH_POLL_MS = 20
+    HOLD_SWEEP_MS = 15 * 60 * 1000
+
     def __init__(self, system=None, db=None):
         self.system = system
         self.db = db
@@ -17,6 +186,10 @@ class LibraryGUI:
 
         self.setup_themes()
         self.frames = {}
+        # Searches run here, off the Tk thread; see run_search
+        self.search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search")
+        self.searches = {}
+        self.genre_filters = {}
 
         self.create_login_frame()
         self.create_student_dashboard()
@@ -24,6 +197,7 @@ class LibraryGUI:
         self.create_admin_dashboard()
 
         self.show_frame("Login")
+        self.root.after(self.HOLD_SWEEP_MS, self.sweep_holds)
 
     def setup_themes(self):
         self.student_colors = {
@@ -234,6 +408,7 @@ class LibraryGUI:
         self.student_search_entry = ttk.Entry(search_frame, textvariable=self.student_search_var)
         self.student_search_entry.pack(side='left', padx=5)
         self.student_search_entry.bind("<Return>", lambda e: self.student_search_books())
+        self.student_search_var.trace_add("write", lambda *args: self.student_search_books(debounce=True))
 
         ttk.Label(search_frame, text="Filter Genre:").pack(side='left', padx=(20,2))
         self.student_genre_var = tk.StringVar()
@@ -244,17 +419,15 @@ class LibraryGUI:
         ttk.Label(search_frame, text="Filter Availability:").pack(side='left', padx=(20,2))
         self.student_avail_var = tk.StringVar()
         self.student_avail_filter = ttk.Combobox(search_frame, textvariable=self.student_avail_var, state="readonly")
-        self.student_avail_filter['values'] = ["All", "Available", "Borrowed"]
+        self.student_avail_filter['values'] = ["All", *STATUSES]
         self.student_avail_filter.current(0)
         self.student_avail_filter.pack(side='left', padx=5)
         self.student_avail_filter.bind("<<ComboboxSelected>>", lambda e: self.student_search_books())
 
-        columns = ("ISBN", "Title", "Author", "Genre", "Status", "Copies")
-        self.student_tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode='browse')
-        for col in columns:
-            self.student_tree.heading(col, text=col)
-            self.student_tree.column(col, minwidth=50, width=120)
-        self.student_tree.pack(fill='both', expand=True, padx=10, pady=10)
+        self.student_list = VirtualBookList(frame)
+        self.genre_filters[self.student_list] = self.student_genre_filter
+        self.student_list.pack(fill='both', expand=True, padx=10, pady=10)
+        self.student_tree = self.student_list.tree
 
         btn_frame = ttk.Frame(frame)
         btn_frame.pack(pady=10)
@@ -269,56 +442,27 @@ class LibraryGUI:
         self.student_logout_btn.pack(side='left', padx=10)
 
     def build_student_dashboard(self):
-        genres = set(book["genre"] for book in self.get_all_books())
-        genre_list = ["All"] + sorted(genres)
-        self.student_genre_filter['values'] = genre_list
+        self.student_genre_filter['values'] = self.genre_choices()
         self.student_genre_filter.current(0)
         self.student_avail_filter.current(0)
         self.student_search_var.set("")
         self.update_student_book_list()
 
-    def student_search_books(self):
-        self.update_student_book_list()
-
-    def update_student_book_list(self):
-        search_term = self.student_search_var.get().lower()
-        genre_filter = self.student_genre_var.get()
-        avail_filter = self.student_avail_var.get()
-
-        books = self.get_all_books()
+    def student_search_books(self, debounce=False):
+        self.update_student_book_list(self.SEARCH_DEBOUNCE_MS if debounce else 0)
 
-        filtered = []
-        for book in books:
-            if search_term and search_term not in (book['title'].lower() + book['author'].lower() + book['isbn'].lower()):
-                continue
-            if genre_filter and genre_filter != "All" and book['genre'] != genre_filter:
-                continue
-            if avail_filter == "Available" and book['status'] != "Available":
-                continue
-            if avail_filter == "Borrowed" and book['status'] != "Borrowed":
-                continue
-            filtered.append(book)
-
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
-
-        for book in filtered:
-            self.student_tree.insert('', 'end', values=(
-                book.get('isbn', ''),
-                book.get('title', ''),
-                book.get('author', ''),
-                book.get('genre', ''),
-                book.get('status', ''),
-                book.get('copies', 0)
-            ))
+    def update_student_book_list(self, delay=0):
+        def read_filters():
+            return (self.student_search_var.get().lower(), self.student_genre_var.get(),
+                    self.student_avail_var.get())
+        self.schedule_search(self.student_list, read_filters, delay)
 
     def student_borrow_book(self):
-        selected = self.student_tree.selection()
-        if not selected:
+        isbn = self.student_list.selected_isbn()
+        if not isbn:
             messagebox.showwarning("No Selection", "Please select a book to borrow")
             return
 
-        isbn = self.student_tree.item(selected[0])['values'][0]
         member_id = self.current_user.get('member_id')
         if self.db:
             success, msg = self.db.borrow_book(member_id, isbn)
@@ -326,18 +470,17 @@ class LibraryGUI:
             success, msg = self.system.borrow_book(member_id, isbn)
 
         if success:
+            self.refresh_book(self.student_list, isbn)
             messagebox.showinfo("Success", msg)
-            self.update_student_book_list()
         else:
             messagebox.showerror("Error", msg)
 
     def student_return_book(self):
-        selected = self.student_tree.selection()
-        if not selected:
+        isbn = self.student_list.selected_isbn()
+        if not isbn:
             messagebox.showwarning("No Selection", "Please select a book to return")
             return
 
-        isbn = self.student_tree.item(selected[0])['values'][0]
         member_id = self.current_user.get('member_id')
         if self.db:
             success, msg = self.db.return_book(member_id, isbn)
@@ -345,8 +488,8 @@ class LibraryGUI:
             success, msg = self.system.return_book(member_id, isbn)
 
         if success:
+            self.refresh_book(self.student_list, isbn)
             messagebox.showinfo("Success", msg)
-            self.update_student_book_list()
         else:
             messagebox.showerror("Error", msg)
 
@@ -365,6 +508,7 @@ class LibraryGUI:
         self.lib_search_entry = ttk.Entry(search_frame, textvariable=self.lib_search_var)
         self.lib_search_entry.pack(side='left', padx=5)
         self.lib_search_entry.bind("<Return>", lambda e: self.librarian_search_books())
+        self.lib_search_var.trace_add("write", lambda *args: self.librarian_search_books(debounce=True))
 
         ttk.Label(search_frame, text="Filter Genre:").pack(side='left', padx=(20,2))
         self.lib_genre_var = tk.StringVar()
@@ -375,17 +519,15 @@ class LibraryGUI:
         ttk.Label(search_frame, text="Filter Availability:").pack(side='left', padx=(20,2))
         self.lib_avail_var = tk.StringVar()
         self.lib_avail_filter = ttk.Combobox(search_frame, textvariable=self.lib_avail_var, state="readonly")
-        self.lib_avail_filter['values'] = ["All", "Available", "Borrowed"]
+        self.lib_avail_filter['values'] = ["All", *STATUSES]
         self.lib_avail_filter.current(0)
         self.lib_avail_filter.pack(side='left', padx=5)
         self.lib_avail_filter.bind("<<ComboboxSelected>>", lambda e: self.librarian_search_books())
 
-        columns = ("ISBN", "Title", "Author", "Genre", "Status", "Copies")
-        self.lib_tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode='browse')
-        for col in columns:
-            self.lib_tree.heading(col, text=col)
-            self.lib_tree.column(col, minwidth=50, width=120)
-        self.lib_tree.pack(fill='both', expand=True, padx=10, pady=10)
+        self.lib_list = VirtualBookList(frame)
+        self.genre_filters[self.lib_list] = self.lib_genre_filter
+        self.lib_list.pack(fill='both', expand=True, padx=10, pady=10)
+        self.lib_tree = self.lib_list.tree
 
         btn_frame = ttk.Frame(frame)
         btn_frame.pack(pady=10)
@@ -406,56 +548,27 @@ class LibraryGUI:
         self.lib_logout_btn.pack(side='left', padx=5)
 
     def build_librarian_dashboard(self):
-        genres = set(book["genre"] for book in self.get_all_books())
-        genre_list = ["All"] + sorted(genres)
-        self.lib_genre_filter['values'] = genre_list
+        self.lib_genre_filter['values'] = self.genre_choices()
         self.lib_genre_filter.current(0)
         self.lib_avail_filter.current(0)
         self.lib_search_var.set("")
         self.update_librarian_book_list()
 
-    def librarian_search_books(self):
-        self.update_librarian_book_list()
-
-    def update_librarian_book_list(self):
-        search_term = self.lib_search_var.get().lower()
-        genre_filter = self.lib_genre_var.get()
-        avail_filter = self.lib_avail_var.get()
-
-        books = self.get_all_books()
+    def librarian_search_books(self, debounce=False):
+        self.update_librarian_book_list(self.SEARCH_DEBOUNCE_MS if debounce else 0)
 
-        filtered = []
-        for book in books:
-            if search_term and search_term not in (book['title'].lower() + book['author'].lower() + book['isbn'].lower()):
-                continue
-            if genre_filter and genre_filter != "All" and book['genre'] != genre_filter:
-                continue
-            if avail_filter == "Available" and book['status'] != "Available":
-                continue
-            if avail_filter == "Borrowed" and book['status'] != "Borrowed":
-                continue
-            filtered.append(book)
-
-        for item in self.lib_tree.get_children():
-            self.lib_tree.delete(item)
-
-        for book in filtered:
-            self.lib_tree.insert('', 'end', values=(
-                book.get('isbn', ''),
-                book.get('title', ''),
-                book.get('author', ''),
-                book.get('genre', ''),
-                book.get('status', ''),
-                book.get('copies', 0)
-            ))
+    def update_librarian_book_list(self, delay=0):
+        def read_filters():
+            return (self.lib_search_var.get().lower(), self.lib_genre_var.get(),
+                    self.lib_avail_var.get())
+        self.schedule_search(self.lib_list, read_filters, delay)
 
     def librarian_borrow_book(self):
-        selected = self.lib_tree.selection()
-        if not selected:
+        isbn = self.lib_list.selected_isbn()
+        if not isbn:
             messagebox.showwarning("No Selection", "Please select a book to borrow")
             return
 
-        isbn = self.lib_tree.item(selected[0])['values'][0]
         member_id = self.current_user.get('member_id')
         if self.db:
             success, msg = self.db.borrow_book(member_id, isbn)
@@ -463,18 +576,17 @@ class LibraryGUI:
             success, msg = self.system.borrow_book(member_id, isbn)
 
         if success:
+            self.refresh_book(self.lib_list, isbn)
             messagebox.showinfo("Success", msg)
-            self.update_librarian_book_list()
         else:
             messagebox.showerror("Error", msg)
 
     def librarian_return_book(self):
-        selected = self.lib_tree.selection()
-        if not selected:
+        isbn = self.lib_list.selected_isbn()
+        if not isbn:
             messagebox.showwarning("No Selection", "Please select a book to return")
             return
 
-        isbn = self.lib_tree.item(selected[0])['values'][0]
         member_id = self.current_user.get('member_id')
         if self.db:
             success, msg = self.db.return_book(member_id, isbn)
@@ -482,8 +594,8 @@ class LibraryGUI:
             success, msg = self.system.return_book(member_id, isbn)
 
         if success:
+            self.refresh_book(self.lib_list, isbn)
             messagebox.showinfo("Success", msg)
-            self.update_librarian_book_list()
         else:
             messagebox.showerror("Error", msg)
 
@@ -530,21 +642,20 @@ class LibraryGUI:
             messagebox.showerror("Error", msg)
 
     def librarian_remove_book(self):
-        selected = self.lib_tree.selection()
-        if not selected:
+        isbn = self.lib_list.selected_isbn()
+        if not isbn:
             messagebox.showwarning("No Selection", "Please select a book to remove")
             return
-        isbn = self.lib_tree.item(selected[0])['values'][0]
         if messagebox.askyesno("Confirm", f"Remove book with ISBN {isbn}?"):
             if self.db:
-                if isbn in self.db.books:
-                    del self.db.books[isbn]
-                    messagebox.showinfo("Removed", "Book removed successfully")
-                else:
-                    messagebox.showerror("Error", "Book not found")
+                success, msg = self.db.remove_book(isbn)
             else:
-                messagebox.showerror("Error", "Remove not supported in this backend")
-            self.update_librarian_book_list()
+                success, msg = self.system.remove_book(isbn)
+            if success:
+                self.lib_list.remove(isbn)
+                messagebox.showinfo("Removed", msg)
+            else:
+                messagebox.showerror("Error", msg)
 
     def create_admin_dashboard(self):
         frame = ttk.Frame(self.root)
@@ -562,7 +673,37 @@ class LibraryGUI:
 
         ttk.Label(frame, text="System Monitoring:", font=("Segoe UI", 12, "bold")).pack(pady=(10, 5))
         ttk.Button(frame, text="View Audit Logs").pack(pady=2)
-        ttk.Button(frame, text="Backup Database").pack(pady=2)
+        ttk.Button(frame, text="Backup Database", command=self.backup_database).pack(pady=2)
+
+    def backup_database(self):
+        # Export runs on a worker thread so the dashboard (and circulation)
+        # stay responsive; the main loop polls for the result
+        source = self.db or self.system
+        directory = filedialog.askdirectory(title="Choose backup folder")
+        if not source or not directory:
+            return
+        from exporter import backup
+        result = {}
+
+        def work():
+            try:
+                result["value"] = backup(source, directory)
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=work, daemon=True)
+        worker.start()
+
+        def check():
+            if worker.is_alive():
+                self.root.after(200, check)
+            elif "error" in result:
+                messagebox.showerror("Backup Failed", str(result["error"]))
+            else:
+                folder, counts = result["value"]
+                summary = "\n".join(f"{kind}: {count}" for kind, count in counts.items())
+                messagebox.showinfo("Backup Complete", f"Saved to {folder}\n\n{summary}")
+        check()
 
     def build_admin_dashboard(self):
         pass
@@ -574,6 +715,94 @@ class LibraryGUI:
             return self.system.get_all_books()
         return []
 
+    def schedule_search(self, book_list, read_filters, delay=0):
+        # Debounce: each call replaces the search still waiting to start
+        state = self.searches.setdefault(book_list, {"generation": 0, "after": None, "cancel": None})
+        if state["after"] is not None:
+            self.root.after_cancel(state["after"])
+            state["after"] = None
+        if delay:
+            state["after"] = self.root.after(delay, lambda: self.schedule_search(book_list, read_filters))
+        else:
+            self.run_search(book_list, *read_filters())
+
+    def run_search(self, book_list, search_term, genre_filter, avail_filter):
+        # The query runs on the search executor; a newer search cancels it and
+        # its result, if it still arrives, is dropped. The Tk thread polls for
+        # the result with root.after and is the only one that touches widgets.
+        state = self.searches.setdefault(book_list, {"generation": 0, "after": None, "cancel": None})
+        if state["cancel"] is not None:
+            state["cancel"].set()
+        state["generation"] += 1
+        generation = state["generation"]
+        cancel = state["cancel"] = threading.Event()
+        future = self.search_executor.submit(self.fetch_books, search_term, genre_filter, avail_filter, cancel)
+
+        def check():
+            if generation != state["generation"]:
+                future.cancel()
+            elif not future.done():
+                self.root.after(self.SEARCH_POLL_MS, check)
+            elif future.exception() is not None:
+                messagebox.showerror("Search Failed", str(future.exception()))
+            else:
+                count, fetch, rows, facets = future.result()
+                if facets is not None and book_list in self.genre_filters:
+                    self.genre_filters[book_list]['values'] = self.genre_choices(facets)
+                if fetch is not None:
+                    book_list.set_source(count, fetch, rows)
+                else:
+                    book_list.set_rows(rows)
+        check()
+
+    def fetch_books(self, search_term, genre_filter, avail_filter, cancel=None):
+        """Backend side of a dashboard search, safe to run off the Tk thread.
+        Returns (count, fetch, first_page, facets) for the pageable unfiltered
+        catalog, (count, None, rows, facets) otherwise, or None once cancel is
+        set; facets is None when the backend does not keep them."""
+        source = self.db or self.system
+        unfiltered = not search_term and genre_filter in ("", "All") and avail_filter in ("", "All")
+        if not unfiltered and hasattr(source, 'query_books'):
+            # One call: matches from the backend's genre/status/search indexes, plus facets
+            result = source.query_books(genre=genre_filter, status=avail_filter, search_term=search_term or None)
+            return result["total"], None, result["books"], result["facets"]
+        facets = source.get_facets() if hasattr(source, 'get_facets') else None
+        if unfiltered and hasattr(source, 'get_books_page') and hasattr(source, 'get_book_count'):
+            # The unfiltered catalog is paged straight from the backend's sorted index
+            def fetch(offset, limit):
+                return source.get_books_page('title', offset, limit)
+            return source.get_book_count(), fetch, fetch(0, VirtualBookList.PAGE_SIZE), facets
+        spec = BookFilter(genre_filter, avail_filter, search_term)
+        filtered = []
+        for n, book in enumerate(self.get_all_books()):
+            if cancel is not None and n % 1024 == 0 and cancel.is_set():
+                return None
+            if spec.matches(book):
+                filtered.append(book)
+        return len(filtered), None, filtered, facets
+
+    def genre_choices(self, facets=None):
+        if facets is None:
+            source = self.db or self.system
+            if hasattr(source, 'get_facets'):
+                facets = source.get_facets()
+            else:
+                return ["All"] + sorted(set(book["genre"] for book in self.get_all_books()))
+        return ["All"] + sorted(facets["genre"])
+
+    def get_book(self, isbn):
+        if self.db and hasattr(self.db, 'get_book'):
+            return self.db.get_book(isbn)
+        if self.system and hasattr(self.system, 'search_book'):
+            return self.system.search_book(isbn)
+        return next((book for book in self.get_all_books() if book['isbn'] == isbn), None)
+
+    def refresh_book(self, book_list, isbn):
+        # Patch the one row a borrow/return changed instead of reloading the list
+        book = self.get_book(isbn)
+        if book is not None:
+            book_list.patch(book)
+
     def get_all_members(self):
         if self.db:
             return self.db.get_all_members()
@@ -581,25 +810,37 @@ class LibraryGUI:
             return self.system.get_all_members()
         return []
 
+    def sweep_holds(self):
+        # Pass lapsed pickups on to the next patron in line, off the Tk thread
+        source = self.db if self.db is not None else self.system
+        if hasattr(source, "expire_holds"):
+            self.search_executor.submit(source.expire_holds)
+        self.root.after(self.HOLD_SWEEP_MS, self.sweep_holds)
+
     def logout(self):
         self.current_user = None
         self.show_frame("Login")
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.search_executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
+    from records import Book, Member
+
     class DummyDB:
         def __init__(self):
             self.users = {
-                "student1": {"password": "pass", "role": "Student", "member_id": "student1"},
-                "librarian1": {"password": "pass", "role": "Librarian", "member_id": "librarian1"},
-                "admin1": {"password": "pass", "role": "Administrator", "member_id": "admin1"}
+                "student1": Member({"password": "pass", "role": "Student", "member_id": "student1"}),
+                "librarian1": Member({"password": "pass", "role": "Librarian", "member_id": "librarian1"}),
+                "admin1": Member({"password": "pass", "role": "Administrator", "member_id": "admin1"})
             }
             self.books = {
-                "978-0321765723": {"isbn": "978-0321765723", "title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "genre": "Classic", "status": "Available", "copies": 5},
-                "978-0743273565": {"isbn": "978-0743273565", "title": "1984", "author": "George Orwell", "genre": "Dystopian", "status": "Borrowed", "copies": 0},
-                "978-0451524935": {"isbn": "978-0451524935", "title": "To Kill a Mockingbird", "author": "Harper Lee", "genre": "Classic", "status": "Available", "copies": 3}
+                "978-0321765723": Book({"isbn": "978-0321765723", "title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "genre": "Classic", "status": "Available", "copies": 5}),
+                "978-0743273565": Book({"isbn": "978-0743273565", "title": "1984", "author": "George Orwell", "genre": "Dystopian", "status": "Borrowed", "copies": 0}),
+                "978-0451524935": Book({"isbn": "978-0451524935", "title": "To Kill a Mockingbird", "author": "Harper Lee", "genre": "Classic", "status": "Available", "copies": 3})
             }
             self.borrowed_books = {}
 
@@ -651,9 +892,14 @@ if __name__ == "__main__":
             isbn = book_data.get('isbn')
             if isbn in self.books:
                 return False, "Book with this ISBN already exists."
-            self.books[isbn] = book_data
+            self.books[isbn] = Book(book_data)
             return True, "Book added successfully."
 
+        def remove_book(self, isbn):
+            if self.books.pop(isbn, None) is None:
+                return False, "Book not found."
+            return True, "Book removed successfully."
+
         def get_all_members(self):
             return list(self.users.values())
 
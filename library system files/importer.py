@@ -0,0 +1,247 @@
+import argparse
+import csv
+import gzip
+import json
+import re
+import time
+
+from exporter import iter_collection
+from search_index import isbn_digits
+
+# Streaming import of catalog (books) and patron (members) files. Rows are
+# read lazily from CSV or JSON-lines files (optionally gzipped), validated,
+# de-duplicated within each chunk and handed to the target's add_books /
+# add_members in chunks, so memory stays bounded by the chunk size no matter
+# how large the file is. ISBNs are stored in normalized form (no hyphens or
+# spaces), the same form they are de-duplicated on, so the target's own
+# "skip existing ISBNs" check catches duplicates spread across chunks. Catalog
+# entries stored with hyphens are matched through their normalized form too.
+
+BOOK_INT_FIELDS = ("copies", "available_copies", "publish_year", "pages")
+BOOK_FLOAT_FIELDS = ("rating",)
+MEMBER_INT_FIELDS = ("books_borrowed",)
+MEMBER_FLOAT_FIELDS = ("fine_amount",)
+MEMBER_ROLES = ("Student", "Faculty", "Librarian", "Administrator")
+FORMATS = ("csv", "jsonl")
+
+_ISBN_RE = re.compile(r"^(\d{9}[\dX]|\d{13})$")
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass fmt='csv' or fmt='jsonl'")
+
+def _open(path):
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+def iter_rows(path, fmt=None):
+    """Yield (line_number, row) for each record; row is None for unparseable lines"""
+    fmt = fmt or detect_format(path)
+    with _open(path) as source:
+        if fmt == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        elif fmt == "jsonl":
+            for line_number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_number, row if isinstance(row, dict) else None
+        else:
+            raise ValueError(f"fmt must be one of {FORMATS}")
+
+def normalize_isbn(isbn):
+    """ISBN with spaces and hyphens removed, or None if it is not ISBN-10/13 shaped"""
+    digits = isbn_digits(isbn)
+    return digits if _ISBN_RE.match(digits) else None
+
+def _clean(row):
+    # CSV gives every column as a string; empty cells mean "use the default"
+    record = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                continue
+        if value is not None:
+            record[key.strip()] = value
+    return record
+
+def _convert(record, int_fields, float_fields):
+    for field in int_fields:
+        if field in record:
+            record[field] = int(float(record[field]))
+    for field in float_fields:
+        if field in record:
+            record[field] = float(record[field])
+
+def validate_book(row):
+    """Return (book, None) for a usable catalog row, or (None, reason)"""
+    book = _clean(row)
+    isbn = book.get("isbn")
+    if not isbn:
+        return None, "missing isbn"
+    book["isbn"] = normalize_isbn(isbn)
+    if book["isbn"] is None:
+        return None, f"malformed isbn {str(isbn).strip()!r}"
+    if not book.get("title"):
+        return None, "missing title"
+    try:
+        _convert(book, BOOK_INT_FIELDS, BOOK_FLOAT_FIELDS)
+    except (TypeError, ValueError) as e:
+        return None, f"bad number: {e}"
+    copies = book.get("copies", 1)
+    if copies < 0 or not 0 <= book.get("available_copies", copies) <= copies:
+        return None, "copy counts out of range"
+    return book, None
+
+def validate_member(row):
+    """Return (member, None) for a usable patron row, or (None, reason)"""
+    member = _clean(row)
+    member_id = member.get("member_id")
+    if not member_id:
+        return None, "missing member_id"
+    member["member_id"] = str(member_id).strip()
+    if not member.get("name"):
+        return None, "missing name"
+    if "role" in member and member["role"] not in MEMBER_ROLES:
+        return None, f"unknown role {member['role']!r}"
+    if "email" in member and "@" not in member["email"]:
+        return None, f"malformed email {member['email']!r}"
+    try:
+        _convert(member, MEMBER_INT_FIELDS, MEMBER_FLOAT_FIELDS)
+    except (TypeError, ValueError) as e:
+        return None, f"bad number: {e}"
+    return member, None
+
+KINDS = {
+    "books": (validate_book, lambda book: book["isbn"], "add_books"),
+    "members": (validate_member, lambda member: member["member_id"], "add_members"),
+}
+
+# Running totals for one import, passed to the progress callback after each chunk
+class ImportReport:
+    def __init__(self, path, kind, max_errors=100):
+        self.path = path
+        self.kind = kind
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, line_number, reason):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, reason))
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.kind}: {self.read} read, {self.imported} imported, {self.duplicates} duplicates, "
+                f"{self.invalid} invalid in {self.elapsed:.1f}s ({self.rate:,.0f} rows/s)")
+
+def _hyphenated_isbns(target):
+    # Normalized forms of catalog ISBNs stored with hyphens or spaces, which
+    # the target's exact-match duplicate check would not recognise. The
+    # backends keep these indexed; any other target is walked once.
+    if hasattr(target, "get_isbn_aliases"):
+        return set(target.get_isbn_aliases())
+    aliases = set()
+    for book in iter_collection(target, "books"):
+        isbn = normalize_isbn(book["isbn"])
+        if isbn is not None and isbn != book["isbn"]:
+            aliases.add(isbn)
+    return aliases
+
+def import_file(target, path, kind="books", fmt=None, chunk_size=5000, progress=None, max_errors=100):
+    """Stream a CSV/JSONL file of books or members into target (any backend
+    with add_books/add_members) and return an ImportReport"""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {tuple(KINDS)}")
+    validate, key, method = KINDS[kind]
+    add = getattr(target, method)
+    report = ImportReport(path, kind, max_errors)
+    existing = _hyphenated_isbns(target) if kind == "books" else set()
+    chunk = {}
+
+    def flush():
+        _, added = add(list(chunk.values()))
+        report.imported += added
+        report.duplicates += len(chunk) - added
+        chunk.clear()
+        report.elapsed = time.perf_counter() - report.started
+        if progress:
+            progress(report)
+
+    for line_number, row in iter_rows(path, fmt):
+        report.read += 1
+        if row is None:
+            report.reject(line_number, "unparseable line")
+            continue
+        record, reason = validate(row)
+        if record is None:
+            report.reject(line_number, reason)
+            continue
+        record_key = key(record)
+        if record_key in chunk or record_key in existing:
+            report.duplicates += 1
+            continue
+        chunk[record_key] = record
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Import catalog or patron files into a library store")
+    parser.add_argument("kind", choices=tuple(KINDS))
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    store = parser.add_mutually_exclusive_group(required=True)
+    store.add_argument("--data-dir", help="in-memory store persisted to this directory")
+    store.add_argument("--sqlite", help="SQLite database file")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from database_manager import DatabaseManager
+        target = DatabaseManager(database=args.sqlite, backend="sqlite")
+    else:
+        from database_manager import InMemoryDatabaseManager
+        target = InMemoryDatabaseManager(data_dir=args.data_dir)
+
+    try:
+        for path in args.paths:
+            report = import_file(target, path, args.kind, args.format, args.chunk_size,
+                                 progress=lambda r: print(f"\r  {r}", end="", flush=True))
+            print(f"\n✅ {path}: {report}")
+            for line_number, reason in report.errors:
+                print(f"   line {line_number}: {reason}")
+        if hasattr(target, "checkpoint"):
+            target.checkpoint()
+    finally:
+        target.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from bisect import insort
+
+# Append-only transaction ledger with the indexes circulation needs:
+#   - a date-ordered position list, overall and per member, so "most recent N"
+#     is a slice from the end
+#   - open loans keyed by member_id then isbn, so a return finds its Borrow
+#     row, and a member's current loans are listed, without scanning
+# Rows are replaced, never mutated, when a loan is closed. The ledger also
+# behaves like the list it replaces (len, iteration, indexing, append).
+class TransactionLedger:
+    def __init__(self, date_field="transaction_date"):
+        self.date_field = date_field
+        self.rows = []
+        self.order = []
+        self.by_member = {}
+        self.open_loans = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, position):
+        return self.rows[position]
+
+    def _date(self, position):
+        return self.rows[position][self.date_field]
+
+    def _insert_position(self, positions, position):
+        # Rows almost always arrive in date order; only back-dated rows pay for a bisect
+        if not positions or self._date(positions[-1]) <= self._date(position):
+            positions.append(position)
+        else:
+            insort(positions, position, key=self._date)
+
+    def append(self, txn):
+        position = len(self.rows)
+        self.rows.append(txn)
+        self._insert_position(self.order, position)
+        self._insert_position(self.by_member.setdefault(txn['member_id'], []), position)
+        if txn['type'] == 'Borrow' and txn.get('return_date') is None:
+            loans = self.open_loans.setdefault(txn['member_id'], {})
+            loans.setdefault(txn['book_isbn'], []).append(position)
+        return position
+
+    def extend(self, txns):
+        for txn in txns:
+            self.append(txn)
+
+    def find_open_loan(self, member_id, isbn):
+        positions = self.open_loans.get(member_id, {}).get(isbn)
+        return self.rows[positions[-1]] if positions else None
+
+    def close_loan(self, member_id, isbn, return_date, **changes):
+        """Mark the most recent open Borrow for (member_id, isbn) as returned,
+        applying any other field changes to the same row"""
+        loans = self.open_loans.get(member_id)
+        positions = loans.get(isbn) if loans else None
+        if not positions:
+            return None
+        position = positions.pop()
+        if not positions:
+            del loans[isbn]
+            if not loans:
+                del self.open_loans[member_id]
+        txn = self.rows[position].replace(return_date=return_date, **changes)
+        self.rows[position] = txn
+        return txn
+
+    def iter_open_loans(self, member_id=None):
+        members = self.open_loans.values() if member_id is None else [self.open_loans.get(member_id, {})]
+        for loans in members:
+            for positions in loans.values():
+                for position in positions:
+                    yield self.rows[position]
+
+    def recent(self, limit=10, member_id=None):
+        """Most recent `limit` transactions, newest first, optionally for one member"""
+        positions = self.order if member_id is None else self.by_member.get(member_id, [])
+        if limit <= 0:
+            return []
+        return [self.rows[position] for position in reversed(positions[-limit:])]
+
+    def member_history(self, member_id):
+        for position in reversed(self.by_member.get(member_id, [])):
+            yield self.rows[position]
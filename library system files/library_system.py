@@ -1,16 +1,62 @@
-from data_structures import BinarySearchTree, HashTable, Stack, Queue, CircularLinkedList
+from data_structures import AVLTree, HashTable, Stack, HoldsQueue, PickupShelf, CirculationRing, FieldIndex, StripedLock
+from records import Book, Member, Transaction, new_book
+from catalog_snapshot import CatalogSnapshot, write_catalog_snapshot
+from overdue import FINE_PER_DAY, MAX_FINE, OverdueTracker
+from query_engine import BookFilter, FacetIndex
+from search_index import IsbnAliasIndex
+from collections.abc import Mapping
 from datetime import datetime, timedelta
 import json
 import os
+import threading
+
+# The catalog tree as an isbn -> book mapping, for BookFilter.select
+class _CatalogBooks(Mapping):
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __getitem__(self, isbn):
+        book = self.tree.search(isbn)
+        if book is None:
+            raise KeyError(isbn)
+        return book
+
+    def __iter__(self):
+        return (book["isbn"] for book in self.tree.iter_books())
+
+    def __len__(self):
+        return len(self.tree)
 
 class LibrarySystem:
-    def __init__(self):
-        self.books_bst = BinarySearchTree()
+    def __init__(self, history_capacity=1000, history_archive=None, catalog_snapshot=None):
+        self.books_bst = AVLTree()
+        # With a binary catalog snapshot, ISBN lookups are served straight from
+        # the mmap and books are copied into the tree as they are touched; the
+        # full catalog is only loaded once something needs to walk all of it.
+        self.catalog_snapshot = CatalogSnapshot(catalog_snapshot) if catalog_snapshot else None
+        self._removed_isbns = set()
+        self.sorted_books = {field: FieldIndex(field) for field in ("title", "author", "publish_year", "rating")}
+        # Genre/status ID sets and counts for the dashboard filters, kept
+        # current alongside the sorted indexes
+        self.facets = FacetIndex()
+        self.isbn_aliases = IsbnAliasIndex()
+        self.sorted_members = FieldIndex("name", "member_id")
         self.members_hash = HashTable()
         self.transaction_stack = Stack()
-        self.reservation_queue = Queue()
-        self.circulation_history = CircularLinkedList()
+        # Open loans by due date; each refers to its Borrow row's stack position
+        self.overdue = OverdueTracker()
+        self.reservation_queue = HoldsQueue()
+        # Returned copies waiting for the patron whose hold they fill
+        self.pickups = PickupShelf()
+        self.circulation_history = CirculationRing(history_capacity, history_archive)
         self.current_user = None
+        # Circulation locks the stripes of the ISBN and member it touches; the
+        # tree, member table, ledger and holds each have a short-held lock
+        self.locks = StripedLock()
+        self._catalog_lock = threading.RLock()
+        self._members_lock = threading.RLock()
+        self._ledger_lock = threading.Lock()
+        self._holds_lock = threading.Lock()
 
         self.load_sample_data()
 
@@ -27,8 +73,8 @@ class LibrarySystem:
             {"isbn": "978-0321146533", "title": "Test Driven Development", "author": "Kent Beck", "genre": "Programming", "status": "Available", "copies": 3}
         ]
 
-        for book in sample_books:
-            self.books_bst.insert(book)
+        if self.catalog_snapshot is None:
+            self.load_books(sample_books)
 
         # Sample members
         sample_members = [
@@ -43,7 +89,7 @@ class LibrarySystem:
         ]
 
         for member in sample_members:
-            self.members_hash.insert(member["member_id"], member)
+            self.add_member(member)
 
         # Sample transactions
         sample_transactions = [
@@ -55,8 +101,10 @@ class LibrarySystem:
         ]
 
         for transaction in sample_transactions:
+            transaction = Transaction(transaction)
             self.transaction_stack.push(transaction)
             self.circulation_history.append(transaction)
+            self._track_loan(transaction, len(self.transaction_stack.items) - 1)
 
         # Sample reservations
         sample_reservations = [
@@ -69,111 +117,444 @@ class LibrarySystem:
 
     def search_book(self, isbn):
         """Search for a book by ISBN"""
-        return self.books_bst.search(isbn)
+        with self._catalog_lock:
+            book = self.books_bst.search(isbn)
+            if book is None and self.catalog_snapshot is not None and isbn not in self._removed_isbns:
+                book = self.catalog_snapshot.get(isbn)
+                if book is not None:
+                    self.books_bst.insert(book)
+            return book
+
+    def _ensure_catalog_loaded(self):
+        if self.catalog_snapshot is None:
+            return
+        with self._catalog_lock:
+            if self.catalog_snapshot is not None:
+                self._load_catalog_snapshot()
+
+    def _load_catalog_snapshot(self):
+        snapshot, self.catalog_snapshot = self.catalog_snapshot, None
+        touched = {book["isbn"]: book for book in self.books_bst.iter_books()}
+        merged = [touched.pop(book["isbn"], book) for book in snapshot
+                  if book["isbn"] not in self._removed_isbns]
+        merged.extend(touched.values())
+        snapshot.close()
+        self._removed_isbns.clear()
+        self.load_books(merged)
+
+    def save_catalog_snapshot(self, path):
+        """Write the catalog to a binary snapshot for fast cold starts"""
+        self._ensure_catalog_loaded()
+        return write_catalog_snapshot(path, self.books_bst.iter_books())
 
     def get_member(self, member_id):
         """Get member information by ID"""
-        return self.members_hash.get(member_id)
+        with self._members_lock:
+            return self.members_hash.get(member_id)
+
+    def _store_book(self, book):
+        # Swap in a changed copy; records handed out earlier are never mutated
+        with self._catalog_lock:
+            self.books_bst.insert(book)
+            for index in self.sorted_books.values():
+                index.update(book)
+            self.facets.update(book)
+            self.isbn_aliases.update(book)
+
+    @staticmethod
+    def _on_shelf(book, copies, **changes):
+        # Here copies counts the copies on the shelf; a book added with an
+        # available_copies field keeps it equal, so facet counts follow loans
+        if book.get("available_copies") is not None:
+            changes["available_copies"] = copies
+        return book.replace(copies=copies, **changes)
+
+    def _store_member(self, member):
+        with self._members_lock:
+            self.members_hash.insert(member["member_id"], member)
+            self.sorted_members.update(member)
+
+    def _track_loan(self, transaction, position):
+        # Borrows open a loan in the overdue tracker and returns close it;
+        # returns the fine charged on the closed loan
+        if transaction["type"] == "Borrow":
+            self.overdue.add(transaction["id"], transaction["member_id"], transaction["book_isbn"],
+                             transaction["due_date"], position)
+        elif transaction["type"] == "Return":
+            closed = self.overdue.close(transaction["member_id"], transaction["book_isbn"])
+            return closed[1] if closed else None
+
+    def _record_transaction(self, **fields):
+        with self._ledger_lock:
+            transaction = Transaction(id=f"TXN{len(self.transaction_stack.items) + 1:03d}", **fields)
+            charged = self._track_loan(transaction, len(self.transaction_stack.items))
+            if charged:
+                transaction["fine_amount"] = charged
+            self.transaction_stack.push(transaction)
+            self.circulation_history.append(transaction)
 
     def borrow_book(self, member_id, isbn):
         """Borrow a book"""
-        book = self.search_book(isbn)
-        member = self.get_member(member_id)
-        
-        if not book:
-            return False, "Book not found"
-        
-        if not member:
-            return False, "Member not found"
-        
-        if book["status"] != "Available":
-            return False, "Book is not available"
-        
-        if book["copies"] <= 0:
-            return False, "No copies available"
-        
-        # Update book status
-        book["status"] = "Borrowed"
-        book["copies"] -= 1
-        
-        # Update member
-        member["books_borrowed"] += 1
-        
-        # Create transaction
-        transaction = {
-            "id": f"TXN{len(self.transaction_stack.items) + 1:03d}",
-            "member_id": member_id,
-            "book_isbn": isbn,
-            "type": "Borrow",
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "due_date": (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-        }
-        
-        self.transaction_stack.push(transaction)
-        self.circulation_history.append(transaction)
-        
+        with self.locks.hold(isbn, member_id):
+            book = self.search_book(isbn)
+            member = self.get_member(member_id)
+
+            if not book:
+                return False, "Book not found"
+
+            if not member:
+                return False, "Member not found"
+
+            # A copy held for this member on the pickup shelf is already
+            # out of copies
+            with self._holds_lock:
+                pickup = self.pickups.collect(member_id, isbn)
+                on_hold = self.pickups.held_copies(isbn)
+
+            if pickup is None:
+                if book["status"] != "Available":
+                    return False, "Book is not available"
+
+                if book["copies"] <= 0:
+                    return False, "No copies available"
+
+                # Update book status
+                self._store_book(self._on_shelf(book, book["copies"] - 1, status="Borrowed"))
+            elif not on_hold and book["status"] == "On Hold":
+                self._store_book(book.replace(status="Borrowed"))
+
+            # Update member
+            self._store_member(member.replace(books_borrowed=member["books_borrowed"] + 1))
+
+            # Create transaction
+            self._record_transaction(
+                member_id=member_id,
+                book_isbn=isbn,
+                type="Borrow",
+                date=datetime.now().strftime("%Y-%m-%d"),
+                due_date=(datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+            )
+
         return True, "Book borrowed successfully"
 
     def return_book(self, member_id, isbn):
         """Return a book"""
-        book = self.search_book(isbn)
-        member = self.get_member(member_id)
-        
-        if not book or not member:
-            return False, "Book or member not found"
-        
-        # Update book status
-        book["status"] = "Available"
-        book["copies"] += 1
-        
-        # Update member
-        member["books_borrowed"] -= 1
-        
-        # Create return transaction
-        transaction = {
-            "id": f"TXN{len(self.transaction_stack.items) + 1:03d}",
-            "member_id": member_id,
-            "book_isbn": isbn,
-            "type": "Return",
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "due_date": None
-        }
-        
-        self.transaction_stack.push(transaction)
-        self.circulation_history.append(transaction)
-        
+        with self.locks.hold(isbn, member_id):
+            book = self.search_book(isbn)
+            member = self.get_member(member_id)
+
+            if not book or not member:
+                return False, "Book or member not found"
+
+            # Update book status: the copy goes to the first patron waiting
+            # for it, or back on the shelf
+            with self._holds_lock:
+                pickup = self._shelve_for_next_hold(isbn, datetime.now().date())
+            if pickup is None:
+                self._store_book(self._on_shelf(book, book["copies"] + 1, status="Available"))
+            elif book["copies"] <= 0:
+                self._store_book(book.replace(status="On Hold"))
+
+            # Update member
+            self._store_member(member.replace(books_borrowed=member["books_borrowed"] - 1))
+
+            # Create return transaction
+            self._record_transaction(
+                member_id=member_id,
+                book_isbn=isbn,
+                type="Return",
+                date=datetime.now().strftime("%Y-%m-%d"),
+                due_date=None
+            )
+
+        if pickup is not None:
+            return True, f"Book returned successfully and held for {pickup['member_id']}"
         return True, "Book returned successfully"
 
     def get_all_books(self):
         """Get all books in the system"""
-        return self.books_bst.get_all_books()
+        self._ensure_catalog_loaded()
+        with self._catalog_lock:
+            return self.books_bst.get_all_books()
+
+    def get_book_count(self):
+        """Get the number of books, without loading a catalog snapshot"""
+        with self._catalog_lock:
+            snapshot = self.catalog_snapshot
+            if snapshot is None:
+                return len(self.books_bst)
+            # Snapshot books, plus books added since, minus those removed
+            added = sum(1 for book in self.books_bst.iter_books() if book["isbn"] not in snapshot)
+            removed = sum(1 for isbn in self._removed_isbns
+                          if isbn in snapshot and self.books_bst.search(isbn) is None)
+            return len(snapshot) + added - removed
+
+    def iter_books(self, isbn_lo=None, isbn_hi=None):
+        """Lazily iterate books in ISBN order, optionally within [isbn_lo, isbn_hi)"""
+        self._ensure_catalog_loaded()
+        return self.books_bst.range(isbn_lo, isbn_hi)
+
+    def iter_books_by_prefix(self, isbn_prefix):
+        """Lazily iterate books whose ISBN starts with the given prefix"""
+        self._ensure_catalog_loaded()
+        return self.books_bst.prefix(isbn_prefix)
+
+    def get_books_page(self, sort_key="isbn", offset=0, limit=50, descending=False):
+        """Get one page of books in sort_key order without sorting the catalog"""
+        self._ensure_catalog_loaded()
+        if sort_key != "isbn" and sort_key not in self.sorted_books:
+            raise ValueError(f"Unsupported sort key: {sort_key}")
+        with self._catalog_lock:
+            if sort_key == "isbn":
+                return self.books_bst.page(offset, limit, descending)
+            isbns = self.sorted_books[sort_key].page(offset, limit, descending)
+            return [self.books_bst.search(isbn) for isbn in isbns]
+
+    def query_books(self, genre=None, status=None, search_term=None, **ranges):
+        """Books matching a filter spec by title, with the catalog's facet
+        counts: {"books": [...], "total": n, "facets": get_facets()}"""
+        self._ensure_catalog_loaded()
+        with self._catalog_lock:
+            isbns = BookFilter(genre, status, search_term, **ranges).select(
+                _CatalogBooks(self.books_bst), self.facets)
+            books = [self.books_bst.search(isbn) for isbn in self.sorted_books["title"].order(isbns)]
+            return {"books": books, "total": len(books), "facets": self.facets.counts()}
+
+    def get_facets(self):
+        """Get books per genre and per status, and available copies per genre"""
+        self._ensure_catalog_loaded()
+        with self._catalog_lock:
+            return self.facets.counts()
+
+    def get_isbn_aliases(self):
+        """Bare-digit forms of the catalog ISBNs stored with hyphens or spaces"""
+        self._ensure_catalog_loaded()
+        with self._catalog_lock:
+            return self.isbn_aliases.get_all()
+
+    def get_members_page(self, offset=0, limit=50, descending=False):
+        """Get one page of members in name order"""
+        with self._members_lock:
+            member_ids = self.sorted_members.page(offset, limit, descending)
+            return [self.members_hash.get(member_id) for member_id in member_ids]
+
+    def load_books(self, books):
+        """Replace the catalog with a batch of book records in one balanced build"""
+        with self._catalog_lock:
+            if self.catalog_snapshot is not None:
+                self.catalog_snapshot.close()
+                self.catalog_snapshot = None
+            self.books_bst.bulk_load(book if isinstance(book, Book) else Book(book) for book in books)
+            for index in self.sorted_books.values():
+                index.bulk_load(self.books_bst.iter_books())
+            self.facets = FacetIndex()
+            self.isbn_aliases = IsbnAliasIndex()
+            for book in self.books_bst.iter_books():
+                self.facets.add(book)
+                self.isbn_aliases.add(book)
+        return True
 
     def get_all_members(self):
         """Get all members in the system"""
-        return self.members_hash.get_all_members()
+        with self._members_lock:
+            return self.members_hash.get_all_members()
+
+    def iter_members(self):
+        """Lazily iterate all members"""
+        return self.members_hash.iter_values(self._members_lock)
+
+    def iter_transactions(self):
+        """Lazily iterate transactions, oldest first"""
+        for position in range(len(self.transaction_stack.items)):
+            yield self.transaction_stack.items[position]
+
+    def get_overdue_loans(self, as_of=None):
+        """Get open loans due before as_of (default today), oldest first, with the fine charged so far"""
+        with self._ledger_lock:
+            overdue = self.overdue.overdue(as_of or datetime.now())
+            return [self.transaction_stack.items[position].replace(fine_amount=charged)
+                    for position, _, _, _, _, charged in overdue]
+
+    def get_overdue_count(self, as_of=None):
+        """Get the number of loans overdue as of as_of (default today)"""
+        with self._ledger_lock:
+            return self.overdue.overdue_count(as_of or datetime.now())
+
+    def accrue_fines(self, as_of=None, rate=FINE_PER_DAY, max_fine=MAX_FINE):
+        """Charge every overdue loan up to rate per day overdue (at most max_fine)
+        in one batched pass and add the new charges to members' fines.
+        Returns (any_charged, total_added)."""
+        with self.locks.hold_all():
+            with self._ledger_lock:
+                added = self.overdue.accrue(as_of or datetime.now(), rate, max_fine)
+            for member_id, amount in added.items():
+                member = self.get_member(member_id)
+                if member is not None:
+                    self._store_member(member.replace(fine_amount=round((member["fine_amount"] or 0) + amount, 2)))
+        return bool(added), round(sum(added.values(), 0.0), 2)
 
     def get_transaction_history(self, limit=10):
         """Get recent transaction history"""
         return self.transaction_stack.get_all()[:limit]
 
     def get_circulation_history(self, limit=10):
-        """Get circulation history"""
+        """Get circulation history, most recent first"""
         return self.circulation_history.get_circulation_history(limit)
 
     def get_pending_reservations(self):
         """Get all pending reservations"""
-        return self.reservation_queue.get_all()
+        with self._holds_lock:
+            return self.reservation_queue.get_all()
+
+    def place_hold(self, member_id, isbn):
+        """Place a hold on a book for a member"""
+        if not self.search_book(isbn):
+            return False, "Book not found"
+        if not self.get_member(member_id):
+            return False, "Member not found"
+        reservation = {
+            "member_id": member_id,
+            "book_isbn": isbn,
+            "date_requested": datetime.now().strftime("%Y-%m-%d")
+        }
+        with self._holds_lock:
+            if self.pickups.get(member_id, isbn) or not self.reservation_queue.place_hold(reservation):
+                return False, "Hold already placed"
+        return True, "Hold placed successfully"
+
+    def cancel_hold(self, member_id, isbn):
+        """Cancel a member's hold on a book, passing on a copy already held for them"""
+        with self.locks.hold(isbn, member_id):
+            with self._holds_lock:
+                cancelled = self.reservation_queue.cancel_hold(member_id, isbn)
+                collected = cancelled is None and self.pickups.collect(member_id, isbn)
+            if collected:
+                self._pass_on(isbn, datetime.now().date())
+            elif cancelled is None:
+                return False, "Hold not found"
+        return True, "Hold cancelled successfully"
+
+    def _shelve_for_next_hold(self, isbn, today):
+        # Caller holds _holds_lock; O(1) pop of the title's hold queue head
+        reservation = self.reservation_queue.pop_next_hold(isbn)
+        if reservation is None:
+            return None
+        return self.pickups.shelve(reservation, today)
+
+    def _pass_on(self, isbn, today):
+        # Hand a copy whose pickup lapsed or was cancelled to the next patron
+        # in line, or back to copies when nobody is waiting
+        with self._holds_lock:
+            pickup = self._shelve_for_next_hold(isbn, today)
+            on_hold = self.pickups.held_copies(isbn)
+        book = self.search_book(isbn)
+        if pickup is None and book is not None:
+            self._store_book(self._on_shelf(book, book["copies"] + 1, status="Available"))
+        elif book is not None and not on_hold and book["status"] == "On Hold":
+            self._store_book(book.replace(status="Borrowed"))
+        return pickup
+
+    def expire_holds(self, as_of=None):
+        """Scheduled sweep: pickups whose deadline passed before as_of (default
+        today) cascade to the next patron waiting for the title.
+        Returns (any_expired, [(member_id, isbn, passed_to or None)])."""
+        today = datetime.fromisoformat(str(as_of)).date() if as_of else datetime.now().date()
+        with self.locks.hold_all():
+            with self._holds_lock:
+                expired = self.pickups.expire(today)
+            results = []
+            for pickup in expired:
+                passed = self._pass_on(pickup["book_isbn"], today)
+                results.append((pickup["member_id"], pickup["book_isbn"], passed and passed["member_id"]))
+        return bool(results), results
+
+    def get_ready_holds(self, member_id=None):
+        """Get copies waiting on the pickup shelf, for one member or everyone"""
+        with self._holds_lock:
+            if member_id is None:
+                return self.pickups.get_all()
+            return self.pickups.get_member_pickups(member_id)
+
+    def get_next_hold(self, isbn):
+        """Get the reservation of the next patron waiting for a book"""
+        with self._holds_lock:
+            return self.reservation_queue.next_hold(isbn)
+
+    def get_member_holds(self, member_id):
+        """Get all holds placed by a member"""
+        with self._holds_lock:
+            return self.reservation_queue.get_member_holds(member_id)
+
+    def get_hold_count(self, member_id):
+        """Get the number of holds placed by a member"""
+        with self._holds_lock:
+            return self.reservation_queue.hold_count(member_id)
 
     def add_book(self, book_data):
         """Add a new book to the system"""
-        self.books_bst.insert(book_data)
+        book = self._new_book(book_data)
+        with self.locks.hold(book["isbn"]):
+            self._store_book(book)
         return True
 
+    @staticmethod
+    def _new_book(book_data):
+        return new_book(book_data, f"B{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
+
+    def add_books(self, books):
+        """Add a batch of books, skipping ISBNs already in the catalog.
+        Returns (any_added, number_added); the tree and indexes are updated once per batch."""
+        added = {}
+        with self.locks.hold_all(), self._catalog_lock:
+            for book_data in books:
+                isbn = book_data.get("isbn")
+                if isbn and isbn not in added and not self.search_book(isbn):
+                    added[isbn] = self._new_book(book_data)
+            if added:
+                self.books_bst.extend(added.values())
+                for index in self.sorted_books.values():
+                    index.extend(added.values())
+                for book in added.values():
+                    self.facets.add(book)
+                    self.isbn_aliases.add(book)
+        return bool(added), len(added)
+
+    def remove_book(self, isbn):
+        """Remove a book from the system"""
+        with self.locks.hold(isbn), self._catalog_lock:
+            book = self.search_book(isbn)
+            if not book:
+                return False, "Book not found"
+            self.books_bst.delete(isbn)
+            if self.catalog_snapshot is not None:
+                self._removed_isbns.add(isbn)
+            for index in self.sorted_books.values():
+                index.remove(book)
+            self.facets.remove(book)
+            self.isbn_aliases.remove(book)
+        return True, "Book removed successfully"
+
     def add_member(self, member_data):
         """Add a new member to the system"""
-        self.members_hash.insert(member_data["member_id"], member_data)
+        member = Member(member_data)
+        with self.locks.hold(member["member_id"]):
+            self._store_member(member)
         return True
 
+    def add_members(self, members):
+        """Add a batch of members, skipping IDs already registered.
+        Returns (any_added, number_added)."""
+        added = {}
+        with self.locks.hold_all(), self._members_lock:
+            for member_data in members:
+                member_id = member_data.get("member_id")
+                if member_id and member_id not in added and not self.get_member(member_id):
+                    added[member_id] = member_data if isinstance(member_data, Member) else Member(member_data)
+            for member_id, member in added.items():
+                self.members_hash.insert(member_id, member)
+            self.sorted_members.extend(added.values())
+        return bool(added), len(added)
+
     def authenticate_user(self, member_id, password="default"):
         """Simple authentication (placeholder)"""
         member = self.get_member(member_id)
@@ -20,16 +20,14 @@ def main():
 
     # Choose between database and in-memory storage
     while True:
-        choice = input("\nChoose storage method:\n1. Database (MySQL)\n2. In-Memory (for testing)\nEnter choice (1 or 2): ").strip()
+        choice = input("\nChoose storage method:\n1. Database (MySQL)\n2. In-Memory (for testing)\n"
+                       "3. Circulation service (shared with other kiosks)\nEnter choice (1, 2 or 3): ").strip()
 
-        if choice == "1":
-            use_database = True
-            break
-        elif choice == "2":
-            use_database = False
+        if choice in ("1", "2", "3"):
+            use_database = choice == "1"
             break
         else:
-            print("Invalid choice. Please enter 1 or 2.")
+            print("Invalid choice. Please enter 1, 2 or 3.")
 
     system = None
     db = None
@@ -57,6 +55,17 @@ def main():
         except Exception as e:
             print(f"❌ Failed to connect to database: {e}")
             return
+    elif choice == "3":
+        from service import ServiceClient
+        host = input("Service Host (default: 127.0.0.1): ").strip() or "127.0.0.1"
+        port = int(input("Service Port (default: 8765): ").strip() or 8765)
+        db = ServiceClient(host=host, port=port)
+        try:
+            db.stats()
+        except OSError as e:
+            print(f"❌ Failed to reach circulation service: {e}")
+            return
+        print("✅ Connected to circulation service.")
     else:
         from library_system import LibrarySystem
         system = LibrarySystem()
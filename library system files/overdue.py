@@ -0,0 +1,191 @@
+import heapq
+from array import array
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from columnar_catalog import DictionaryEncoding
+
+FINE_PER_DAY = 0.25
+MAX_FINE = 20.0
+
+def _ordinal(value):
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+# Open loans by due date. Loans that are not yet due wait in a min-heap; each
+# call moves the ones whose due date has passed into dense overdue columns
+# (due date, member code, fine charged so far), so "what is overdue now" costs
+# O(newly overdue * log n + overdue) rather than a scan of every loan. Fine
+# accrual is one vectorised pass over those columns with NumPy, or one Python
+# pass over stdlib arrays without it. Returned or closed loans are dropped from
+# the columns at once and from the heap lazily.
+class OverdueTracker:
+    def __init__(self, capacity=1024):
+        self.use_numpy = np is not None
+        self.loans = {}
+        self.open = {}
+        self.pending = []
+        self.members = DictionaryEncoding()
+        self.slots = {}
+        self.keys = []
+        self.count = 0
+        self._seq = 0
+        self._capacity = capacity
+        self.columns = {"due": self._new_column("i", "int32"),
+                        "member": self._new_column("i", "int32"),
+                        "charged": self._new_column("d", "float64")}
+
+    def __len__(self):
+        return len(self.loans)
+
+    def _new_column(self, typecode, dtype):
+        if self.use_numpy:
+            return np.zeros(self._capacity, dtype=dtype)
+        return array(typecode)
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.zeros(self._capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def add(self, key, member_id, isbn, due_date, ref=None, charged=0.0):
+        """Track an open loan; ref is handed back by overdue() (e.g. a ledger position)"""
+        if due_date is None or key in self.loans:
+            return
+        due = _ordinal(due_date)
+        self.loans[key] = (member_id, isbn, due, ref, charged)
+        self.open.setdefault((member_id, isbn), []).append(key)
+        self._seq += 1
+        heapq.heappush(self.pending, (due, self._seq, key))
+
+    def remove(self, key):
+        """Stop tracking a loan; returns the fine charged on it, or None if unknown"""
+        loan = self.loans.pop(key, None)
+        if loan is None:
+            return None
+        member_id, isbn = loan[0], loan[1]
+        keys = self.open[(member_id, isbn)]
+        keys.remove(key)
+        if not keys:
+            del self.open[(member_id, isbn)]
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return loan[4]
+        charged = float(self.columns["charged"][slot])
+        # Move the last overdue row into the freed slot
+        last = self.count - 1
+        if slot != last:
+            moved = self.keys[last]
+            for column in self.columns.values():
+                column[slot] = column[last]
+            self.keys[slot] = moved
+            self.slots[moved] = slot
+        self.keys.pop()
+        if not self.use_numpy:
+            for column in self.columns.values():
+                column.pop()
+        self.count -= 1
+        return charged
+
+    def close(self, member_id, isbn):
+        """Close the most recent open loan of isbn to member_id; returns (key, charged) or None"""
+        keys = self.open.get((member_id, isbn))
+        if not keys:
+            return None
+        key = keys[-1]
+        return key, self.remove(key)
+
+    def _advance(self, today):
+        while self.pending and self.pending[0][0] < today:
+            _, _, key = heapq.heappop(self.pending)
+            loan = self.loans.get(key)
+            if loan is None or key in self.slots:
+                continue
+            slot = self.count
+            if self.use_numpy:
+                if slot == self._capacity:
+                    self._grow()
+                self.columns["due"][slot] = loan[2]
+                self.columns["member"][slot] = self.members.encode(loan[0])
+                self.columns["charged"][slot] = loan[4]
+            else:
+                self.columns["due"].append(loan[2])
+                self.columns["member"].append(self.members.encode(loan[0]))
+                self.columns["charged"].append(loan[4])
+            self.slots[key] = slot
+            self.keys.append(key)
+            self.count += 1
+
+    def overdue(self, as_of):
+        """(ref, member_id, isbn, due_date, days_overdue, charged) for loans due before as_of, oldest first"""
+        today = _ordinal(as_of)
+        self._advance(today)
+        n = self.count
+        due, charged = self.columns["due"], self.columns["charged"]
+        if self.use_numpy:
+            slots = np.flatnonzero(due[:n] < today)
+            slots = slots[np.argsort(due[slots], kind="stable")].tolist()
+            due, charged = due[:n].tolist(), charged[:n].tolist()
+        else:
+            slots = sorted((slot for slot in range(n) if due[slot] < today), key=due.__getitem__)
+        keys, loans, dates = self.keys, self.loans, {}
+        rows = []
+        for slot in slots:
+            day = due[slot]
+            due_date = dates.get(day) or dates.setdefault(day, date.fromordinal(day))
+            member_id, isbn, _, ref, _ = loans[keys[slot]]
+            rows.append((ref, member_id, isbn, due_date, today - day, charged[slot]))
+        return rows
+
+    def overdue_count(self, as_of):
+        today = _ordinal(as_of)
+        self._advance(today)
+        due = self.columns["due"]
+        if self.use_numpy:
+            return int(np.count_nonzero(due[:self.count] < today))
+        return sum(1 for slot in range(self.count) if due[slot] < today)
+
+    def accrue(self, as_of, rate=FINE_PER_DAY, max_fine=MAX_FINE):
+        """Bring every overdue loan's fine up to rate per day overdue as of
+        as_of (capped at max_fine per loan); returns {member_id: amount added}.
+        Fines never go down, so running it twice for the same day adds nothing."""
+        today = _ordinal(as_of)
+        self._advance(today)
+        n = self.count
+        if not n:
+            return {}
+        due, member, charged = self.columns["due"], self.columns["member"], self.columns["charged"]
+        if self.use_numpy:
+            owed = np.round((today - due[:n]) * rate, 2)
+            if max_fine is not None:
+                owed = np.minimum(owed, max_fine)
+            owed = np.maximum(owed, charged[:n])
+            added = np.bincount(member[:n], weights=owed - charged[:n], minlength=len(self.members.values))
+            charged[:n] = owed
+            return {self.members.values[code]: round(float(added[code]), 2) for code in np.flatnonzero(added > 0)}
+        added = {}
+        for slot in range(n):
+            owed = round((today - due[slot]) * rate, 2)
+            if max_fine is not None and owed > max_fine:
+                owed = max_fine
+            if owed > charged[slot]:
+                code = member[slot]
+                added[code] = added.get(code, 0.0) + owed - charged[slot]
+                charged[slot] = owed
+        return {self.members.values[code]: round(amount, 2) for code, amount in added.items()}
+
+    def charges(self):
+        """{key: fine charged} for loans with a fine, for snapshots"""
+        charged = self.columns["charged"]
+        charges = {self.keys[slot]: float(charged[slot]) for slot in range(self.count) if charged[slot]}
+        charges.update((key, loan[4]) for key, loan in self.loans.items() if key not in self.slots and loan[4])
+        return charges
@@ -0,0 +1,159 @@
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import date, datetime
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Cannot log value of type {type(value).__name__}")
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+# Append-only JSON-lines log of backend mutations with group commit. A writer
+# appends its entry, which returns a ticket, and then waits on that ticket
+# until the entry is on disk. The first waiter to find no commit under way
+# becomes the leader: it writes and fsyncs every pending entry (its own and
+# any appended meanwhile) with the lock released, so others keep appending,
+# and wakes the followers whose entries it covered. Concurrent writers thus
+# share one fsync, and nothing is acknowledged before it is durable.
+# fsync policy:
+#   always - every append is written and fsynced before it returns
+#   batch  - waiters are acknowledged once their group commit is fsynced
+#   never  - waiters return at once; entries are written to the OS once
+#            `group_size` are pending or after `group_interval` seconds (a
+#            daemon thread covers idle periods) and never fsynced, so a crash
+#            can lose the most recent acknowledged writes
+class WriteAheadLog:
+    def __init__(self, path, fsync="batch", group_size=64, group_interval=0.05):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.path = path
+        self.fsync = fsync
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.pending = []
+        self.commit_count = 0
+        self._lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        self._appended = 0
+        self._durable = 0
+        self._leader = False
+        self._file = open(path, "a", encoding="utf-8")
+        self._closed = False
+        self._flusher = None
+        if fsync != "always" and group_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    def append(self, seq, op, args, ts):
+        """Buffer one entry; returns the ticket to wait() on"""
+        line = json.dumps({"seq": seq, "op": op, "args": args, "ts": ts}, default=_encode)
+        with self._lock:
+            self.pending.append(line)
+            self._appended += 1
+            ticket = self._appended
+            if self.fsync == "always" or len(self.pending) >= self.group_size:
+                self._commit()
+        return ticket
+
+    def wait(self, ticket):
+        """Block until the entry appended with this ticket is durable"""
+        if self.fsync == "never":
+            return
+        with self._lock:
+            while self._durable < ticket:
+                if self._leader:
+                    self._committed.wait()
+                else:
+                    self._commit()
+
+    def _commit(self):
+        # Caller holds the lock. One commit runs at a time; the file I/O is
+        # done with the lock released, so appends carry on during the fsync
+        # and make up the next group
+        while self._leader:
+            self._committed.wait()
+        if not self.pending:
+            return
+        lines, self.pending = self.pending, []
+        upto = self._appended
+        self._leader = True
+        self._lock.release()
+        try:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+        finally:
+            self._lock.acquire()
+            self._leader = False
+            self._committed.notify_all()
+        self._durable = upto
+        self.commit_count += 1
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def _flush_periodically(self):
+        while not self._closed:
+            time.sleep(self.group_interval)
+            with self._lock:
+                if not self._closed:
+                    self._commit()
+
+    def truncate(self):
+        # Called right after a snapshot, which already covers every logged entry
+        with self._lock:
+            self._commit()
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._closed = True
+            self._file.close()
+
+def read_log(path, after_seq=0):
+    """Yield (seq, op, args, ts) for logged entries newer than after_seq"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            if not line.endswith("\n"):
+                break  # torn final write from a crash
+            entry = json.loads(line, object_hook=_decode)
+            if entry["seq"] > after_seq:
+                yield entry["seq"], entry["op"], entry["args"], entry["ts"]
+
+def write_snapshot(path, seq, state):
+    # Write to a temporary file and rename, so a crash never leaves a torn snapshot
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as snapshot:
+        pickle.dump({"seq": seq, "state": state}, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(tmp_path, path)
+
+def read_snapshot(path):
+    """Return (seq, state) from the latest snapshot, or (0, None) if there is none"""
+    if not os.path.exists(path):
+        return 0, None
+    with open(path, "rb") as snapshot:
+        data = pickle.load(snapshot)
+    return data["seq"], data["state"]
@@ -0,0 +1,130 @@
+FACET_FIELDS = ("genre", "status")
+# Circulation states a book can be in; each always has a status facet count
+STATUSES = ("Available", "Borrowed", "On Hold")
+
+def _wanted(value):
+    # None, "" and "All" mean "no constraint"; a string or a collection of
+    # strings is the set of accepted values
+    if value is None or value in ("", "All"):
+        return None
+    if isinstance(value, str):
+        return {value}
+    return set(value)
+
+# A dashboard filter compiled once: genre/status become sets of accepted
+# values, the search term is lower-cased, and numeric fields take inclusive
+# (lo, hi) ranges. select() plans the query against the backend's indexes;
+# matches() is the same test for a single book, for callers without indexes.
+class BookFilter:
+    def __init__(self, genre=None, status=None, search_term=None, **ranges):
+        self.equals = {field: values for field, values in (("genre", _wanted(genre)), ("status", _wanted(status)))
+                       if values is not None}
+        self.search_term = search_term.lower() if search_term else None
+        self.ranges = ranges
+
+    def _in_ranges(self, book):
+        for name, (lo, hi) in self.ranges.items():
+            value = book.get(name)
+            if value is None or (lo is not None and value < lo) or (hi is not None and value > hi):
+                return False
+        return True
+
+    def matches(self, book):
+        for field, values in self.equals.items():
+            if book.get(field) not in values:
+                return False
+        if self.search_term and self.search_term not in (
+                str(book.get('title') or '').lower() + str(book.get('author') or '').lower()
+                + str(book.get('isbn') or '').lower()):
+            return False
+        return self._in_ranges(book)
+
+    def select(self, books, facets, substring_index=None):
+        """ISBNs in books (an isbn -> book dict) that match. Equality terms
+        and the search term are answered from ID sets, intersected smallest
+        first; only the survivors are looked at for range terms."""
+        sets = [facets.lookup(field, values) for field, values in self.equals.items()]
+        if self.search_term and substring_index is not None:
+            sets.append(substring_index.search(self.search_term))
+        if not sets:
+            return [isbn for isbn, book in books.items() if self.matches(book)]
+        sets.sort(key=len)
+        isbns = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+        if self.search_term and substring_index is None:
+            return [isbn for isbn in isbns if self.matches(books[isbn])]
+        if self.ranges:
+            return [isbn for isbn in isbns if self._in_ranges(books[isbn])]
+        return list(isbns)
+
+# ID sets of books per genre and per status, plus available copies per genre,
+# maintained incrementally through add/update/remove like the other book
+# indexes, so filtering and facet counts never scan the catalog.
+class FacetIndex:
+    def __init__(self, fields=FACET_FIELDS):
+        self.fields = fields
+        self.ids = {field: {} for field in fields}
+        self.available = {}
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _available(book):
+        available = book.get("available_copies")
+        return available if available is not None else book.get("copies") or 0
+
+    def add(self, book):
+        isbn = book["isbn"]
+        if isbn in self.entries:
+            self.update(book)
+            return
+        values = tuple(book.get(field) for field in self.fields)
+        available = self._available(book)
+        self.entries[isbn] = (values, available)
+        for field, value in zip(self.fields, values):
+            self.ids[field].setdefault(value, set()).add(isbn)
+        genre = book.get("genre")
+        self.available[genre] = self.available.get(genre, 0) + available
+
+    def update(self, book):
+        entry = self.entries.get(book["isbn"])
+        if entry == (tuple(book.get(field) for field in self.fields), self._available(book)):
+            return
+        if entry is not None:
+            self.remove(book)
+        self.add(book)
+
+    def remove(self, book):
+        isbn = book["isbn"]
+        entry = self.entries.pop(isbn, None)
+        if entry is None:
+            return
+        values, available = entry
+        for field, value in zip(self.fields, values):
+            members = self.ids[field][value]
+            members.discard(isbn)
+            if not members:
+                del self.ids[field][value]
+        genre = values[self.fields.index("genre")] if "genre" in self.fields else None
+        self.available[genre] -= available
+        if not self.available[genre] and genre not in self.ids.get("genre", {}):
+            del self.available[genre]
+
+    def lookup(self, field, values):
+        """ISBNs whose field is any of values"""
+        index = self.ids[field]
+        sets = [index[value] for value in values if value in index]
+        if len(sets) == 1:
+            return sets[0]
+        return set().union(*sets)
+
+    def counts(self):
+        """{"genre": {genre: books}, "status": {status: books},
+        "available_by_genre": {genre: available copies}}"""
+        facets = {field: {value: len(isbns) for value, isbns in self.ids[field].items() if value is not None}
+                  for field in self.fields}
+        if "status" in facets:
+            facets["status"] = {**dict.fromkeys(STATUSES, 0), **facets["status"]}
+        facets["available_by_genre"] = {genre: count for genre, count in self.available.items() if genre is not None}
+        return facets
@@ -0,0 +1,173 @@
+from collections.abc import Mapping, MutableMapping
+
+# Marks a field that was never set, so records built from partial dicts
+# report exactly the keys they were given
+_MISSING = object()
+
+# Base class for compact catalog records. Fields live in __slots__ instead of
+# a per-record dict; the MutableMapping layer keeps record["title"],
+# record.get("copies", 0), dict(record) etc. working for existing callers.
+# Keys outside the declared fields go into a lazily created `extra` dict.
+class Record(MutableMapping):
+    __slots__ = ("extra",)
+    fields = ()
+
+    def __init__(self, *args, **kwargs):
+        values = dict(*args, **kwargs)
+        for name in self.fields:
+            setattr(self, name, values.pop(name, _MISSING))
+        self.extra = values or None
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.fields:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.fields:
+            if getattr(self, key) is _MISSING:
+                raise KeyError(key)
+            setattr(self, key, _MISSING)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for name in self.fields:
+            if getattr(self, name) is not _MISSING:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in self.fields:
+            return getattr(self, key) is not _MISSING
+        return bool(self.extra) and key in self.extra
+
+    def get(self, key, default=None):
+        if key in self.fields:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+    def replace(self, **changes):
+        """Return a copy of this record with the given fields changed"""
+        new = self.__class__.__new__(self.__class__)
+        for name in self.fields:
+            setattr(new, name, changes.pop(name) if name in changes else getattr(self, name))
+        new.extra = dict(self.extra) if self.extra else None
+        for key, value in changes.items():
+            new[key] = value
+        return new
+
+    def __reduce__(self):
+        # Used by copy/deepcopy and pickle; keeps the _MISSING sentinel out of
+        # the copied state
+        return (self.__class__, (self.to_dict(),))
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+class Book(Record):
+    fields = ("id", "isbn", "title", "author", "genre", "status", "copies", "available_copies",
+              "publish_year", "pages", "rating", "description")
+    __slots__ = fields
+
+def new_book(book_data, book_id):
+    """Book from catalog data, with the defaults every backend gives missing fields"""
+    copies = book_data.get('copies', 1)
+    return Book(
+        id=book_data.get('id', book_id),
+        title=book_data.get('title', ''),
+        author=book_data.get('author', ''),
+        isbn=book_data['isbn'],
+        genre=book_data.get('genre', ''),
+        status=book_data.get('status', 'Available'),
+        copies=copies,
+        available_copies=book_data.get('available_copies', copies),
+        publish_year=book_data.get('publish_year'),
+        pages=book_data.get('pages'),
+        rating=book_data.get('rating', 0.0),
+        description=book_data.get('description', '')
+    )
+
+class Member(Record):
+    fields = ("member_id", "name", "email", "role", "books_borrowed", "fine_amount", "password")
+    __slots__ = fields
+
+class Transaction(Record):
+    fields = ("id", "member_id", "book_isbn", "type", "date", "transaction_date", "due_date",
+              "return_date", "fine_amount")
+    __slots__ = fields
+
+# Read-only view of a record handed out by the backends' read APIs. The
+# backends replace records instead of mutating them (copy-on-write), so a view
+# is a stable snapshot and costs one small object instead of a deepcopy.
+# Holds and pickups are plain dicts that are likewise never changed once
+# queued. Copying or pickling a view yields an ordinary, mutable record.
+class RecordView(Mapping):
+    __slots__ = ("_record",)
+
+    def __init__(self, record):
+        self._record = record
+
+    def __getitem__(self, key):
+        return self._record[key]
+
+    def __iter__(self):
+        return iter(self._record)
+
+    def __len__(self):
+        return len(self._record)
+
+    def __contains__(self, key):
+        return key in self._record
+
+    def get(self, key, default=None):
+        return self._record.get(key, default)
+
+    def to_dict(self):
+        if isinstance(self._record, dict):
+            return dict(self._record)
+        return self._record.to_dict()
+
+    def __reduce__(self):
+        return (self._record.__class__, (self.to_dict(),))
+
+    def __eq__(self, other):
+        if isinstance(other, RecordView):
+            other = other._record
+        return self._record == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"RecordView({self._record!r})"
@@ -0,0 +1,198 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+def isbn_digits(isbn):
+    """ISBN with spaces and hyphens removed and the check character uppercased"""
+    return str(isbn).replace("-", "").replace(" ", "").upper()
+
+# Inverted index over the text fields of each book, maintained incrementally
+# through add/update/remove. Multi-term queries intersect posting lists,
+# smallest first, and rank the survivors with BM25.
+class InvertedIndex:
+    def __init__(self, fields=("title", "author", "genre", "description"), k1=1.2, b=0.75):
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = {}
+        self.doc_text = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _text(self, book):
+        return tuple(str(book.get(field) or "") for field in self.fields)
+
+    def add(self, book):
+        isbn = book["isbn"]
+        if isbn in self.doc_lengths:
+            self.update(book)
+            return
+        text = self._text(book)
+        terms = Counter()
+        for value in text:
+            terms.update(tokenize(value))
+        for term, freq in terms.items():
+            self.postings.setdefault(term, {})[isbn] = freq
+        length = sum(terms.values())
+        self.doc_lengths[isbn] = length
+        self.doc_text[isbn] = text
+        self.total_length += length
+
+    def update(self, book):
+        # Circulation only touches status/copies, so most updates are no-ops
+        if self.doc_text.get(book["isbn"]) == self._text(book):
+            return
+        self.remove(book)
+        self.add(book)
+
+    def remove(self, book):
+        isbn = book["isbn"]
+        text = self.doc_text.pop(isbn, None)
+        if text is None:
+            return
+        for term in set(token for value in text for token in tokenize(value)):
+            posting = self.postings[term]
+            del posting[isbn]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(isbn)
+
+    def search(self, query, limit=20):
+        """Return up to `limit` (isbn, score) pairs containing every query term, best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        lists = []
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                return []
+            lists.append((term, posting))
+        lists.sort(key=lambda item: len(item[1]))
+
+        # Probe the longer lists from the (small) candidate set rather than
+        # letting set.intersection_update walk every key of a long posting
+        candidates = set(lists[0][1])
+        for _, posting in lists[1:]:
+            candidates = {isbn for isbn in candidates if isbn in posting}
+            if not candidates:
+                return []
+
+        count = len(self.doc_lengths)
+        avg_length = self.total_length / count if count else 0
+        weights = [(posting, math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5)))
+                   for _, posting in lists]
+        k1, b = self.k1, self.b
+
+        def score(isbn):
+            norm = k1 * (1 - b + b * self.doc_lengths[isbn] / avg_length) if avg_length else k1
+            total = 0.0
+            for posting, idf in weights:
+                freq = posting[isbn]
+                total += idf * freq * (k1 + 1) / (freq + norm)
+            return total
+
+        scored = ((score(isbn), isbn) for isbn in candidates)
+        return [(isbn, s) for s, isbn in heapq.nlargest(limit, scored)]
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# Trigram index reproducing the dashboards' substring search: a book matches
+# when the term occurs anywhere in title + author + isbn, lowercased and
+# concatenated. Terms of three or more characters are narrowed to books that
+# contain all of their trigrams and only those candidates are verified.
+class TrigramIndex:
+    def __init__(self, fields=("title", "author", "isbn")):
+        self.fields = fields
+        self.haystacks = {}
+        self.grams = {}
+
+    def __len__(self):
+        return len(self.haystacks)
+
+    def _haystack(self, book):
+        return "".join(str(book.get(field) or "").lower() for field in self.fields)
+
+    def add(self, book):
+        isbn = book["isbn"]
+        if isbn in self.haystacks:
+            self.update(book)
+            return
+        haystack = self._haystack(book)
+        self.haystacks[isbn] = haystack
+        for gram in _trigrams(haystack):
+            self.grams.setdefault(gram, set()).add(isbn)
+
+    def update(self, book):
+        if self.haystacks.get(book["isbn"]) == self._haystack(book):
+            return
+        self.remove(book)
+        self.add(book)
+
+    def remove(self, book):
+        isbn = book["isbn"]
+        haystack = self.haystacks.pop(isbn, None)
+        if haystack is None:
+            return
+        for gram in _trigrams(haystack):
+            posting = self.grams[gram]
+            posting.discard(isbn)
+            if not posting:
+                del self.grams[gram]
+
+    def search(self, term):
+        """Return the set of ISBNs whose haystack contains `term` (case-insensitive)"""
+        term = term.lower()
+        if len(term) < 3:
+            return {isbn for isbn, haystack in self.haystacks.items() if term in haystack}
+        postings = []
+        for gram in _trigrams(term):
+            posting = self.grams.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return {isbn for isbn in candidates if term in self.haystacks[isbn]}
+
+# Catalog ISBNs stored with hyphens or spaces, keyed by their bare-digit form.
+# Imports carry bare-digit ISBNs, so this is what they check for duplicates
+# that the backends' exact-match lookups would miss, without a catalog walk.
+class IsbnAliasIndex:
+    def __init__(self):
+        self.aliases = {}
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def add(self, book):
+        isbn = book["isbn"]
+        digits = isbn_digits(isbn)
+        if digits != isbn:
+            self.aliases.setdefault(digits, set()).add(isbn)
+
+    def update(self, book):
+        # The ISBN is the key, so an update never changes its alias
+        self.add(book)
+
+    def remove(self, book):
+        isbn = book["isbn"]
+        digits = isbn_digits(isbn)
+        spellings = self.aliases.get(digits)
+        if spellings is not None:
+            spellings.discard(isbn)
+            if not spellings:
+                del self.aliases[digits]
+
+    def get_all(self):
+        return list(self.aliases)
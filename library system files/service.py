@@ -0,0 +1,404 @@
+import argparse
+import asyncio
+import http.client
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+from urllib.parse import urlsplit
+
+# Local HTTP/JSON circulation service, so many kiosks can share one live
+# backend (InMemoryDatabaseManager, DatabaseManager or LibrarySystem).
+#
+#   POST /call/<method>   body {"args": [...], "kwargs": {...}}
+#                         -> {"result": ...} or {"error": "..."}
+#   POST /call/iter_<kind> -> chunked JSON lines, {"record": ...} per record,
+#                         or a last {"error": "..."} line if the walk fails
+#   GET  /health          -> {"status": "ok"}
+#   GET  /methods         -> the method names this backend serves
+#   GET  /stats           -> request count and p50/p99 service latency
+#
+# Connections are HTTP/1.1 keep-alive. Backend calls run on a thread pool
+# (the backends lock per ISBN/member), so neither SQL I/O nor the in-memory
+# backend's heavier work - snapshot rebuilds, checkpoints that pickle the
+# whole store, waits on a WAL group commit - ever stalls the loop and the
+# other kiosks on it. Identical reads that arrive while one is already in
+# flight are coalesced onto that call's result instead of running again.
+#
+# Every sweep_interval seconds the service also runs the backend's
+# expire_holds, so lapsed pickups pass to the next patron in line without
+# anyone having to reconcile holds against the shelves.
+
+READ_METHODS = (
+    "authenticate_user", "get_all_books", "get_all_members", "get_books_page", "get_members_page",
+    "get_book_count", "get_member_count", "filter_books", "search_books", "get_next_hold",
+    "get_member_holds", "get_hold_count", "get_pending_reservations", "get_transactions",
+    "get_open_loans", "get_member", "get_book", "query_books", "get_facets", "get_overdue_loans",
+    "get_overdue_count", "get_ready_holds", "get_isbn_aliases",
+)
+WRITE_METHODS = (
+    "borrow_book", "return_book", "place_hold", "cancel_hold", "add_book", "remove_book",
+    "add_member", "remove_member", "borrow_many", "return_many", "accrue_fines",
+    "expire_holds",
+)
+# Lazy walks (used by exporter.backup), streamed back in batches
+ITER_METHODS = ("iter_books", "iter_members", "iter_transactions")
+STREAM_BATCH = 500
+MAX_BODY = 1 << 20
+SWEEP_INTERVAL = 15 * 60
+
+def _encode(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+def _json_bytes(payload):
+    return json.dumps(payload, default=_encode, separators=(",", ":")).encode("utf-8")
+
+def _next_chunk(records):
+    # Up to STREAM_BATCH records as JSON lines, and whether the walk is over
+    lines = []
+    try:
+        for record in islice(records, STREAM_BATCH):
+            lines.append(_json_bytes({"record": record}))
+        done = len(lines) < STREAM_BATCH
+    except Exception as e:
+        lines.append(_json_bytes({"error": f"{type(e).__name__}: {e}"}))
+        done = True
+    return b"".join(line + b"\n" for line in lines), done
+
+class _RecordStream:
+    def __init__(self, records):
+        self.records = records
+
+class CirculationService:
+    def __init__(self, backend, host="127.0.0.1", port=8765, workers=16, offload=True, latency_window=100000,
+                 sweep_interval=SWEEP_INTERVAL):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        # offload=False runs calls inline on the loop, for backends that are
+        # not safe to call from several threads
+        self.offload = offload
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="circulation")
+        self.methods = {name for name in READ_METHODS + WRITE_METHODS + ITER_METHODS if hasattr(backend, name)}
+        self.inflight = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.server = None
+        self.loop = None
+        self.sweep_interval = sweep_interval if hasattr(backend, "expire_holds") else None
+        self.sweeper = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.sweep_interval:
+            self.sweeper = asyncio.get_running_loop().create_task(self._sweep_holds())
+        return self.server
+
+    async def _sweep_holds(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self._call("expire_holds", [], {})
+            except Exception as e:
+                print(f"Hold sweep failed: {e}")
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            if self.loop is not None and self.loop.is_running():
+                self.loop.call_soon_threadsafe(self.server.close)
+                if self.sweeper is not None:
+                    self.loop.call_soon_threadsafe(self.sweeper.cancel)
+            else:
+                self.server.close()
+                if self.sweeper is not None:
+                    self.sweeper.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, version = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Request too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                started = time.perf_counter()
+                status, payload = await self._dispatch(method, urlsplit(target).path, body)
+                self.latencies.append(time.perf_counter() - started)
+                self.requests += 1
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, _RecordStream):
+            await self._stream(writer, payload.records, keep_alive)
+            return
+        body = payload if isinstance(payload, bytes) else _json_bytes(payload)
+        reason = http.client.responses.get(status, "")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def _stream(self, writer, records, keep_alive):
+        writer.write("HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1"))
+        loop = asyncio.get_running_loop()
+        while True:
+            # Walking and serialising a batch can take a while; keep it off the loop
+            chunk, done = await loop.run_in_executor(self.executor, _next_chunk, records)
+            if chunk:
+                writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+                await writer.drain()
+            if done:
+                break
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _dispatch(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "GET" and path == "/methods":
+            return 200, {"methods": sorted(self.methods)}
+        if method != "POST" or not path.startswith("/call/"):
+            return 404, {"error": "Not found"}
+        name = path[len("/call/"):]
+        if name not in self.methods:
+            return 404, {"error": f"Unknown method {name}"}
+        try:
+            request = json.loads(body) if body else {}
+            args = request.get("args", [])
+            kwargs = request.get("kwargs", {})
+        except (ValueError, AttributeError):
+            return 400, {"error": "Body must be a JSON object"}
+        try:
+            # Only a call that does not fit the method's signature is the
+            # client's fault; a TypeError raised inside the backend is a 500
+            inspect.signature(getattr(self.backend, name)).bind(*args, **kwargs)
+        except TypeError as e:
+            return 400, {"error": str(e)}
+        try:
+            if name in ITER_METHODS:
+                walk = getattr(self.backend, name)
+                records = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, lambda: iter(walk(*args, **kwargs)))
+                return 200, _RecordStream(records)
+            if name in READ_METHODS and self.offload:
+                return 200, await self._coalesced(name, body, args, kwargs)
+            result = await self._call(name, args, kwargs)
+            return 200, _json_bytes({"result": result})
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _call(self, name, args, kwargs):
+        method = getattr(self.backend, name)
+        if not self.offload:
+            return method(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: method(*args, **kwargs))
+
+    async def _coalesced(self, name, body, args, kwargs):
+        # Requests are keyed by their exact body; followers await the leader's
+        # already-serialised response
+        key = (name, body)
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = _json_bytes({"result": await self._call(name, args, kwargs)})
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # followers re-raise it; mark it retrieved
+            raise
+        finally:
+            del self.inflight[key]
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+        return {"requests": self.requests, "coalesced": self.coalesced,
+                "p50_ms": percentile(0.50), "p99_ms": percentile(0.99)}
+
+def run_in_thread(backend, host="127.0.0.1", port=0, **options):
+    """Start a service on a background event loop; returns it once it is listening"""
+    service = CirculationService(backend, host, port, **options)
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        service.loop = loop
+        loop.run_until_complete(service.start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return service
+
+class ServiceError(Exception):
+    pass
+
+# Thin client with the backend method surface, usable as LibraryGUI's db.
+# Each thread keeps its own keep-alive connection. The methods on offer are
+# the ones the server reports for its backend, fetched on first use, so
+# hasattr(client, name) answers for the backend behind the service.
+class ServiceClient:
+    def __init__(self, host="127.0.0.1", port=8765, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+        self._methods = None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _request(self, method, path, body=None):
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                payload = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server dropped an idle keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise ServiceError(payload.get("error", f"HTTP {response.status}"))
+        return payload
+
+    def stream(self, name, *args, **kwargs):
+        """Lazily iterate the records of one of the backend's iter_* walks.
+        Each walk has a connection of its own, so other calls can be made
+        while it is being read."""
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("POST", f"/call/{name}", body=_json_bytes({"args": args, "kwargs": kwargs}),
+                         headers={"Content-Type": "application/json", "Connection": "close"})
+            response = conn.getresponse()
+            if response.status != 200:
+                raise ServiceError(json.loads(response.read()).get("error", f"HTTP {response.status}"))
+            for line in response:
+                item = json.loads(line)
+                if "error" in item:
+                    raise ServiceError(item["error"])
+                yield item["record"]
+        finally:
+            conn.close()
+
+    def call(self, name, *args, **kwargs):
+        payload = self._request("POST", f"/call/{name}", _json_bytes({"args": args, "kwargs": kwargs}))
+        result = payload["result"]
+        # (success, message) pairs arrive as JSON arrays; so do the items of
+        # borrow_many / return_many / expire_holds
+        if name in WRITE_METHODS and isinstance(result, list):
+            success, detail = result
+            if name in ("borrow_many", "return_many", "expire_holds"):
+                detail = [tuple(item) for item in detail]
+            return success, detail
+        return result
+
+    @property
+    def methods(self):
+        if self._methods is None:
+            self._methods = frozenset(self._request("GET", "/methods")["methods"])
+        return self._methods
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.methods:
+            raise AttributeError(name)
+        if name in ITER_METHODS:
+            return lambda *args, **kwargs: self.stream(name, *args, **kwargs)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def close_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a library backend to kiosks over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--sweep-interval", type=float, default=SWEEP_INTERVAL,
+                        help="seconds between expired-pickup sweeps (0 disables)")
+    store = parser.add_mutually_exclusive_group()
+    store.add_argument("--data-dir", help="in-memory store persisted to this directory")
+    store.add_argument("--sqlite", help="SQLite database file")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from database_manager import DatabaseManager
+        backend = DatabaseManager(database=args.sqlite, backend="sqlite")
+    else:
+        from database_manager import InMemoryDatabaseManager
+        backend = InMemoryDatabaseManager(data_dir=args.data_dir)
+
+    service = CirculationService(backend, args.host, args.port, args.workers, sweep_interval=args.sweep_interval)
+    print(f"📡 Circulation service on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        backend.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import random
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+from database_manager import InMemoryDatabaseManager
+from library_system import LibrarySystem
+
+@pytest.fixture
+def frequent_switches():
+    # Switch threads as often as possible to expose races
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+@pytest.mark.parametrize("make, copies_field", [(InMemoryDatabaseManager, "available_copies"),
+                                                (LibrarySystem, "copies")])
+def test_concurrent_circulation_loses_no_updates(frequent_switches, make, copies_field):
+    db = make()
+    isbns = [f"978-{i:010d}" for i in range(100)] + ["978-9999999999"]
+    member_ids = [f"STU{i:06d}" for i in range(30)]
+    for isbn in isbns:
+        db.add_book({"isbn": isbn, "title": isbn, "status": "Available", "copies": 2, "available_copies": 2})
+    for member_id in member_ids:
+        db.add_member({"member_id": member_id, "name": member_id, "books_borrowed": 0, "fine_amount": 0})
+    book_delta, member_delta = Counter(), Counter()
+    counts_lock = threading.Lock()
+
+    def desk(seed):
+        rng = random.Random(seed)
+        books, people = Counter(), Counter()
+        for _ in range(1000):
+            # One contested title plus a spread of ordinary ones
+            isbn = isbns[-1] if rng.random() < 0.2 else rng.choice(isbns)
+            member_id = rng.choice(member_ids)
+            if rng.random() < 0.6:
+                if db.borrow_book(member_id, isbn)[0]:
+                    books[isbn] -= 1
+                    people[member_id] += 1
+            elif db.return_book(member_id, isbn)[0]:
+                books[isbn] += 1
+                people[member_id] -= 1
+        with counts_lock:
+            book_delta.update(books)
+            member_delta.update(people)
+
+    desks = [threading.Thread(target=desk, args=(seed,)) for seed in range(8)]
+    for thread in desks:
+        thread.start()
+    for thread in desks:
+        thread.join()
+    for isbn in isbns:
+        book = db.search_book(isbn) if hasattr(db, "search_book") else db.get_book(isbn)
+        assert book[copies_field] == 2 + book_delta[isbn], f"lost update on {isbn}"
+        assert book[copies_field] >= 0, f"negative copies on {isbn}"
+    members_now = {member["member_id"]: member["books_borrowed"] for member in db.get_all_members()}
+    for member_id in member_ids:
+        assert members_now[member_id] == member_delta[member_id], f"lost update on {member_id}"
+
+def test_overlapping_batches_neither_deadlock_nor_lose_copies(frequent_switches):
+    db = InMemoryDatabaseManager()
+    isbns = [f"978-{i:010d}" for i in range(10)]
+    db.add_books([{"isbn": isbn, "title": isbn, "copies": 50, "available_copies": 50} for isbn in isbns])
+    db.add_members([{"member_id": f"STU{t}", "name": f"Desk {t}", "books_borrowed": 0} for t in range(4)])
+
+    def desk(t):
+        rng = random.Random(t)
+        for _ in range(100):
+            # Stacks in opposite orders on alternate desks
+            stack = rng.sample(isbns, 4)
+            stack.sort(reverse=t % 2 == 1)
+            if db.borrow_many(f"STU{t}", stack, atomic=True)[0]:
+                assert db.return_many(f"STU{t}", stack[::-1])[0]
+
+    desks = [threading.Thread(target=desk, args=(t,)) for t in range(4)]
+    for thread in desks:
+        thread.start()
+    for thread in desks:
+        thread.join(30)
+    assert not any(thread.is_alive() for thread in desks), "deadlock"
+    assert all(db.get_book(isbn)["available_copies"] == 50 for isbn in isbns)
+    assert all(member["books_borrowed"] == 0 for member in db.get_all_members() if member["member_id"] in
+               {f"STU{t}" for t in range(4)})
@@ -0,0 +1,273 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from data_structures import AVLTree, FieldIndex, HashTable, PickupShelf, SortedIndex
+from ledger import TransactionLedger
+from overdue import OverdueTracker
+from query_engine import BookFilter
+from records import Transaction
+from search_index import TrigramIndex
+
+def test_hash_table_iteration_during_rehash():
+    table = HashTable(size=8, rehash_batch=1)
+    for i in range(50):
+        table.insert(f"M{i:03d}", i)
+    assert table.get_stats()["rehashing"]
+    seen = []
+    for n, value in enumerate(table.iter_values()):
+        seen.append(value)
+        # Interleaved writes keep migrating buckets and start new resizes
+        table.insert(f"N{n:03d}", -1)
+    originals = [value for value in seen if value >= 0]
+    assert sorted(originals) == list(range(50))
+
+def test_hash_table_matches_dict():
+    rng = random.Random(3)
+    table, expected = HashTable(size=4, rehash_batch=2), {}
+    for _ in range(5000):
+        key = f"K{rng.randrange(800)}"
+        if rng.random() < 0.3:
+            assert table.delete(key) == (expected.pop(key, None) is not None)
+        else:
+            value = rng.random()
+            table.insert(key, value)
+            expected[key] = value
+        assert table.get(key) == expected.get(key)
+    assert len(table) == len(expected)
+    assert sorted(table.iter_values()) == sorted(expected.values())
+
+def check_avl(node, lo=None, hi=None):
+    # Returns (height, count) of the subtree and checks order, balance and the
+    # cached heights and counts on the way
+    if node is None:
+        return 0, 0
+    assert (lo is None or node.key > lo) and (hi is None or node.key < hi)
+    assert node.key == node.data["isbn"]
+    left_height, left_count = check_avl(node.left, lo, node.key)
+    right_height, right_count = check_avl(node.right, node.key, hi)
+    assert abs(left_height - right_height) <= 1
+    assert node.height == max(left_height, right_height) + 1
+    assert node.count == left_count + right_count + 1
+    return node.height, node.count
+
+def test_avl_tree_matches_sorted_list():
+    rng = random.Random(11)
+    tree, expected = AVLTree(), {}
+    for step in range(4000):
+        isbn = f"{rng.randrange(600):04d}"
+        op = rng.random()
+        if op < 0.55:
+            book = {"isbn": isbn, "step": step}
+            tree.insert(book)
+            expected[isbn] = book
+        elif op < 0.9:
+            assert tree.delete(isbn) == (expected.pop(isbn, None) is not None)
+        else:
+            batch = [{"isbn": f"{rng.randrange(600):04d}", "step": step} for _ in range(rng.randrange(1, 80))]
+            tree.extend(batch)
+            expected.update((book["isbn"], book) for book in batch)
+        if step % 50 == 0:
+            assert check_avl(tree.root)[1] == len(tree) == len(expected)
+    keys = sorted(expected)
+    assert [book["isbn"] for book in tree.iter_books()] == keys
+    assert all(tree.search(isbn) is expected[isbn] for isbn in keys)
+    for offset in (0, 1, 17, len(keys) - 3, len(keys) + 5):
+        assert [book["isbn"] for book in tree.page(offset, 10)] == keys[offset:offset + 10]
+        assert [book["isbn"] for book in tree.page(offset, 10, descending=True)] == keys[::-1][offset:offset + 10]
+    assert [book["isbn"] for book in tree.range("0100", "0200")] == [k for k in keys if "0100" <= k < "0200"]
+    assert [book["isbn"] for book in tree.prefix("01")] == [k for k in keys if k.startswith("01")]
+    tree.bulk_load(reversed(list(expected.values())))
+    assert check_avl(tree.root)[1] == len(keys)
+    assert [book["isbn"] for book in tree] == keys
+
+def test_sorted_index_matches_sorted_list():
+    rng = random.Random(5)
+    index, expected = SortedIndex(load=4), []
+    for step in range(3000):
+        op = rng.random()
+        if op < 0.5:
+            entry = rng.randrange(400)
+            index.add(entry)
+            expected.append(entry)
+        elif op < 0.85:
+            entry = rng.randrange(400)
+            present = entry in expected
+            assert index.remove(entry) == present
+            if present:
+                expected.remove(entry)
+        elif op < 0.95:
+            batch = [rng.randrange(400) for _ in range(rng.randrange(1, 40))]
+            index.extend(batch)
+            expected.extend(batch)
+        else:
+            expected = [rng.randrange(400) for _ in range(rng.randrange(0, 60))]
+            index.bulk_load(expected)
+        expected.sort()
+        if step % 25 == 0:
+            assert list(index) == expected and len(index) == len(expected)
+            assert index.maxes == [block[-1] for block in index.blocks]
+            assert all(block for block in index.blocks)
+            for offset in {0, 1, len(expected) // 2, max(len(expected) - 3, 0)}:
+                assert index.slice(offset, 7) == expected[offset:offset + 7]
+                assert index.slice(offset, 7, descending=True) == expected[::-1][offset:offset + 7]
+            pivot = rng.randrange(400)
+            assert index.after(pivot, 5) == [entry for entry in expected if entry > pivot][:5]
+    assert index.after(None, 10 ** 6) == expected
+
+def test_field_index_order_and_pages():
+    rng = random.Random(2)
+    index, records = FieldIndex("title"), {}
+    for i in range(500):
+        isbn = f"{rng.randrange(200):04d}"
+        record = {"isbn": isbn, "title": rng.choice(["a", "b", "c", None])}
+        if rng.random() < 0.2 and isbn in records:
+            index.remove(records.pop(isbn))
+        elif isbn in records:
+            index.update(record)
+            records[isbn] = record
+        else:
+            index.add(record)
+            records[isbn] = record
+
+    def key(isbn):
+        title = records[isbn]["title"]
+        return ((0, "") if title is None else (1, title), isbn)
+
+    ordered = sorted(records, key=key)
+    assert list(index.ids()) == ordered
+    assert index.page(10, 20) == ordered[10:30]
+    few = set(rng.sample(ordered, 5))
+    assert index.order(few) == [isbn for isbn in ordered if isbn in few]
+    assert index.order(set(ordered)) == ordered
+
+def test_trigram_index_matches_the_dashboard_scan():
+    rng = random.Random(9)
+    words = ["gats", "great", "by", "code", "clean", "978-0", "ab", "robert", "martin", "data"]
+    index, books = TrigramIndex(), {}
+    for step in range(1500):
+        isbn = f"978-{rng.randrange(300):04d}"
+        if isbn in books and rng.random() < 0.25:
+            index.remove(books.pop(isbn))
+        else:
+            book = {"isbn": isbn, "title": " ".join(rng.sample(words, 2)).title(),
+                    "author": rng.choice(["Robert Martin", "F. Scott", "", None])}
+            index.add(book)
+            books[isbn] = book
+        if step % 100 == 0:
+            # Short terms, terms spanning title and author, and ISBN fragments
+            for term in ["", "a", "gA", "gats", "by", "scott", "dataf. s", "martin978", "978-01", "0-3", "zzz"]:
+                expected = {isbn for isbn, book in books.items() if BookFilter(search_term=term).matches(book)}
+                assert index.search(term) == expected, term
+    assert len(index) == len(books)
+
+def test_transaction_ledger_matches_a_plain_list():
+    rng = random.Random(12)
+    ledger, rows = TransactionLedger(), []
+    for n in range(2000):
+        member_id, isbn = f"M{rng.randrange(20)}", f"B{rng.randrange(15)}"
+        # Mostly in date order, with the odd back-dated row
+        day = date(2024, 1, 1) + timedelta(days=n // 10 - (rng.randrange(30) if rng.random() < 0.05 else 0))
+        if rng.random() < 0.4:
+            open_rows = [i for i, row in enumerate(rows) if row["type"] == "Borrow" and row["member_id"] == member_id
+                         and row["book_isbn"] == isbn and row["return_date"] is None]
+            closed = ledger.close_loan(member_id, isbn, day)
+            if open_rows:
+                rows[open_rows[-1]] = rows[open_rows[-1]].replace(return_date=day)
+                assert closed == rows[open_rows[-1]]
+            else:
+                assert closed is None
+        else:
+            txn = Transaction(id=f"T{n:05d}", member_id=member_id, book_isbn=isbn,
+                              type=rng.choice(["Borrow", "Borrow", "Return"]), transaction_date=day,
+                              return_date=None)
+            assert ledger.append(txn) == len(rows)
+            rows.append(txn)
+    assert list(ledger) == rows
+
+    def newest_first(candidates):
+        # Stable by date: rows of the same day keep arrival order
+        return sorted(candidates, key=lambda row: row["transaction_date"])[::-1]
+
+    def open_loans(member_id=None):
+        return [row for row in rows if row["type"] == "Borrow" and row["return_date"] is None
+                and member_id in (None, row["member_id"])]
+
+    assert ledger.recent(25) == newest_first(rows)[:25]
+    assert ledger.recent(0) == []
+    for member_id in ["M0", "M7", "nobody"]:
+        history = newest_first([row for row in rows if row["member_id"] == member_id])
+        assert ledger.recent(5, member_id) == history[:5]
+        assert list(ledger.member_history(member_id)) == history
+        assert sorted(row["id"] for row in ledger.iter_open_loans(member_id)) == \
+            sorted(row["id"] for row in open_loans(member_id))
+        for isbn in ["B0", "B3"]:
+            loans = [row for row in open_loans(member_id) if row["book_isbn"] == isbn]
+            assert ledger.find_open_loan(member_id, isbn) == (loans[-1] if loans else None)
+    assert len(list(ledger.iter_open_loans())) == len(open_loans())
+
+def test_overdue_tracker_matches_a_loan_scan():
+    rng = random.Random(24)
+    tracker, loans, fines = OverdueTracker(capacity=4), {}, {}
+    start = date(2024, 1, 1)
+    for day in range(0, 120, 3):
+        today = start + timedelta(days=day)
+        for n in range(rng.randrange(3, 12)):
+            key = f"L{day:03d}-{n}"
+            loans[key] = (f"M{rng.randrange(8)}", f"B{n}", today + timedelta(days=rng.randrange(1, 40)))
+            tracker.add(key, *loans[key], ref=key)
+        for key in rng.sample(sorted(loans), min(len(loans), rng.randrange(4))):
+            member_id, _, _ = loans.pop(key)
+            assert tracker.remove(key) == fines.pop(key, 0.0)
+        overdue = sorted((due, key) for key, (_, _, due) in loans.items() if due < today)
+        rows = tracker.overdue(today)
+        # Oldest first; loans due the same day may come in any order
+        assert sorted((row[3], row[0]) for row in rows) == overdue
+        assert [row[3] for row in rows] == [due for due, _ in overdue]
+        assert all(row[4] == (today - row[3]).days for row in rows)
+        assert tracker.overdue_count(today) == len(overdue)
+        if day % 9 == 0:
+            expected = {}
+            for due, key in overdue:
+                owed = min(round((today - due).days * 0.5, 2), 6.0)
+                if owed > fines.get(key, 0.0):
+                    member_id = loans[key][0]
+                    expected[member_id] = round(expected.get(member_id, 0.0) + owed - fines.get(key, 0.0), 2)
+                    fines[key] = owed
+            added = tracker.accrue(today, rate=0.5, max_fine=6.0)
+            assert added == pytest.approx(expected)
+            assert tracker.accrue(today, rate=0.5, max_fine=6.0) == {}
+            assert tracker.charges() == pytest.approx(fines)
+    assert len(tracker) == len(loans)
+    key = next(key for key in sorted(fines) if key in loans)
+    member_id, isbn, _ = loans[key]
+    closed = tracker.close(member_id, isbn)
+    assert closed is not None and closed[0] in loans
+
+def test_pickup_shelf_expires_in_deadline_order():
+    rng = random.Random(25)
+    shelf, model = PickupShelf(pickup_days=5), {}
+    start = date(2024, 3, 1)
+    for day in range(60):
+        today = start + timedelta(days=day)
+        for _ in range(rng.randrange(4)):
+            key = (f"M{rng.randrange(10)}", f"B{rng.randrange(6)}")
+            if key not in model:
+                shelf.shelve({"member_id": key[0], "book_isbn": key[1]}, today)
+                model[key] = today + timedelta(days=5)
+        for key in rng.sample(sorted(model), min(len(model), rng.randrange(3))):
+            del model[key]
+            assert shelf.collect(*key)["pickup_expires"] is not None
+        lapsed = sorted((due, key) for key, due in model.items() if due < today)
+        expired = shelf.expire(today)
+        # Earliest deadline first; pickups made the same day may come in any order
+        assert sorted((row["pickup_expires"], (row["member_id"], row["book_isbn"])) for row in expired) == lapsed
+        assert [row["pickup_expires"] for row in expired] == [due for due, _ in lapsed]
+        for _, key in lapsed:
+            del model[key]
+        assert len(shelf) == len(model)
+        for n in range(6):
+            assert shelf.held_copies(f"B{n}") == sum(1 for _, isbn in model if isbn == f"B{n}")
+    assert shelf.collect("nobody", "B0") is None
+    assert {(row["member_id"], row["book_isbn"]) for row in shelf.get_all()} == set(model)
@@ -0,0 +1,155 @@
+import copy
+import random
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from database_manager import SEARCH_FIELDS, DatabaseManager, InMemoryDatabaseManager
+
+def test_substring_search_types_match_a_scan():
+    db = InMemoryDatabaseManager()
+    db.add_books([{"isbn": f"978-1-00-{i:06d}", "title": f"Volume {i} of Lore", "author": f"Writer {i % 7}"}
+                  for i in range(200)])
+    for term in ["", "v", "lo", "LORE", "volume 1", "writer 3", "978-0", "00-0001", "8-1", "nothing"]:
+        for search_type, fields in SEARCH_FIELDS.items():
+            expected = sorted((book for book in db.get_all_books()
+                               if any(term.lower() in book[field].lower() for field in fields)),
+                              key=lambda book: (book["title"], book["isbn"]))
+            found = db.search_books(term, search_type)
+            assert [book["isbn"] for book in found] == [book["isbn"] for book in expected], (term, search_type)
+    assert db.search_books("lore", "publisher") == []
+
+@pytest.mark.parametrize("database", [":memory:", "file"])
+def test_threaded_sqlite_circulation_conserves_copies(tmp_path, database):
+    db = DatabaseManager(database=str(tmp_path / "libralog.db") if database == "file" else database,
+                         backend="sqlite", pool_size=4)
+    db.add_books([{"isbn": f"97800000000{i:02d}", "title": f"Title {i}", "copies": 3} for i in range(4)])
+    db.add_members([{"member_id": f"M{t}", "name": f"Kiosk {t}"} for t in range(4)])
+    errors = []
+
+    def kiosk(t):
+        rng, loans = random.Random(t), []
+        try:
+            for _ in range(150):
+                if loans and rng.random() < 0.5:
+                    assert db.return_book(f"M{t}", loans.pop(rng.randrange(len(loans))))[0]
+                else:
+                    isbn = f"97800000000{rng.randrange(4):02d}"
+                    if db.borrow_book(f"M{t}", isbn)[0]:
+                        loans.append(isbn)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=kiosk, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    out = sum(member["books_borrowed"] for member in db.get_all_members())
+    books = [db.get_book(f"97800000000{i:02d}") for i in range(4)]
+    assert sum(book["copies"] - book["available_copies"] for book in books) == out
+    assert all(0 <= book["available_copies"] <= book["copies"] for book in books)
+    assert len(db.get_overdue_loans(date.today() + timedelta(days=60))) == out
+    db.close_connection()
+
+def test_columnar_range_filters_match_the_row_path():
+    books = [{"isbn": f"97800000001{i:02d}", "title": f"Title {i}", "genre": ("Poetry", "History")[i % 2],
+              "copies": i % 4, "publish_year": None if i % 5 == 0 else 1950 + i,
+              "rating": None if i % 3 == 0 else i / 10} for i in range(60)]
+    rows, columns = InMemoryDatabaseManager(), InMemoryDatabaseManager(columnar=True)
+    for db in (rows, columns):
+        db.add_books(books)
+        db.remove_book("9780000000107")
+    for spec in [{"publish_year": (None, 2000)}, {"publish_year": (1990, None)}, {"publish_year": (None, None)},
+                 {"rating": (None, 3.0)}, {"rating": (None, None), "genre": "Poetry"},
+                 {"pages": (None, 500)}, {"copies": (1, 2), "publish_year": (None, 1980)}]:
+        expected = [book["isbn"] for book in rows.filter_books(**spec)]
+        assert [book["isbn"] for book in columns.filter_books(**spec)] == expected, spec
+    undated = [book["isbn"] for book in rows.filter_books(publish_year=(None, 2000))]
+    assert "9780000000105" not in undated
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request):
+    if request.param == "memory":
+        db = InMemoryDatabaseManager()
+    else:
+        db = DatabaseManager(database=":memory:", backend="sqlite")
+        db.insert_sample_data()
+    yield db
+    db.close_connection()
+
+GATSBY, PYTHON, JAVA, CLEAN = "978-0-7432-7356-5", "978-1-4919-5713-7", "978-0134685991", "978-0135166307"
+
+def circulation_state(db, member_id):
+    books = {book["isbn"]: (book["available_copies"], book["status"]) for book in db.get_all_books()}
+    return books, db.get_member(member_id)["books_borrowed"], sorted(
+        (loan["book_isbn"], loan["return_date"]) for loan in db.get_open_loans(member_id))
+
+def test_borrow_many_reports_each_item(manager):
+    ok, results = manager.borrow_many("LIB001", [JAVA, "missing", CLEAN, PYTHON, CLEAN, CLEAN])
+    assert ok
+    assert [(isbn, success) for isbn, success, _ in results] == [
+        (JAVA, True), ("missing", False), (CLEAN, True), (PYTHON, False), (CLEAN, True), (CLEAN, False)]
+    assert results[3][2] == results[5][2] == "No available copies"
+    assert manager.get_book(CLEAN)["available_copies"] == 0
+    assert manager.get_book(CLEAN)["status"] == "Borrowed"
+    assert manager.get_book(JAVA)["available_copies"] == 2
+    assert manager.get_member("LIB001")["books_borrowed"] == 3
+    assert sorted(loan["book_isbn"] for loan in manager.get_open_loans("LIB001")) == [JAVA, CLEAN, CLEAN]
+
+def test_atomic_batches_roll_back_on_any_failure(manager):
+    before = circulation_state(manager, "LIB001")
+    ok, results = manager.borrow_many("LIB001", [JAVA, GATSBY, PYTHON], atomic=True)
+    assert not ok
+    assert [success for _, success, _ in results] == [False, False, False]
+    assert results[0][2] == "Not applied: another item in the batch failed"
+    assert results[2][2] == "No available copies"
+    assert circulation_state(manager, "LIB001") == before
+
+    assert manager.borrow_many("LIB001", [JAVA, GATSBY], atomic=True)[0]
+    before = circulation_state(manager, "LIB001")
+    ok, results = manager.return_many("LIB001", [JAVA, GATSBY, "missing"], atomic=True)
+    assert not ok and results[2] == ("missing", False, "Book or member not found")
+    assert circulation_state(manager, "LIB001") == before
+
+    ok, results = manager.return_many("LIB001", [JAVA, GATSBY], atomic=True)
+    assert ok and all(success for _, success, _ in results)
+    assert manager.get_open_loans("LIB001") == []
+    assert manager.get_member("LIB001")["books_borrowed"] == 0
+    assert manager.get_book(JAVA)["available_copies"] == 3
+    assert manager.borrow_many("nobody", [JAVA])[0] is False
+    assert manager.return_many("LIB001", [JAVA]) == (False, [(JAVA, False, "No books borrowed to return")])
+
+def test_accrue_fines_charges_members_once_per_day(manager):
+    assert manager.borrow_many("LIB001", [JAVA, CLEAN])[0]
+    later = date.today() + timedelta(days=40)
+    assert manager.get_overdue_count(later) == 2
+    assert [loan["book_isbn"] for loan in manager.get_overdue_loans(later)
+            if loan["member_id"] == "LIB001"] in ([JAVA, CLEAN], [CLEAN, JAVA])
+    assert manager.accrue_fines(later) == (True, 5.0)
+    assert manager.accrue_fines(later) == (False, 0.0)
+    assert manager.get_member("LIB001")["fine_amount"] == 5.0
+    assert manager.accrue_fines(date.today() + timedelta(days=400)) == (True, 35.0)
+    assert manager.get_member("LIB001")["fine_amount"] == 40.0
+    assert manager.return_book("LIB001", JAVA)[0]
+    assert manager.get_overdue_count(later) == 1
+
+def test_hold_reads_are_read_only_views():
+    db = InMemoryDatabaseManager()
+    assert db.borrow_book("LIB001", GATSBY)[0] and db.borrow_book("ADM001", GATSBY)[0]
+    assert db.place_hold("STU001", GATSBY)[0] and db.place_hold("STU002", GATSBY)[0]
+    assert db.return_book("LIB001", GATSBY)[0]
+    [pickup], [hold] = db.get_ready_holds("STU001"), db.get_member_holds("STU002")
+    assert db.get_next_hold(GATSBY) == hold and db.get_pending_reservations() == [hold]
+    for view in (pickup, hold):
+        with pytest.raises(TypeError):
+            view["member_id"] = "LIB001"
+        assert copy.deepcopy(view) == view.to_dict() == dict(view)
+        assert type(copy.deepcopy(view)) is dict
+    # Views stay as they were handed out while the queue moves on
+    assert db.cancel_hold("STU001", GATSBY)[0]
+    assert pickup["member_id"] == "STU001" and db.get_pending_reservations() == []
+    assert [ready["member_id"] for ready in db.get_ready_holds()] == ["STU002"]
+    assert db.get_next_hold(GATSBY) is None
@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gui_application import LibraryGUI
+from records import Book
+
+# Stand-in for the Tk root: after() callbacks run only when the test pumps them
+class FakeRoot:
+    def __init__(self):
+        self.timers = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.timers[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, timer):
+        # Like Tk, cancelling a timer that already ran is a no-op
+        self.timers.pop(timer, None)
+
+    def pump(self, until, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not until():
+            assert time.monotonic() < deadline, "search never finished"
+            timers, self.timers = self.timers, {}
+            for callback in timers.values():
+                callback()
+            time.sleep(0.005)
+
+class BookListSpy:
+    def __init__(self):
+        self.rendered = []
+
+    def set_rows(self, rows):
+        self.rendered.append([book["isbn"] for book in rows])
+
+# A backend without indexes, so searches take the cancellable scan path; the
+# walk stops after its first book until `gate` is set
+class ScanOnlyCatalog:
+    def __init__(self, count=5000):
+        self.books = [Book(isbn=f"{i:05d}", title=f"Book {i}", author="", genre="Fiction", status="Available")
+                      for i in range(count)]
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def get_all_books(self):
+        for n, book in enumerate(self.books):
+            if n == 1:
+                self.gate.wait(5)
+            yield book
+
+@pytest.fixture
+def gui():
+    gui = LibraryGUI.__new__(LibraryGUI)
+    gui.root = FakeRoot()
+    gui.system, gui.db = ScanOnlyCatalog(), None
+    gui.search_executor = ThreadPoolExecutor(max_workers=2)
+    gui.searches, gui.genre_filters = {}, {}
+    fetched = []
+    fetch_books = gui.fetch_books
+
+    def spy(search_term, *args):
+        result = fetch_books(search_term, *args)
+        fetched.append((search_term, result is None))
+        return result
+
+    gui.fetch_books = spy
+    gui.fetched = fetched
+    yield gui
+    gui.search_executor.shutdown(wait=True)
+
+def test_keystrokes_are_debounced_into_one_search(gui):
+    book_list, term = BookListSpy(), {"value": ""}
+    for typed in ["b", "bo", "book 4999"]:
+        term["value"] = typed
+        gui.schedule_search(book_list, lambda: (term["value"], "All", "All"), delay=gui.SEARCH_DEBOUNCE_MS)
+    assert len(gui.root.timers) == 1
+    gui.root.pump(lambda: book_list.rendered)
+    assert gui.fetched == [("book 4999", False)]
+    assert book_list.rendered == [["04999"]]
+
+def test_a_newer_search_cancels_the_one_in_flight(gui):
+    book_list = BookListSpy()
+    gui.system.gate.clear()
+    gui.run_search(book_list, "book 1", "All", "All")
+    gui.run_search(book_list, "book 22", "All", "All")
+    gui.system.gate.set()
+    gui.root.pump(lambda: book_list.rendered and len(gui.fetched) == 2)
+    assert sorted(gui.fetched) == [("book 1", True), ("book 22", False)]
+    gui.root.pump(lambda: not gui.root.timers)
+    assert book_list.rendered == [[f"{i:05d}" for i in range(5000) if "book 22" in f"book {i}"]]
@@ -0,0 +1,72 @@
+import csv
+
+import pytest
+
+import importer
+from database_manager import DatabaseManager, InMemoryDatabaseManager
+from importer import import_file, normalize_isbn
+from library_system import LibrarySystem
+
+def sqlite_manager():
+    db = DatabaseManager(database=":memory:", backend="sqlite")
+    db.insert_sample_data()
+    return db
+
+BACKENDS = [LibrarySystem, InMemoryDatabaseManager, sqlite_manager]
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=["isbn", "title"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+@pytest.mark.parametrize("make", BACKENDS)
+def test_duplicates_across_chunks_and_against_catalog(tmp_path, make):
+    target = make()
+    existing = next(book["isbn"] for book in target.get_all_books() if "-" in book["isbn"])
+    before = len(target.get_all_books())
+    path = str(tmp_path / "books.csv")
+    write_csv(path, [
+        {"isbn": "978-1-111-11111-1", "title": "First"},
+        {"isbn": "9782222222222", "title": "Second"},
+        {"isbn": "9781111111111", "title": "First again"},
+        {"isbn": normalize_isbn(existing), "title": "Already catalogued"},
+    ])
+    report = import_file(target, path, chunk_size=1)
+    assert (report.read, report.imported, report.duplicates) == (4, 2, 2)
+    isbns = {book["isbn"] for book in target.get_all_books()}
+    assert len(isbns) == before + 2
+    assert {"9781111111111", "9782222222222", existing} <= isbns
+
+def test_imported_rows_get_default_fields(tmp_path):
+    system = LibrarySystem()
+    path = str(tmp_path / "books.csv")
+    write_csv(path, [{"isbn": "9783333333333", "title": "Bare row"}])
+    assert import_file(system, path).imported == 1
+    book = system.search_book("9783333333333")
+    assert (book["status"], book["copies"]) == ("Available", 1)
+    assert system.borrow_book("STU001", "9783333333333") == (True, "Book borrowed successfully")
+
+@pytest.mark.parametrize("make", BACKENDS)
+def test_hyphenated_isbns_come_from_the_index(tmp_path, make, monkeypatch):
+    target = make()
+    removed = next(book["isbn"] for book in target.get_all_books() if "-" in book["isbn"])
+    target.add_book({"isbn": "978-0-00-000001-1", "title": "Hyphenated"})
+    target.add_book({"isbn": "978 0 00 000002 2", "title": "Spaced"})
+    assert target.remove_book(removed)
+    scanned = {normalize_isbn(book["isbn"]) for book in target.get_all_books() if "-" in book["isbn"] or " " in book["isbn"]}
+    assert set(target.get_isbn_aliases()) == scanned
+    assert {"9780000000011", "9780000000022"} <= scanned and normalize_isbn(removed) not in scanned
+
+    def no_walk(source, kind):
+        raise AssertionError("import walked the catalog")
+
+    monkeypatch.setattr(importer, "iter_collection", no_walk)
+    path = str(tmp_path / "books.csv")
+    write_csv(path, [
+        {"isbn": "9780000000011", "title": "Hyphenated"},
+        {"isbn": "9780000000022", "title": "Spaced"},
+        {"isbn": normalize_isbn(removed), "title": "Back in stock"},
+    ])
+    report = import_file(target, path)
+    assert (report.imported, report.duplicates) == (1, 2)
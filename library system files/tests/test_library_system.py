@@ -0,0 +1,90 @@
+import threading
+
+from library_system import LibrarySystem
+
+def test_book_count_with_catalog_snapshot(tmp_path):
+    path = str(tmp_path / "catalog.snap")
+    LibrarySystem().save_catalog_snapshot(path)
+    system = LibrarySystem(catalog_snapshot=path)
+    assert system.get_book_count() == 8
+    system.search_book("978-0134685991")
+    system.add_book({"isbn": "9781111111111", "title": "New"})
+    system.remove_book("978-0135166307")
+    system.remove_book("9781111111111")
+    system.add_book({"isbn": "978-0135166307", "title": "Clean Code, again"})
+    system.add_book({"isbn": "9782222222222", "title": "Newer"})
+    assert system.catalog_snapshot is not None
+    count = system.get_book_count()
+    assert count == len(system.get_all_books()) == 9
+
+def test_query_books_and_facets_match_a_scan():
+    from collections import Counter
+    from query_engine import BookFilter
+    system = LibrarySystem()
+    system.add_books([{"isbn": f"97800000000{i:02d}", "title": f"Title {i}", "genre": f"Genre {i % 3}",
+                       "copies": i % 2} for i in range(40)])
+    for spec in [{}, {"genre": "Programming"}, {"genre": ["Genre 1", "Genre 2"], "status": "Available"},
+                 {"search_term": "title 1"}, {"genre": "Genre 0", "search_term": "3"}]:
+        expected = sorted((book for book in system.get_all_books() if BookFilter(**spec).matches(book)),
+                          key=lambda book: book["title"])
+        result = system.query_books(**spec)
+        assert [book["isbn"] for book in result["books"]] == [book["isbn"] for book in expected]
+        assert result["total"] == len(expected)
+    system.borrow_book("STU003", "978-0201616224")
+    system.remove_book("9780000000001")
+    facets = system.get_facets()
+    books = system.get_all_books()
+    assert facets["genre"] == dict(Counter(book["genre"] for book in books))
+    assert facets["status"] == {"On Hold": 0, **Counter(book["status"] for book in books)}
+
+def test_returned_copy_is_held_for_the_next_patron():
+    system = LibrarySystem()
+    isbn = "978-0134494166"
+    system.borrow_book("STU003", "978-0201616224")
+    assert system.place_hold("STU004", isbn)[0]
+    book = system.search_book(isbn)
+    system._store_book(book.replace(copies=0))
+    assert system.return_book("FAC001", isbn) == (True, "Book returned successfully and held for STU004")
+    assert system.search_book(isbn)["status"] == "On Hold"
+    assert system.get_facets()["status"]["On Hold"] == 1
+    assert system.query_books(status="On Hold")["total"] == 1
+    assert system.borrow_book("STU001", isbn)[0] is False
+    assert [pickup["book_isbn"] for pickup in system.get_ready_holds("STU004")] == [isbn]
+    assert system.borrow_book("STU004", isbn)[0]
+    assert system.get_facets()["status"]["On Hold"] == 0
+
+def test_facets_follow_loans_of_added_books():
+    system = LibrarySystem()
+    isbn = "9781234567897"
+    system.add_book({"isbn": isbn, "title": "Verse", "genre": "Poetry", "copies": 2})
+    assert system.get_facets()["available_by_genre"]["Poetry"] == 2
+    assert system.borrow_book("STU003", isbn)[0]
+    assert system.get_facets()["available_by_genre"]["Poetry"] == 1
+    assert system.search_book(isbn)["available_copies"] == 1
+    assert system.return_book("STU003", isbn)[0]
+    assert system.get_facets()["available_by_genre"]["Poetry"] == 2
+
+def test_iter_members_alongside_registrations():
+    system = LibrarySystem()
+    system.members_hash.rehash_batch = 1
+    system.add_members([{"member_id": f"M{i:04d}", "name": f"Member {i}"} for i in range(300)])
+    before = {member["member_id"] for member in system.get_all_members()}
+    stop = threading.Event()
+
+    def register():
+        n = 0
+        while not stop.is_set():
+            system.add_member({"member_id": f"N{n:05d}", "name": "Late"})
+            system.get_member(f"M{n % 300:04d}")
+            n += 1
+
+    writer = threading.Thread(target=register)
+    writer.start()
+    try:
+        for _ in range(20):
+            seen = [member["member_id"] for member in system.iter_members()]
+            assert len(seen) == len(set(seen))
+            assert before <= set(seen)
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,148 @@
+import itertools
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from database_manager import InMemoryDatabaseManager
+import persistence
+from persistence import WriteAheadLog, read_log
+
+LATER = date.today() + timedelta(days=60)
+GATSBY = "978-0-7432-7356-5"
+
+def logged_methods():
+    return {name for name, method in vars(InMemoryDatabaseManager).items() if hasattr(method, "__wrapped__")}
+
+def state(db):
+    return {
+        "books": {isbn: book.to_dict() for isbn, book in db.books.items()},
+        "members": {member_id: member.to_dict() for member_id, member in db.members.items()},
+        "transactions": [txn.to_dict() for txn in db.transactions],
+        "reservations": db.get_pending_reservations(),
+        "pickups": db.get_ready_holds(),
+        "fines": db.overdue.charges(),
+        "overdue": db.get_overdue_count(LATER),
+    }
+
+def run_every_logged_operation(db, checkpoint_after=None):
+    steps = [
+        lambda: db.add_book({"isbn": "9781111111111", "title": "Logged", "copies": 1}),
+        lambda: db.add_books([{"isbn": "9782222222222", "title": "Batch"}, {"isbn": "9783333333333"}]),
+        lambda: db.add_member({"member_id": "STU900", "name": "Walt"}),
+        lambda: db.add_members([{"member_id": "STU901", "name": "Ada"}, {"member_id": "STU902", "name": "Lin"}]),
+        lambda: db.borrow_book("STU900", GATSBY),
+        lambda: db.borrow_book("STU901", GATSBY),
+        lambda: db.place_hold("STU902", GATSBY),
+        lambda: db.place_hold("LIB001", GATSBY),
+        lambda: db.place_hold("ADM001", "9782222222222"),
+        lambda: db.cancel_hold("ADM001", "9782222222222"),
+        lambda: db.return_book("STU900", GATSBY),
+        lambda: db.borrow_many("STU901", ["9781111111111", "9782222222222", "9783333333333"]),
+        lambda: db.return_many("STU901", ["9782222222222"]),
+        lambda: db.accrue_fines(LATER),
+        lambda: db.expire_holds(LATER),
+        lambda: db.cancel_hold("LIB001", GATSBY),
+        lambda: db.remove_book("9782222222222"),
+        lambda: db.remove_member("STU902"),
+    ]
+    for n, step in enumerate(steps):
+        assert step()[0], f"step {n} did not apply"
+        if n == checkpoint_after:
+            db.checkpoint()
+
+@pytest.mark.parametrize("checkpoint_after", [None, 6])
+def test_replay_reproduces_every_logged_operation(tmp_path, checkpoint_after):
+    data_dir = str(tmp_path)
+    db = InMemoryDatabaseManager(data_dir=data_dir, fsync="never", snapshot_every=10 ** 6)
+    run_every_logged_operation(db, checkpoint_after)
+    expected = state(db)
+    db.close_connection()
+    if checkpoint_after is None:
+        logged = {op for _, op, _, _ in read_log(os.path.join(data_dir, "wal.log"))}
+        assert logged == logged_methods()
+    replayed = InMemoryDatabaseManager(data_dir=data_dir, fsync="never", snapshot_every=10 ** 6)
+    assert state(replayed) == expected
+    replayed.close_connection()
+
+@pytest.mark.parametrize("checkpoint", [False, True])
+def test_holds_and_pickups_survive_a_restart(tmp_path, checkpoint):
+    data_dir = str(tmp_path)
+    db = InMemoryDatabaseManager(data_dir=data_dir, fsync="never")
+    db.add_members([{"member_id": f"STU91{n}", "name": f"Reader {n}"} for n in range(4)])
+    assert db.borrow_book("STU910", GATSBY)[0] and db.borrow_book("STU911", GATSBY)[0]
+    assert db.place_hold("STU912", GATSBY)[0] and db.place_hold("STU913", GATSBY)[0]
+    assert db.return_book("STU910", GATSBY)[0]
+    if checkpoint:
+        db.checkpoint()
+    db.close_connection()
+
+    db = InMemoryDatabaseManager(data_dir=data_dir, fsync="never")
+    [pickup] = db.get_ready_holds()
+    assert (pickup["member_id"], pickup["pickup_expires"]) == ("STU912", date.today() + timedelta(days=7))
+    assert [hold["member_id"] for hold in db.get_pending_reservations()] == ["STU913"]
+    assert db.place_hold("STU912", GATSBY) == (False, "Hold already placed")
+    assert db.books[GATSBY]["available_copies"] == 0
+    # The restored shelf still knows the deadline: the lapsed pickup goes to the next in line
+    assert db.expire_holds(pickup["pickup_expires"] + timedelta(days=1)) == (True, [("STU912", GATSBY, "STU913")])
+    db.close_connection()
+
+    db = InMemoryDatabaseManager(data_dir=data_dir, fsync="never")
+    assert [pickup["member_id"] for pickup in db.get_ready_holds()] == ["STU913"]
+    assert db.get_pending_reservations() == []
+    assert db.cancel_hold("STU913", GATSBY)[0]
+    assert db.books[GATSBY]["available_copies"] == 1
+    db.close_connection()
+
+def test_group_commit_and_torn_tail(tmp_path):
+    path = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(path, fsync="batch", group_size=64, group_interval=0)
+    for seq in range(1, 151):
+        wal.append(seq, "op", [seq, date(2024, 1, 2)], None)
+    assert wal.commit_count == 2
+    assert [seq for seq, _, _, _ in read_log(path)] == list(range(1, 129))
+    wal.close()
+    entries = list(read_log(path))
+    assert [seq for seq, _, _, _ in entries] == list(range(1, 151))
+    assert entries[0][2] == [1, date(2024, 1, 2)]
+    with open(path, "a", encoding="utf-8") as log:
+        log.write('{"seq": 151, "op": "to')
+    assert [seq for seq, _, _, _ in read_log(path, after_seq=148)] == [149, 150]
+
+def test_writers_wait_for_their_group_fsync(tmp_path, monkeypatch):
+    path = str(tmp_path / "wal.log")
+    synced = []
+
+    def slow_fsync(fd):
+        # Records how many entries this fsync made durable
+        with open(path, encoding="utf-8") as log:
+            written = sum(1 for _ in log)
+        time.sleep(0.002)
+        synced.append(written)
+
+    monkeypatch.setattr(persistence.os, "fsync", slow_fsync)
+    wal = WriteAheadLog(path, fsync="batch", group_interval=0)
+    seq = itertools.count(1)
+    lock = threading.Lock()
+    late = []
+
+    def writer():
+        for _ in range(25):
+            with lock:
+                ticket = wal.append(next(seq), "op", [], None)
+            wal.wait(ticket)
+            # Acknowledged only after an fsync that covered the entry
+            if not any(upto >= ticket for upto in synced):
+                late.append(ticket)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert late == []
+    assert len(list(read_log(path))) == 200
+    assert wal.commit_count < 200
+    wal.close()
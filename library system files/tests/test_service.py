@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from database_manager import DatabaseManager, InMemoryDatabaseManager
+from exporter import backup
+from library_system import LibrarySystem
+from service import ServiceClient, ServiceError, run_in_thread
+
+@pytest.fixture
+def serve():
+    services = []
+
+    def start(backend):
+        service = run_in_thread(backend, sweep_interval=None)
+        services.append(service)
+        return ServiceClient(port=service.port)
+
+    yield start
+    for service in services:
+        service.close()
+
+def test_client_offers_only_the_backend_methods(serve):
+    client = serve(LibrarySystem())
+    assert hasattr(client, "borrow_book")
+    assert not hasattr(client, "get_open_loans")
+    assert client.get_member("STU001")["name"] == "Alice Johnson"
+
+def test_get_member_on_manager(serve):
+    client = serve(InMemoryDatabaseManager())
+    assert client.get_member("STU001")["member_id"] == "STU001"
+    assert client.get_member("missing") is None
+
+def test_bad_arguments_versus_backend_errors(serve):
+    backend = LibrarySystem()
+
+    def broken(isbn):
+        raise TypeError("bug inside the backend")
+
+    backend.remove_book = broken
+    client = serve(backend)
+    with pytest.raises(ServiceError, match="missing a required argument"):
+        client.call("borrow_book", "STU001")
+    with pytest.raises(ServiceError, match="TypeError: bug inside the backend"):
+        client.remove_book("978-0134685991")
+
+def sqlite_backend():
+    backend = DatabaseManager(database=":memory:", backend="sqlite")
+    backend.insert_sample_data()
+    return backend
+
+@pytest.mark.parametrize("make_backend", [LibrarySystem, InMemoryDatabaseManager, sqlite_backend])
+def test_backup_through_the_client_matches_a_direct_backup(serve, tmp_path, make_backend):
+    backend = make_backend()
+    backend.borrow_book("LIB001", backend.get_all_books()[0]["isbn"])
+    client = serve(backend)
+    _, direct = backup(backend, str(tmp_path / "direct"))
+    _, remote = backup(client, str(tmp_path / "remote"))
+    assert remote == direct
+    assert direct["transactions"] > 0
+    books = client.iter_books()
+    assert next(books)["isbn"]
+    assert client.get_member("STU001")["member_id"] == "STU001"
+    assert len(list(books)) == direct["books"] - 1
+
+def test_backup_refuses_an_unreadable_collection(tmp_path):
+    class BooksOnly:
+        def iter_books(self):
+            return iter(())
+
+    with pytest.raises(ValueError, match="cannot list its members"):
+        backup(BooksOnly(), str(tmp_path))
+
+def test_slow_in_memory_calls_leave_the_loop_free_and_coalesce(serve):
+    backend = InMemoryDatabaseManager()
+    entered, release = threading.Event(), threading.Event()
+    get_facets = backend.get_facets
+
+    def slow_facets():
+        entered.set()
+        release.wait(5)
+        return get_facets()
+
+    backend.get_facets = slow_facets
+    client = serve(backend)
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(client.get_facets())) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    assert entered.wait(5)
+    time.sleep(0.2)
+    # The loop still answers other kiosks while the reads are parked
+    assert client.get_member("STU001")["member_id"] == "STU001"
+    release.set()
+    for reader in readers:
+        reader.join()
+    assert len(results) == 3 and results[0] == results[2]
+    assert client.stats()["coalesced"] == 2